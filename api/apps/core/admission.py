@@ -0,0 +1,194 @@
+import asyncio
+import collections
+import re
+import threading
+import time
+import typing
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils.decorators import sync_and_async_middleware
+
+from api.apps.core.metrics import metrics
+
+MONEY, CATALOG, AUTH = 'money', 'catalog', 'auth'
+
+MONEY_PATHS = re.compile(r'^/api/(products/buy|users/(deposit|reset-deposit)|machines/[^/]+/(buy|deposit))/$')
+AUTH_PATHS = re.compile(r'^/api/users/((login|login/refresh|logout|logout/all|bulk)/)?$')
+CATALOG_PATHS = re.compile(r'^/api/(products|machines)/')
+# Long-lived event streams would hold a slot for their whole life.
+UNLIMITED_PATHS = re.compile(r'^/api/products/stream/$')
+
+
+def route_class(request) -> typing.Optional[str]:
+    """
+    The limit a request counts against, or ``None`` for routes that are
+    not limited (health checks, metrics, schema, event streams).
+    """
+    path = request.path
+    if UNLIMITED_PATHS.match(path):
+        return None
+    if MONEY_PATHS.match(path):
+        return MONEY
+    if AUTH_PATHS.match(path):
+        return AUTH if request.method != 'GET' else None
+    if CATALOG_PATHS.match(path) and request.method in ('GET', 'HEAD'):
+        return CATALOG
+    return None
+
+
+class SyncLimiter:
+    """
+    At most ``concurrency`` requests at once, with up to ``queue`` more
+    waiting ``timeout`` seconds for a slot. For worker threads.
+    """
+
+    def __init__(self, name: str, concurrency: int, queue: int, timeout: float):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue = queue
+        self.timeout = timeout
+        self.active = 0
+        self.waiting = 0
+        self._condition = threading.Condition()
+
+    def acquire(self) -> bool:
+        with self._condition:
+            if self.active < self.concurrency and not self.waiting:
+                self.active += 1
+                return True
+            if self.waiting >= self.queue:
+                return False
+            self.waiting += 1
+            metrics.gauge(f'admission.{self.name}.queue_depth', self.waiting)
+            try:
+                admitted = self._condition.wait_for(lambda: self.active < self.concurrency, self.timeout)
+                if admitted:
+                    self.active += 1
+                return admitted
+            finally:
+                self.waiting -= 1
+                metrics.gauge(f'admission.{self.name}.queue_depth', self.waiting)
+
+    def release(self):
+        with self._condition:
+            self.active -= 1
+            self._condition.notify()
+
+
+class AsyncLimiter:
+    """
+    ``SyncLimiter`` for the event loop. Waiters are admitted in arrival
+    order, the released slot being handed straight to the first of them.
+    """
+
+    def __init__(self, name: str, concurrency: int, queue: int, timeout: float):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue = queue
+        self.timeout = timeout
+        self.active = 0
+        self._waiters: typing.Deque[asyncio.Future] = collections.deque()
+
+    async def acquire(self) -> bool:
+        if self.active < self.concurrency and not self._waiters:
+            self.active += 1
+            return True
+        if len(self._waiters) >= self.queue:
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        metrics.gauge(f'admission.{self.name}.queue_depth', len(self._waiters))
+        try:
+            await asyncio.wait([waiter], timeout=self.timeout)
+        except BaseException:
+            # Cancelled while waiting; give back a slot handed over meanwhile.
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            waiter.cancel()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            metrics.gauge(f'admission.{self.name}.queue_depth', len(self._waiters))
+
+        if waiter.done():
+            return True
+        waiter.cancel()
+        return False
+
+    def release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # The slot passes to the waiter, so ``active`` is unchanged.
+                waiter.set_result(True)
+                return
+        self.active -= 1
+
+
+_limiters: typing.Dict[tuple, typing.Union[SyncLimiter, AsyncLimiter]] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(name: str, is_async: bool):
+    """
+    The worker's limiter for a route class, built from ``ADMISSION_LIMITS``.
+    """
+    limits = settings.ADMISSION_LIMITS[name]
+    key = (name, is_async, limits['concurrency'], limits['queue'], limits['timeout'])
+    limiter = _limiters.get(key)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(key)
+            if limiter is None:
+                cls = AsyncLimiter if is_async else SyncLimiter
+                limiter = _limiters[key] = cls(name, limits['concurrency'], limits['queue'], limits['timeout'])
+    return limiter
+
+
+def overloaded(name: str) -> JsonResponse:
+    metrics.incr(f'admission.{name}.rejected')
+    response = JsonResponse({'detail': 'The server is busy, please retry shortly.'}, status=503)
+    response['Retry-After'] = str(settings.ADMISSION_RETRY_AFTER)
+    return response
+
+
+@sync_and_async_middleware
+def admission_middleware(get_response):
+    """
+    Caps concurrent requests per route class in each worker, answering
+    ``503`` with ``Retry-After`` when the class is saturated and its wait
+    queue full or the wait timed out. Flash-sale purchases then queue
+    against their own limit instead of starving catalog reads and logins.
+    """
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request):
+            name = route_class(request) if settings.ADMISSION_CONTROL else None
+            if name is None:
+                return await get_response(request)
+            limiter = get_limiter(name, is_async=True)
+            started = time.perf_counter()
+            if not await limiter.acquire():
+                return overloaded(name)
+            metrics.observe(f'admission.{name}.wait', (time.perf_counter() - started) * 1000)
+            try:
+                return await get_response(request)
+            finally:
+                limiter.release()
+    else:
+        def middleware(request):
+            name = route_class(request) if settings.ADMISSION_CONTROL else None
+            if name is None:
+                return get_response(request)
+            limiter = get_limiter(name, is_async=False)
+            started = time.perf_counter()
+            if not limiter.acquire():
+                return overloaded(name)
+            metrics.observe(f'admission.{name}.wait', (time.perf_counter() - started) * 1000)
+            try:
+                return get_response(request)
+            finally:
+                limiter.release()
+    return middleware
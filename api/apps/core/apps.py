@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+
+class CoreConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "api.apps.core"
+
+    def ready(self):
+        from api.apps.core.tracing import install_db_tracing
+
+        connection_created.connect(install_db_tracing)
@@ -0,0 +1,105 @@
+import atexit
+import logging
+import os
+import threading
+import time
+import typing
+
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    """
+    Collects keyed writes in memory and hands them over in one batch.
+
+    Writes to the same key are merged with ``merge`` while they wait. The
+    batch is written by whichever caller first notices that ``interval``
+    seconds have passed or ``max_pending`` keys are waiting, and once more at
+    process exit. With ``background=True`` callers never write: a daemon
+    thread in each process writes the batch instead, so slow writes stay off
+    the request path. Writes are best-effort: a failed batch is logged and
+    dropped rather than retried, so only use this for data that can afford
+    to lose one interval on a crash.
+    """
+
+    # Set by the test runner: every buffer writes inline, so the writes land
+    # in the test's transaction.
+    inline_only = False
+
+    def __init__(self, interval: float, max_pending: int = 10000, background: bool = False):
+        self.interval = interval
+        self.max_pending = max_pending
+        self.background = background
+        self._lock = threading.Lock()
+        self._pending: typing.Dict[typing.Hashable, typing.Any] = {}
+        self._last_flush = time.monotonic()
+        self._wakeup = threading.Event()
+        # Pid of the process the flusher thread runs in; threads do not
+        # survive a fork.
+        self._flusher_pid = None
+        atexit.register(self.flush)
+
+    def merge(self, old, new):
+        return new
+
+    def write(self, items: typing.Dict[typing.Hashable, typing.Any]):
+        raise NotImplementedError
+
+    def _due(self) -> bool:
+        return (
+            len(self._pending) >= self.max_pending
+            or time.monotonic() - self._last_flush >= self.interval
+        )
+
+    def add(self, key, value):
+        with self._lock:
+            if key in self._pending:
+                value = self.merge(self._pending[key], value)
+            self._pending[key] = value
+            due = self._due()
+            background = self.background and not self.inline_only
+            if background and self._flusher_pid != os.getpid():
+                self._flusher_pid = os.getpid()
+                threading.Thread(target=self._run, name=type(self).__name__, daemon=True).start()
+        if not due:
+            return
+        if background:
+            self._wakeup.set()
+        else:
+            self.flush()
+
+    def _run(self):
+        while True:
+            # With no interval every add is due and wakes the thread.
+            self._wakeup.wait(self.interval or None)
+            self._wakeup.clear()
+            with self._lock:
+                due = self._due()
+            if due:
+                try:
+                    self.flush()
+                finally:
+                    # Don't hold a database connection between flushes.
+                    connections.close_all()
+
+    def flush(self) -> int:
+        """
+        Write everything pending now; returns the number of keys written.
+        """
+        with self._lock:
+            items, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        if not items:
+            return 0
+        try:
+            self.write(items)
+        except Exception:
+            logger.exception("%s dropped %d pending writes.", type(self).__name__, len(items))
+            return 0
+        return len(items)
+
+    def discard(self):
+        with self._lock:
+            self._pending = {}
@@ -0,0 +1,133 @@
+import random
+import time
+import typing
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, IntegrityError, connections, transaction
+
+from api.apps.core.metrics import metrics
+
+# serialization_failure, deadlock_detected, lock_not_available
+RETRYABLE_PGCODES = frozenset({'40001', '40P01', '55P03'})
+
+ISOLATION_LEVELS = {
+    'serializable': 'SERIALIZABLE',
+    'repeatable_read': 'REPEATABLE READ',
+}
+
+T = typing.TypeVar('T')
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """
+    Whether a database error is a transient conflict worth retrying.
+    """
+    if not isinstance(exc, DatabaseError):
+        return False
+    return getattr(exc.__cause__, 'pgcode', None) in RETRYABLE_PGCODES
+
+
+def backoff_delay(attempt: int) -> float:
+    """
+    Full-jitter exponential backoff for the given (1-based) attempt.
+    """
+    ceiling = min(
+        settings.TRANSACTION_RETRY_MAX_BACKOFF,
+        settings.TRANSACTION_RETRY_BACKOFF * (2 ** (attempt - 1)),
+    )
+    return random.uniform(0, ceiling)
+
+
+def _configure_transaction(connection, isolation: typing.Optional[str], lock_timeout: int):
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        if isolation:
+            cursor.execute(f"SET TRANSACTION ISOLATION LEVEL {ISOLATION_LEVELS[isolation]}")
+        if lock_timeout:
+            cursor.execute("SET LOCAL lock_timeout = %s", [f"{int(lock_timeout)}ms"])
+
+
+def run_in_transaction(
+    func: typing.Callable[[], T],
+    name: str,
+    isolation: typing.Optional[str] = None,
+    max_attempts: typing.Optional[int] = None,
+    lock_timeout: typing.Optional[int] = None,
+    using: str = DEFAULT_DB_ALIAS,
+) -> T:
+    """
+    Run ``func`` inside ``transaction.atomic()``, retrying on serialization
+    failures, deadlocks and lock timeouts.
+
+    ``func`` is re-executed from scratch on every attempt, so it must not
+    have side effects outside the database (use ``transaction.on_commit``).
+    When called inside an outer atomic block there is nothing to retry on
+    its own, so ``func`` runs once in a savepoint.
+
+    Args:
+        func: Callable doing the transactional work.
+        name: Metric name for this transaction.
+        isolation: ``"serializable"`` or ``"repeatable_read"``; defaults to the
+            database's READ COMMITTED.
+        max_attempts: Attempts before giving up and re-raising the last error.
+        lock_timeout: Milliseconds to wait for a row lock before failing the
+            attempt; 0 waits indefinitely.
+    """
+    if isolation is not None and isolation not in ISOLATION_LEVELS:
+        raise ValueError(f"Unknown isolation level: {isolation}")
+
+    connection = connections[using]
+    if max_attempts is None:
+        max_attempts = settings.TRANSACTION_MAX_ATTEMPTS
+    if lock_timeout is None:
+        lock_timeout = settings.TRANSACTION_LOCK_TIMEOUT
+
+    if connection.in_atomic_block:
+        with transaction.atomic(using=using):
+            return func()
+
+    attempt = 0
+    while True:
+        attempt += 1
+        metrics.incr(f'txn.{name}.attempts')
+        try:
+            with metrics.timer(f'txn.{name}.duration'):
+                with transaction.atomic(using=using):
+                    _configure_transaction(connection, isolation, lock_timeout)
+                    return func()
+        except DatabaseError as exc:
+            if not is_retryable(exc) or attempt >= max_attempts:
+                if is_retryable(exc):
+                    metrics.incr(f'txn.{name}.exhausted')
+                raise
+            metrics.incr(f'txn.{name}.retries')
+            time.sleep(backoff_delay(attempt))
+
+
+def locked_get(queryset, **lookup):
+    """
+    ``select_for_update().get(...)`` that records how long the row lock took.
+    """
+    with metrics.timer(f'db.lock_wait.{queryset.model._meta.db_table}'):
+        return queryset.select_for_update().get(**lookup)
+
+
+def update_or_insert(model, lookup: dict, changes: dict, defaults: dict):
+    """
+    Apply ``changes`` (usually ``F()`` increments) to the row matching
+    ``lookup`` with a single UPDATE, inserting it with ``defaults`` when
+    there is no such row yet.
+
+    Unlike ``update_or_create`` nothing is read or locked first; when two
+    transactions race to insert, the loser applies ``changes`` to the
+    winner's row.
+    """
+    if model.objects.filter(**lookup).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **defaults)
+    except IntegrityError:
+        # Another transaction created the row first.
+        model.objects.filter(**lookup).update(**changes)
@@ -0,0 +1,79 @@
+import threading
+import time
+import typing
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.db.migrations.executor import MigrationExecutor
+
+from api.apps.core.metrics import metrics
+
+
+def check_database(alias: str = DEFAULT_DB_ALIAS) -> typing.Optional[str]:
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute("SELECT 1")
+    except DatabaseError as exc:
+        return f"{type(exc).__name__}: {exc}"
+    return None
+
+
+def check_migrations(alias: str = DEFAULT_DB_ALIAS) -> typing.Optional[str]:
+    try:
+        executor = MigrationExecutor(connections[alias])
+        plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    except DatabaseError as exc:
+        return f"{type(exc).__name__}: {exc}"
+    if plan:
+        return f"{len(plan)} unapplied migration(s)"
+    return None
+
+
+CHECKS = {
+    'database': check_database,
+    'migrations': check_migrations,
+}
+
+
+class Readiness:
+    """
+    Dependency checks whose result is reused for ``ttl`` seconds, so probes
+    from many load balancers cost one round of checks per worker per TTL.
+    While one thread refreshes, the others keep serving the last result.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._result: typing.Optional[typing.Tuple[bool, dict]] = None
+        self._expires = 0.0
+
+    def run(self) -> typing.Tuple[bool, dict]:
+        results = {}
+        for name, check in CHECKS.items():
+            # Later checks are meaningless once the database is unreachable.
+            error = check() if all(value == 'ok' for value in results.values()) else 'skipped'
+            results[name] = error or 'ok'
+        ready = all(value == 'ok' for value in results.values())
+        if not ready:
+            metrics.incr('health.not_ready')
+        return ready, results
+
+    def get(self) -> typing.Tuple[bool, dict]:
+        if self._result is not None and time.monotonic() < self._expires:
+            return self._result
+        if not self._lock.acquire(blocking=self._result is None):
+            return self._result
+        try:
+            if self._result is None or time.monotonic() >= self._expires:
+                self._result = self.run()
+                self._expires = time.monotonic() + self.ttl
+            return self._result
+        finally:
+            self._lock.release()
+
+    def clear(self):
+        self._result = None
+
+
+readiness = Readiness(settings.READINESS_CACHE_TTL)
@@ -0,0 +1,142 @@
+import asyncio
+import threading
+import time
+import typing
+from contextlib import asynccontextmanager, contextmanager
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils.decorators import sync_and_async_middleware
+from api.apps.core.admission import MONEY, route_class
+from api.apps.core.metrics import metrics
+from api.apps.users.authentication import bearer_user_id
+
+
+class LaneFull(Exception):
+    pass
+
+
+class _Lane:
+    __slots__ = ('lock', 'users')
+
+    def __init__(self, lock):
+        self.lock = lock
+        # Requests holding or waiting for the lane; it is dropped at zero.
+        self.users = 0
+
+
+class AsyncLanes:
+    """
+    One FIFO lock per key for the event loop. Requests waiting for their
+    lane are parked coroutines: they hold no thread and no connection.
+    """
+
+    def __init__(self):
+        self._lanes: typing.Dict[typing.Hashable, _Lane] = {}
+
+    def __len__(self):
+        return len(self._lanes)
+
+    @asynccontextmanager
+    async def lane(self, key, max_pending: int):
+        lane = self._lanes.get(key)
+        if lane is None:
+            lane = self._lanes[key] = _Lane(asyncio.Lock())
+        elif lane.users > max_pending:
+            raise LaneFull(key)
+        lane.users += 1
+        try:
+            async with lane.lock:
+                yield
+        finally:
+            lane.users -= 1
+            if not lane.users:
+                del self._lanes[key]
+
+
+class SyncLanes:
+    """
+    ``AsyncLanes`` for worker threads.
+    """
+
+    def __init__(self):
+        self._lanes: typing.Dict[typing.Hashable, _Lane] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._lanes)
+
+    @contextmanager
+    def lane(self, key, max_pending: int):
+        with self._lock:
+            lane = self._lanes.get(key)
+            if lane is None:
+                lane = self._lanes[key] = _Lane(threading.Lock())
+            elif lane.users > max_pending:
+                raise LaneFull(key)
+            lane.users += 1
+        try:
+            with lane.lock:
+                yield
+        finally:
+            with self._lock:
+                lane.users -= 1
+                if not lane.users:
+                    del self._lanes[key]
+
+
+async_lanes = AsyncLanes()
+sync_lanes = SyncLanes()
+
+
+def lane_key(request) -> typing.Optional[int]:
+    """
+    The user a money-moving request acts for, from its verified access
+    token, or ``None`` when it does not need a lane. Checking the token
+    needs no database; invalid tokens are left for authentication to reject.
+    """
+    if not settings.USER_LANES or route_class(request) != MONEY:
+        return None
+    return bearer_user_id(request)
+
+
+def too_many_pending() -> JsonResponse:
+    metrics.incr('lanes.rejected')
+    response = JsonResponse({'detail': 'Too many requests in flight for this user.'}, status=429)
+    response['Retry-After'] = str(settings.ADMISSION_RETRY_AFTER)
+    return response
+
+
+@sync_and_async_middleware
+def user_lane_middleware(get_response):
+    """
+    Runs each user's deposits, purchases and resets one after another within
+    the worker, so a burst from one client waits here instead of queueing
+    on the ``users`` row lock with a database connection each. The row lock
+    still orders requests across workers.
+    """
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request):
+            key = lane_key(request)
+            if key is None:
+                return await get_response(request)
+            started = time.perf_counter()
+            try:
+                async with async_lanes.lane(key, settings.USER_LANE_MAX_PENDING):
+                    metrics.observe('lanes.wait', (time.perf_counter() - started) * 1000)
+                    return await get_response(request)
+            except LaneFull:
+                return too_many_pending()
+    else:
+        def middleware(request):
+            key = lane_key(request)
+            if key is None:
+                return get_response(request)
+            started = time.perf_counter()
+            try:
+                with sync_lanes.lane(key, settings.USER_LANE_MAX_PENDING):
+                    metrics.observe('lanes.wait', (time.perf_counter() - started) * 1000)
+                    return get_response(request)
+            except LaneFull:
+                return too_many_pending()
+    return middleware
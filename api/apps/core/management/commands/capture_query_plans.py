@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from api.apps.core.plans import NoSampleData, compare, explain, hot_queries, read_plan, summarize, write_plan
+
+
+class Command(BaseCommand):
+    help = (
+        "Capture EXPLAIN (ANALYZE, BUFFERS) plans of the hot queries against a "
+        "seeded database, or check them against the stored plans."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", default=None, help="Defaults to QUERY_PLAN_DIR.")
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Compare with the stored plans and fail on regressions or missing plans instead of writing them.",
+        )
+        parser.add_argument(
+            "--cost-factor", type=float, default=2.0,
+            help="Flag a plan whose total cost grew by more than this factor.",
+        )
+        parser.add_argument("--only", nargs="*", default=None, help="Names of the queries to run.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Query plans can only be captured on PostgreSQL.")
+        try:
+            queries = hot_queries()
+        except NoSampleData as exc:
+            raise CommandError(str(exc))
+
+        regressions = missing = 0
+        for name, (sql, params) in queries.items():
+            if options["only"] and name not in options["only"]:
+                continue
+            plan = explain(sql, params)
+            summary = summarize(plan)
+            self.stdout.write(
+                f"{name}: cost {summary['total_cost']:.2f}, {summary['execution_time']:.3f} ms, "
+                + ", ".join(f"{relation} {node}" for relation, node in summary["scans"].items())
+            )
+
+            if not options["check"]:
+                write_plan(name, sql, plan, options["output"])
+                continue
+
+            stored = read_plan(name, options["output"])
+            if stored is None:
+                # Without a baseline nothing is checked, so a missing plan fails too.
+                missing += 1
+                self.stdout.write(self.style.ERROR(f"  no stored plan for {name}"))
+                continue
+            for problem in compare(stored["summary"], summary, options["cost_factor"]):
+                regressions += 1
+                self.stdout.write(self.style.ERROR(f"  {problem}"))
+
+        if missing:
+            raise CommandError(
+                f"{missing} query plan(s) have no stored baseline; capture them with `make plans`."
+            )
+        if regressions:
+            raise CommandError(f"{regressions} query plan regression(s) found.")
+        self.stdout.write(self.style.SUCCESS(
+            "Query plans match the stored ones." if options["check"] else "Query plans written."
+        ))
@@ -0,0 +1,55 @@
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a local stand-in for an OTLP/HTTP trace collector that appends "
+        "every received batch to a JSON lines file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--port", type=int, default=4318)
+        parser.add_argument("--output", default=None, help="Defaults to TRACING_EXPORT_PATH.")
+
+    def handle(self, *args, **options):
+        output = options["output"] or settings.TRACING_EXPORT_PATH
+        stdout = self.stdout
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                try:
+                    payload = json.loads(body)
+                except ValueError:
+                    self.send_response(400)
+                    self.end_headers()
+                    return
+                with open(output, "a") as f:
+                    f.write(json.dumps(payload, separators=(",", ":")) + "\n")
+
+                spans = sum(
+                    len(scope["spans"])
+                    for resource in payload.get("resourceSpans", ())
+                    for scope in resource.get("scopeSpans", ())
+                )
+                stdout.write(f"Received {spans} spans.")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                self.wfile.write(b"{}")
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", options["port"]), Handler)
+        self.stdout.write(f"Collecting traces on http://127.0.0.1:{options['port']}/v1/traces into {output}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
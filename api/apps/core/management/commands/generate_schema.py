@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.apps.core.schema import generate_schema, read_checksums, render_checksums, write_schema
+
+
+class Command(BaseCommand):
+    help = "Generate the OpenAPI schema served by the documentation routes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Fail if the stored schema differs from the current code instead of writing it.",
+        )
+
+    def handle(self, *args, **options):
+        documents = generate_schema()
+
+        if options["check"]:
+            if read_checksums() != render_checksums(documents):
+                raise CommandError(
+                    "Stored OpenAPI schema is stale, run `python manage.py generate_schema`."
+                )
+            self.stdout.write(self.style.SUCCESS("Stored OpenAPI schema is up to date."))
+            return
+
+        write_schema(documents)
+        self.stdout.write(self.style.SUCCESS("OpenAPI schema written."))
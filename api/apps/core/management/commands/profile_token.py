@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from api.apps.core.profiling import make_token, prune_used_tokens
+from api.apps.users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Print a signed X-Profile header value. It profiles one request made with the "
+        f"user's access token, within {settings.PROFILING_TOKEN_MAX_AGE} seconds of being issued."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", required=True, help="Username the profiled request authenticates as.")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["user"])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['user']}' does not exist.")
+        prune_used_tokens()
+        self.stdout.write(make_token(user.pk))
@@ -0,0 +1,52 @@
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from api.apps.core.seeding import Seeder
+from api.apps.products.stats import reconcile_seller_stats
+from api.apps.users.models import User
+
+
+class Command(BaseCommand):
+    help = "Generate a deterministic benchmark dataset of users, products and sessions."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--buyers", type=int, default=100000)
+        parser.add_argument("--sellers", type=int, default=1000)
+        parser.add_argument("--products", type=int, default=1000000)
+        parser.add_argument("--sessions", type=int, default=200000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--prefix", default="seed", help="Prefix for generated usernames.")
+        parser.add_argument("--batch-size", type=int, default=10000)
+        parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent for popularity skew.")
+        parser.add_argument(
+            "--password", default="SeedPassword123!",
+            help="Password for every generated user, hashed once.",
+        )
+
+    def handle(self, *args, **options):
+        prefix = options["prefix"]
+        if User.objects.filter(username__startswith=f"{prefix}_").exists():
+            raise CommandError(f"Users with prefix '{prefix}_' already exist, pick another --prefix.")
+        if options["sellers"] < 1 and options["products"]:
+            raise CommandError("Products need at least one seller.")
+
+        started = time.perf_counter()
+        seeder = Seeder(
+            seed=options["seed"],
+            prefix=prefix,
+            batch_size=options["batch_size"],
+            zipf_exponent=options["zipf"],
+            password_hash=make_password(options["password"]),
+            log=self.stdout.write,
+        )
+
+        seller_ids = seeder.users("seller", options["sellers"])
+        buyer_ids = seeder.users("buyer", options["buyers"])
+        if options["products"]:
+            seeder.products(seller_ids, options["products"])
+            self.stdout.write(f"seller stats: {reconcile_seller_stats(seller_ids)} sellers counted")
+        if options["sessions"] and buyer_ids:
+            seeder.sessions(buyer_ids, options["sessions"])
+
+        self.stdout.write(self.style.SUCCESS(f"Seeded in {time.perf_counter() - started:.1f}s."))
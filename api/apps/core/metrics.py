@@ -0,0 +1,62 @@
+import threading
+import time
+import typing
+from contextlib import contextmanager
+
+
+class Metrics:
+    """
+    In-process counters, gauges and timing summaries.
+
+    Values are per worker; they are meant to be scraped from each process
+    rather than aggregated here.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: typing.Dict[str, int] = {}
+        self._gauges: typing.Dict[str, float] = {}
+        self._timings: typing.Dict[str, typing.Dict[str, float]] = {}
+
+    def incr(self, name: str, value: int = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def gauge(self, name: str, value: float):
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, value: float):
+        with self._lock:
+            summary = self._timings.setdefault(name, {'count': 0, 'total': 0.0, 'max': 0.0})
+            summary['count'] += 1
+            summary['total'] += value
+            summary['max'] = max(summary['max'], value)
+
+    @contextmanager
+    def timer(self, name: str):
+        """
+        Record the duration of the block in milliseconds.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - started) * 1000)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                'counters': dict(self._counters),
+                'gauges': dict(self._gauges),
+                'timings': {name: dict(summary) for name, summary in self._timings.items()},
+            }
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._timings.clear()
+
+
+metrics = Metrics()
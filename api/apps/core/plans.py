@@ -0,0 +1,139 @@
+import json
+import typing
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count
+
+# Scan nodes that read a relation through an index.
+INDEX_SCANS = ('Index Scan', 'Index Only Scan', 'Bitmap Heap Scan', 'Bitmap Index Scan')
+
+
+class NoSampleData(Exception):
+    pass
+
+
+def _sql(queryset) -> typing.Tuple[str, tuple]:
+    return queryset.query.sql_with_params()
+
+
+def hot_queries() -> typing.Dict[str, typing.Tuple[str, tuple]]:
+    """
+    The SQL of the queries on the request hot path, with parameters taken
+    from the current data: the user holding the most sessions, a product
+    in the middle of the catalog and a page half-way through the list.
+    """
+    from api.apps.products.models import Product
+    from api.apps.users.models import ActiveSession, User
+
+    busiest = (
+        ActiveSession.all_objects.values('user_id').annotate(sessions=Count('id')).order_by('-sessions').first()
+    )
+    product_count = Product.objects.count()
+    if busiest is None or not product_count:
+        raise NoSampleData("No sessions or products to sample, run `python manage.py seed_data` first.")
+
+    user_id = busiest['user_id']
+    session_id = ActiveSession.all_objects.filter(user_id=user_id).values_list('session_id', flat=True)[0]
+    product_id = Product.objects.order_by('id').values_list('id', flat=True)[product_count // 2]
+    page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+    offset = product_count // 2
+
+    return {
+        'session_lookup': _sql(
+            ActiveSession.objects.filter(user_id=user_id, session_id=session_id, user__is_active=True)
+            .values('pk')[:1]
+        ),
+        'session_count': _sql(ActiveSession.objects.filter(user_id=user_id).values('pk')),
+        'product_list_count': (
+            f"SELECT COUNT(*) FROM {connection.ops.quote_name(Product._meta.db_table)} WHERE retired_at IS NULL", ()
+        ),
+        'product_list_page': _sql(Product.objects.all()[offset:offset + page_size]),
+        'buy_product_lock': _sql(Product.objects.select_for_update().filter(pk=product_id)),
+        'user_deposit_lock': _sql(User.objects.select_for_update().filter(pk=user_id)),
+    }
+
+
+def explain(sql: str, params) -> dict:
+    """
+    Run ``sql`` under ``EXPLAIN (ANALYZE, BUFFERS)`` and return the plan.
+
+    ANALYZE executes the statement, so it runs in a transaction that is
+    always rolled back; row locks taken by ``FOR UPDATE`` are released.
+    """
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}", params)
+            result = cursor.fetchone()[0]
+        transaction.set_rollback(True)
+    if isinstance(result, str):
+        result = json.loads(result)
+    return result[0]
+
+
+def _walk(node: dict) -> typing.Iterator[dict]:
+    yield node
+    for child in node.get('Plans', ()):
+        yield from _walk(child)
+
+
+def summarize(plan: dict) -> dict:
+    """
+    The parts of a plan that regressions are checked against.
+    """
+    root = plan['Plan']
+    scans = {}
+    for node in _walk(root):
+        relation = node.get('Relation Name')
+        if relation is None:
+            continue
+        # Keep the slowest access path seen for each relation.
+        if scans.get(relation) != 'Seq Scan':
+            scans[relation] = node['Node Type']
+    return {
+        'total_cost': root['Total Cost'],
+        'execution_time': plan.get('Execution Time'),
+        'shared_hit_blocks': root.get('Shared Hit Blocks', 0),
+        'shared_read_blocks': root.get('Shared Read Blocks', 0),
+        'scans': scans,
+    }
+
+
+def compare(baseline: dict, current: dict, cost_factor: float = 2.0) -> typing.List[str]:
+    """
+    Regressions in ``current`` relative to ``baseline`` (both summaries):
+    relations that went from an index to a sequential scan, and total cost
+    growing by more than ``cost_factor``.
+    """
+    problems = []
+    for relation, node in current['scans'].items():
+        before = baseline['scans'].get(relation)
+        if node == 'Seq Scan' and before in INDEX_SCANS:
+            problems.append(f"{relation}: {before} replaced by Seq Scan")
+    if baseline['total_cost'] and current['total_cost'] > baseline['total_cost'] * cost_factor:
+        problems.append(
+            f"total cost {baseline['total_cost']:.2f} -> {current['total_cost']:.2f}"
+        )
+    return problems
+
+
+def plan_path(name: str, directory=None) -> Path:
+    return Path(directory or settings.QUERY_PLAN_DIR) / f"{name}.json"
+
+
+def read_plan(name: str, directory=None) -> typing.Optional[dict]:
+    try:
+        return json.loads(plan_path(name, directory).read_text())
+    except FileNotFoundError:
+        return None
+
+
+def write_plan(name: str, sql: str, plan: dict, directory=None):
+    path = plan_path(name, directory)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({
+        'query': sql,
+        'summary': summarize(plan),
+        'plan': plan,
+    }, indent=2, sort_keys=True) + "\n")
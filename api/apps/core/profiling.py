@@ -0,0 +1,205 @@
+import asyncio
+import collections
+import os
+import re
+import sys
+import time
+import typing
+from pathlib import Path
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.utils.decorators import sync_and_async_middleware
+
+from api.apps.core.metrics import metrics
+from api.apps.core.tracing import current_span
+from api.apps.users.authentication import bearer_user_id
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+SIGNING_SALT = 'api.apps.core.profiling'
+PROFILE_ID = re.compile(r'^[0-9a-f]{32}-[0-9a-f]{16}$')
+NONCE = re.compile(r'^[0-9a-f]{32}$')
+
+
+def make_token(user_id: int) -> str:
+    """
+    A value for the ``X-Profile`` header that profiles one request made
+    with ``user_id``'s access token, valid for ``PROFILING_TOKEN_MAX_AGE``
+    seconds.
+    """
+    return signing.TimestampSigner(salt=SIGNING_SALT).sign(f"{user_id}:{os.urandom(16).hex()}")
+
+
+def _used_tokens_dir() -> Path:
+    return Path(settings.PROFILING_DIR) / 'used'
+
+
+def claim_token(token: str, user_id: typing.Optional[int]) -> bool:
+    """
+    Whether ``token`` is valid for ``user_id``, using it up if so. Tokens
+    are marked used with a file in ``PROFILING_DIR``, shared by the
+    workers on one host.
+    """
+    if user_id is None:
+        return False
+    try:
+        value = signing.TimestampSigner(salt=SIGNING_SALT).unsign(token, max_age=settings.PROFILING_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    token_user, _, nonce = value.partition(':')
+    if token_user != str(user_id) or not NONCE.match(nonce):
+        return False
+
+    used = _used_tokens_dir()
+    used.mkdir(parents=True, exist_ok=True)
+    try:
+        os.close(os.open(used / nonce, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+    except FileExistsError:
+        return False
+    return True
+
+
+def prune_used_tokens() -> int:
+    """
+    Forget used tokens that have expired anyway; returns how many.
+    """
+    cutoff = time.time() - settings.PROFILING_TOKEN_MAX_AGE
+    pruned = 0
+    for path in _used_tokens_dir().glob('*'):
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+                pruned += 1
+        except FileNotFoundError:
+            continue
+    return pruned
+
+
+def _frame_name(frame) -> str:
+    return f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_qualname}"
+
+
+def _builtin_name(func) -> str:
+    module = getattr(func, '__module__', None) or 'builtins'
+    return f"{module}:{getattr(func, '__qualname__', repr(func))}"
+
+
+class StackProfiler:
+    """
+    Deterministic profiler recording self time per call stack, written in
+    the collapsed-stack format read by ``flamegraph.pl`` and speedscope.
+
+    Hooks the calling thread only, through ``sys.setprofile``.
+    """
+
+    def __init__(self):
+        self.stack: typing.List[str] = []
+        self.totals: typing.Counter[typing.Tuple[str, ...]] = collections.Counter()
+        self._last = 0
+
+    def _record(self, frame, event, arg):
+        now = time.perf_counter_ns()
+        if self.stack:
+            self.totals[tuple(self.stack)] += now - self._last
+        if event == 'call':
+            self.stack.append(_frame_name(frame))
+        elif event == 'c_call':
+            self.stack.append(_builtin_name(arg))
+        elif self.stack:
+            # return, c_return and c_exception; frames entered before
+            # profiling started are never on the stack.
+            self.stack.pop()
+        self._last = time.perf_counter_ns()
+
+    def start(self):
+        self._last = time.perf_counter_ns()
+        sys.setprofile(self._record)
+
+    def stop(self):
+        sys.setprofile(None)
+
+    def collapsed(self) -> str:
+        """
+        One ``frame;frame;frame microseconds`` line per stack.
+        """
+        lines = []
+        for stack, nanoseconds in self.totals.items():
+            microseconds = nanoseconds // 1000
+            if microseconds:
+                lines.append(f"{';'.join(stack)} {microseconds}")
+        return "\n".join(sorted(lines)) + "\n"
+
+
+def profile_path(profile_id: str) -> Path:
+    return Path(settings.PROFILING_DIR) / f"{profile_id}.folded"
+
+
+def save_profile(profile_id: str, profiler: StackProfiler) -> Path:
+    path = profile_path(profile_id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(profiler.collapsed())
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_profile(profile_id: str) -> typing.Optional[str]:
+    if not PROFILE_ID.match(profile_id):
+        return None
+    try:
+        return profile_path(profile_id).read_text()
+    except FileNotFoundError:
+        return None
+
+
+def _profile_id() -> str:
+    # The trace id, so the profile can be found from the request's trace,
+    # plus a random part, since clients choose the trace id.
+    span = current_span()
+    trace_id = span.trace.trace_id if span is not None else os.urandom(16).hex()
+    return f"{trace_id}-{os.urandom(8).hex()}"
+
+
+def _profiled(get_response, request):
+    profile_id = _profile_id()
+    profiler = StackProfiler()
+    profiler.start()
+    try:
+        response = get_response(request)
+    finally:
+        profiler.stop()
+        save_profile(profile_id, profiler)
+    metrics.incr('profiling.requests')
+    response['X-Profile-Id'] = profile_id
+    return response
+
+
+@sync_and_async_middleware
+def profiling_middleware(get_response):
+    """
+    Profiles requests that carry a valid signed ``X-Profile`` header (see
+    ``python manage.py profile_token``) and the access token of the user it
+    was issued for, storing the profile under the id returned in
+    ``X-Profile-Id``. Each token profiles one request. Other requests only
+    pay for the header lookup.
+
+    Under ASGI the profiled request is moved onto one worker thread, and the
+    sync views below run in that same thread, so the profile covers
+    authentication, views and serializers.
+    """
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request):
+            if PROFILE_HEADER not in request.META or not claim_token(
+                request.META[PROFILE_HEADER], bearer_user_id(request)
+            ):
+                return await get_response(request)
+            return await sync_to_async(_profiled)(async_to_sync(get_response), request)
+    else:
+        def middleware(request):
+            if PROFILE_HEADER not in request.META or not claim_token(
+                request.META[PROFILE_HEADER], bearer_user_id(request)
+            ):
+                return get_response(request)
+            return _profiled(get_response, request)
+    return middleware
@@ -0,0 +1,101 @@
+import gzip
+import hashlib
+import typing
+
+from django.conf import settings
+from drf_yasg import openapi
+from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+from drf_yasg.generators import OpenAPISchemaGenerator
+
+API_INFO = openapi.Info(
+    title="Vendease API",
+    default_version='v1',
+    description="API documentation",
+    terms_of_service="https://www.google.com/policies/terms/",
+    contact=openapi.Contact(email="newtonjohn043@gmail.com"),
+    license=openapi.License(name="BSD License"),
+)
+
+SCHEMA_FORMATS = {
+    '.json': ('openapi.json', 'application/json; charset=utf-8'),
+    '.yaml': ('openapi.yaml', 'application/yaml; charset=utf-8'),
+}
+CHECKSUM_FILE = 'openapi.sha256'
+
+
+def generate_schema() -> typing.Dict[str, bytes]:
+    """
+    Walk every view and serializer once and render the schema in each format.
+    """
+    generator = OpenAPISchemaGenerator(API_INFO)
+    schema = generator.get_schema(request=None, public=True)
+    return {
+        '.json': OpenAPICodecJson(validators=[]).encode(schema),
+        '.yaml': OpenAPICodecYaml(validators=[]).encode(schema),
+    }
+
+
+def checksum(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def render_checksums(documents: typing.Dict[str, bytes]) -> str:
+    """
+    Checksums in ``sha256sum`` format so the stored files can be verified with it too.
+    """
+    return "".join(
+        f"{checksum(documents[fmt])}  {filename}\n"
+        for fmt, (filename, _) in sorted(SCHEMA_FORMATS.items())
+    )
+
+
+def write_schema(documents: typing.Dict[str, bytes]):
+    directory = settings.SCHEMA_DIR
+    directory.mkdir(parents=True, exist_ok=True)
+    for fmt, (filename, _) in SCHEMA_FORMATS.items():
+        (directory / filename).write_bytes(documents[fmt])
+    (directory / CHECKSUM_FILE).write_text(render_checksums(documents))
+
+
+def read_checksums() -> typing.Optional[str]:
+    path = settings.SCHEMA_DIR / CHECKSUM_FILE
+    if not path.exists():
+        return None
+    return path.read_text()
+
+
+class SchemaDocument:
+    """
+    A rendered schema held in memory together with its gzipped form and ETag.
+    """
+
+    def __init__(self, content: bytes, content_type: str):
+        self.content = content
+        self.compressed = gzip.compress(content, mtime=0)
+        self.content_type = content_type
+        self.etag = f'W/"{checksum(content)}"'
+
+
+_documents: typing.Dict[str, SchemaDocument] = {}
+
+
+def get_document(fmt: str) -> SchemaDocument:
+    """
+    Return the stored schema for ``fmt``, loading it from disk on first use.
+
+    If nothing has been generated yet the schema is built once in-process,
+    so a missing file degrades to a one-off cost rather than per request.
+    """
+    if fmt not in _documents:
+        filename, content_type = SCHEMA_FORMATS[fmt]
+        path = settings.SCHEMA_DIR / filename
+        if path.exists():
+            content = path.read_bytes()
+        else:
+            content = generate_schema()[fmt]
+        _documents[fmt] = SchemaDocument(content, content_type)
+    return _documents[fmt]
+
+
+def clear_documents():
+    _documents.clear()
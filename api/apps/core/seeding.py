@@ -0,0 +1,162 @@
+import csv
+import io
+import itertools
+import random
+import time
+import typing
+import uuid
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+
+def zipf_cum_weights(n: int, exponent: float) -> typing.List[float]:
+    """
+    Cumulative Zipf weights for ranks 1..n, for ``random.choices``.
+    """
+    return list(itertools.accumulate(1.0 / rank ** exponent for rank in range(1, n + 1)))
+
+
+def zipf_share(cum_weights: typing.List[float], rank: int) -> float:
+    """
+    Fraction of the total weight held by the 0-based ``rank``.
+    """
+    previous = cum_weights[rank - 1] if rank else 0.0
+    return (cum_weights[rank] - previous) / cum_weights[-1]
+
+
+def _copy_rows(model, objs, fields):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC)
+    for obj in objs:
+        writer.writerow([
+            field.get_db_prep_save(getattr(obj, field.attname), connection) for field in fields
+        ])
+    buffer.seek(0)
+
+    columns = ", ".join(connection.ops.quote_name(field.column) for field in fields)
+    table = connection.ops.quote_name(model._meta.db_table)
+    options = "FORMAT csv"
+    # The writer quotes None as "", which COPY would load as an empty string.
+    nullable = [connection.ops.quote_name(field.column) for field in fields if field.null]
+    if nullable:
+        options += f", FORCE_NULL ({', '.join(nullable)})"
+    with connection.cursor() as cursor:
+        cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN WITH ({options})", buffer)
+
+
+def write_rows(model, objs: typing.Iterable, batch_size: int) -> int:
+    """
+    Insert unsaved model instances in batches, with ``COPY`` on Postgres and
+    ``bulk_create`` elsewhere. Returns the number of rows written.
+    """
+    fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+    written = 0
+    iterator = iter(objs)
+    while True:
+        batch = list(itertools.islice(iterator, batch_size))
+        if not batch:
+            return written
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                _copy_rows(model, batch, fields)
+            else:
+                model.objects.bulk_create(batch, batch_size=batch_size)
+        written += len(batch)
+
+
+class Seeder:
+    """
+    Deterministic benchmark dataset generator.
+
+    The same ``seed`` and sizes always produce the same rows, so runs against
+    different schema or index changes are comparable.
+    """
+
+    def __init__(self, seed: int = 0, prefix: str = 'seed', batch_size: int = 10000,
+                 zipf_exponent: float = 1.1, password_hash: str = '', log=None):
+        self.rng = random.Random(seed)
+        self.prefix = prefix
+        self.batch_size = batch_size
+        self.zipf_exponent = zipf_exponent
+        self.password_hash = password_hash
+        self.now = timezone.now()
+        self.log = log or (lambda message: None)
+
+    def _timed(self, label: str, model, objs) -> int:
+        started = time.perf_counter()
+        count = write_rows(model, objs, self.batch_size)
+        elapsed = time.perf_counter() - started
+        self.log(f"{label}: {count} rows in {elapsed:.1f}s ({count / elapsed if elapsed else 0:.0f} rows/s)")
+        return count
+
+    def _ids(self, model, **lookup) -> typing.List[int]:
+        return list(model.objects.filter(**lookup).order_by('pk').values_list('pk', flat=True))
+
+    def users(self, role: str, count: int) -> typing.List[int]:
+        from api.apps.users.models import User
+
+        def rows():
+            for i in range(count):
+                yield User(
+                    username=f"{self.prefix}_{role}_{i}",
+                    password=self.password_hash,
+                    role=role,
+                    deposit=self.rng.choice((0, 0, 5, 10, 20, 50, 100, 250)) if role == 'buyer' else 0,
+                    date_joined=self.now,
+                )
+
+        self._timed(f"{role}s", User, rows())
+        return self._ids(User, username__startswith=f"{self.prefix}_{role}_")
+
+    def products(self, seller_ids: typing.List[int], count: int) -> int:
+        """
+        Products whose owners and stock follow a Zipf distribution: a few
+        sellers own most of the catalog, and low-ranked (popular) products
+        carry the most stock.
+        """
+        from api.apps.products.models import Product
+
+        seller_weights = zipf_cum_weights(len(seller_ids), self.zipf_exponent)
+        product_weights = zipf_cum_weights(count, self.zipf_exponent)
+        owners = self.rng.choices(seller_ids, cum_weights=seller_weights, k=count)
+
+        def rows():
+            for rank, seller_id in enumerate(owners):
+                share = zipf_share(product_weights, rank)
+                yield Product(
+                    seller_id=seller_id,
+                    name=f"{self.prefix} product {rank}",
+                    cost=self.rng.randint(1, 60) * 5,
+                    amount_available=max(1, int(share * count * 50)),
+                    created_at=self.now,
+                    updated_at=self.now,
+                )
+
+        return self._timed("products", Product, rows())
+
+    def sessions(self, user_ids: typing.List[int], count: int) -> int:
+        """
+        Sessions concentrated on the most active users, with expiry dates
+        spread from a day in the past (already expired) to a week ahead.
+        """
+        from api.apps.users.models import ActiveSession
+
+        weights = zipf_cum_weights(len(user_ids), self.zipf_exponent)
+        owners = self.rng.choices(user_ids, cum_weights=weights, k=count)
+
+        def rows():
+            for user_id in owners:
+                expiry = self.now + timedelta(seconds=self.rng.randint(-86400, 7 * 86400))
+                yield ActiveSession(
+                    user_id=user_id,
+                    session_id=uuid.UUID(int=self.rng.getrandbits(128), version=4),
+                    ip_address=f"10.{self.rng.randint(0, 255)}.{self.rng.randint(0, 255)}.{self.rng.randint(1, 254)}",
+                    user_agent="seed-data",
+                    created_at=self.now,
+                    last_activity=self.now,
+                    expiry_date=expiry,
+                )
+
+        return self._timed("sessions", ActiveSession, rows())
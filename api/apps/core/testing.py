@@ -0,0 +1,18 @@
+from django.test.runner import DiscoverRunner
+
+from api.apps.core.buffering import WriteBehindBuffer
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Runs write-behind buffers inline rather than on their flusher threads,
+    whose separate connections would write outside the test's transaction.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        WriteBehindBuffer.inline_only = True
+
+    def teardown_test_environment(self, **kwargs):
+        WriteBehindBuffer.inline_only = False
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,603 @@
+import asyncio
+import io
+import tempfile
+import threading
+from unittest import mock, skipUnless
+
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, transaction
+from django.db.models import F, QuerySet
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from api.apps.core.admission import AsyncLimiter, SyncLimiter, route_class
+from api.apps.core.buffering import WriteBehindBuffer
+from api.apps.core.db import run_in_transaction, update_or_insert
+from api.apps.core.health import CHECKS, readiness
+from api.apps.core.lanes import AsyncLanes, LaneFull, SyncLanes, lane_key, sync_lanes
+from api.apps.core.metrics import metrics
+from api.apps.core.profiling import claim_token, make_token, read_profile
+from api.apps.core.plans import compare, hot_queries, summarize
+from api.apps.core.tracing import HttpSpanExporter, MemorySpanExporter
+from api.apps.core.seeding import _copy_rows
+from api.apps.core.schema import clear_documents, get_document
+from api.apps.products.leaderboard import sales_counter
+from api.apps.products.models import Product, SellerStats
+from api.apps.users.models import ActiveSession, User
+
+
+
+def tearDownModule():
+    sales_counter.discard()
+
+
+class FakePgError(Exception):
+    def __init__(self, pgcode):
+        super().__init__(pgcode)
+        self.pgcode = pgcode
+
+
+def database_error(pgcode):
+    error = OperationalError(pgcode)
+    error.__cause__ = FakePgError(pgcode)
+    return error
+
+
+class SchemaViewTests(TestCase):
+    """
+    Test the pre-generated OpenAPI schema routes.
+    """
+    def setUp(self):
+        clear_documents()
+        self.url = reverse("schema-json", kwargs={"format": ".json"})
+
+    def test_schema_served_with_etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["ETag"], get_document(".json").etag)
+        self.assertIn(b'"swagger"', response.content)
+
+    def test_schema_not_modified(self):
+        etag = self.client.get(self.url)["ETag"]
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+
+    def test_schema_compressed(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response.content, get_document(".json").compressed)
+
+    def test_yaml_schema(self):
+        response = self.client.get(reverse("schema-json", kwargs={"format": ".yaml"}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response["Content-Type"].startswith("application/yaml"))
+
+
+class HealthTests(TestCase):
+    def setUp(self):
+        readiness.clear()
+        self.addCleanup(readiness.clear)
+
+    def test_liveness_does_no_io(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("healthz"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {"status": "ok"})
+
+    def test_readiness_is_cached(self):
+        response = self.client.get(reverse("readyz"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["checks"], {"database": "ok", "migrations": "ok"})
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("readyz"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_not_ready(self):
+        with mock.patch.dict(CHECKS, database=lambda: "OperationalError: connection refused"):
+            response = self.client.get(reverse("readyz"))
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(
+            response.json()["checks"],
+            {"database": "OperationalError: connection refused", "migrations": "skipped"},
+        )
+
+
+class AdmissionTests(SimpleTestCase):
+    def test_route_classes(self):
+        factory = RequestFactory()
+        self.assertEqual(route_class(factory.post("/api/products/buy/")), "money")
+        self.assertEqual(route_class(factory.post("/api/machines/3/deposit/")), "money")
+        self.assertEqual(route_class(factory.post("/api/users/login/")), "auth")
+        self.assertEqual(route_class(factory.get("/api/products/12/")), "catalog")
+        self.assertIsNone(route_class(factory.get("/api/products/stream/")))
+        self.assertIsNone(route_class(factory.get("/readyz")))
+
+    def test_sync_limiter(self):
+        limiter = SyncLimiter("test", concurrency=1, queue=1, timeout=0.01)
+        self.assertTrue(limiter.acquire())
+        self.assertFalse(limiter.acquire())
+        limiter.queue = 0
+        self.assertFalse(limiter.acquire())
+        limiter.release()
+        self.assertTrue(limiter.acquire())
+
+    def test_async_limiter_hands_slots_over_in_order(self):
+        async def scenario():
+            limiter = AsyncLimiter("test", concurrency=1, queue=1, timeout=1)
+            self.assertTrue(await limiter.acquire())
+            waiter = asyncio.ensure_future(limiter.acquire())
+            await asyncio.sleep(0)
+            self.assertFalse(await limiter.acquire())
+            limiter.release()
+            self.assertTrue(await waiter)
+            self.assertEqual(limiter.active, 1)
+
+            limiter.timeout = 0.01
+            self.assertFalse(await limiter.acquire())
+            limiter.release()
+            self.assertEqual(limiter.active, 0)
+
+        asyncio.run(scenario())
+
+
+class AdmissionMiddlewareTests(TestCase):
+    def setUp(self):
+        metrics.reset()
+
+    def test_saturated_class_is_shed(self):
+        limits = {
+            "money": {"concurrency": 0, "queue": 0, "timeout": 0},
+            "catalog": {"concurrency": 1, "queue": 0, "timeout": 0},
+            "auth": {"concurrency": 1, "queue": 0, "timeout": 0},
+        }
+        with override_settings(ADMISSION_LIMITS=limits):
+            response = self.client.post(reverse("deposit"), {"amount": 5})
+            self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+            self.assertEqual(response["Retry-After"], "1")
+            self.assertEqual(metrics.snapshot()["counters"]["admission.money.rejected"], 1)
+
+            response = self.client.get(reverse("product-list"))
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.enterContext(override_settings(PROFILING_DIR=directory.name))
+        self.admin = User.objects.create_user(username="admin", password="password", role="buyer", is_staff=True)
+
+    def login(self):
+        response = self.client.post(reverse("token_obtain_pair"), {"username": "admin", "password": "password"})
+        return f"Bearer {response.data['access']}"
+
+    def test_signed_header_profiles_request(self):
+        authorization = self.login()
+        response = self.client.get(
+            reverse("user_view"), HTTP_AUTHORIZATION=authorization, HTTP_X_PROFILE=make_token(self.admin.pk)
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        profile_id = response["X-Profile-Id"]
+        profile = read_profile(profile_id)
+        self.assertIn("api.apps.users.authentication:SessionAuthentication.get_user", profile)
+        self.assertRegex(profile.splitlines()[0], r"^\S+ \d+$")
+
+        response = self.client.get(reverse("profile", args=[profile_id]), HTTP_AUTHORIZATION=authorization)
+        self.assertEqual(response.content.decode(), profile)
+
+    def test_unsigned_header_ignored(self):
+        response = self.client.get(reverse("healthz"), HTTP_X_PROFILE="profile:forged")
+        self.assertNotIn("X-Profile-Id", response)
+        response = self.client.get(reverse("healthz"))
+        self.assertNotIn("X-Profile-Id", response)
+
+    def test_token_is_single_use_and_bound_to_user(self):
+        authorization = self.login()
+        token = make_token(self.admin.pk)
+        self.assertNotIn("X-Profile-Id", self.client.get(reverse("healthz"), HTTP_X_PROFILE=token))
+        other = self.client.get(
+            reverse("user_view"), HTTP_AUTHORIZATION=authorization, HTTP_X_PROFILE=make_token(self.admin.pk + 1)
+        )
+        self.assertNotIn("X-Profile-Id", other)
+
+        traceparent = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+        first = self.client.get(
+            reverse("user_view"), HTTP_AUTHORIZATION=authorization, HTTP_X_PROFILE=token, HTTP_TRACEPARENT=traceparent
+        )
+        self.assertTrue(first["X-Profile-Id"].startswith("4bf92f3577b34da6a3ce929d0e0e4736-"))
+        again = self.client.get(reverse("user_view"), HTTP_AUTHORIZATION=authorization, HTTP_X_PROFILE=token)
+        self.assertNotIn("X-Profile-Id", again)
+
+        second = self.client.get(
+            reverse("user_view"), HTTP_AUTHORIZATION=authorization,
+            HTTP_X_PROFILE=make_token(self.admin.pk), HTTP_TRACEPARENT=traceparent,
+        )
+        self.assertNotEqual(second["X-Profile-Id"], first["X-Profile-Id"])
+        self.assertIsNotNone(read_profile(first["X-Profile-Id"]))
+
+    def test_profile_token_command(self):
+        output = io.StringIO()
+        call_command("profile_token", user="admin", stdout=output)
+        self.assertTrue(claim_token(output.getvalue().strip(), self.admin.pk))
+        with self.assertRaises(CommandError):
+            call_command("profile_token", user="nobody")
+
+
+class LaneTests(SimpleTestCase):
+    def test_async_lane_runs_in_order(self):
+        async def scenario():
+            lanes = AsyncLanes()
+            order = []
+
+            async def run(name):
+                async with lanes.lane(1, max_pending=1):
+                    order.append(name)
+                    await asyncio.sleep(0)
+                    order.append(name)
+
+            first, second = asyncio.ensure_future(run("a")), asyncio.ensure_future(run("b"))
+            await asyncio.sleep(0)
+            with self.assertRaises(LaneFull):
+                async with lanes.lane(1, max_pending=1):
+                    pass
+            async with lanes.lane(2, max_pending=0):
+                pass
+            await asyncio.gather(first, second)
+            self.assertEqual(order, ["a", "a", "b", "b"])
+            self.assertEqual(len(lanes), 0)
+
+        asyncio.run(scenario())
+
+    def test_sync_lane_dropped_when_idle(self):
+        lanes = SyncLanes()
+        with lanes.lane(1, max_pending=0):
+            self.assertEqual(len(lanes), 1)
+            with self.assertRaises(LaneFull):
+                with lanes.lane(1, max_pending=0):
+                    pass
+        self.assertEqual(len(lanes), 0)
+
+
+class LaneMiddlewareTests(TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.buyer = User.objects.create_user(username="buyer", password="password", role="buyer")
+        response = self.client.post(reverse("token_obtain_pair"), {"username": "buyer", "password": "password"})
+        self.authorization = f"Bearer {response.data['access']}"
+
+    def test_lane_keyed_on_verified_token(self):
+        factory = RequestFactory()
+        request = factory.post(reverse("deposit"), HTTP_AUTHORIZATION=self.authorization)
+        self.assertEqual(lane_key(request), self.buyer.pk)
+        request = factory.post(reverse("deposit"), HTTP_AUTHORIZATION="Bearer forged")
+        self.assertIsNone(lane_key(request))
+        request = factory.get(reverse("product-list"), HTTP_AUTHORIZATION=self.authorization)
+        self.assertIsNone(lane_key(request))
+
+    @override_settings(USER_LANE_MAX_PENDING=0)
+    def test_busy_lane_rejects(self):
+        response = self.client.post(reverse("deposit"), {"amount": 5}, HTTP_AUTHORIZATION=self.authorization)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        with sync_lanes.lane(self.buyer.pk, max_pending=0):
+            response = self.client.post(reverse("deposit"), {"amount": 5}, HTTP_AUTHORIZATION=self.authorization)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response["Retry-After"], "1")
+        self.assertEqual(metrics.snapshot()["counters"]["lanes.rejected"], 1)
+        self.assertEqual(len(sync_lanes), 0)
+
+
+class ListBuffer(WriteBehindBuffer):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.written = []
+        self.done = threading.Event()
+
+    def write(self, items):
+        self.written.append((threading.current_thread(), items))
+        self.done.set()
+
+
+class WriteBehindBufferTests(SimpleTestCase):
+    @mock.patch.object(WriteBehindBuffer, "inline_only", False)
+    def test_background_flush_leaves_caller(self):
+        buffer = ListBuffer(interval=0, background=True)
+        buffer.add("a", 1)
+        self.assertTrue(buffer.done.wait(5))
+        thread, items = buffer.written[0]
+        self.assertIsNot(thread, threading.current_thread())
+        self.assertEqual(items, {"a": 1})
+
+    def test_inline_flush(self):
+        buffer = ListBuffer(interval=0)
+        buffer.add("a", 1)
+        self.assertEqual(buffer.written, [(threading.current_thread(), {"a": 1})])
+
+
+@override_settings(TRANSACTION_RETRY_BACKOFF=0, TRANSACTION_MAX_ATTEMPTS=3)
+class TransactionRunnerTests(TransactionTestCase):
+    """
+    Test retries of serialization failures and deadlocks.
+    """
+    def setUp(self):
+        metrics.reset()
+
+    def test_retries_deadlock(self):
+        calls = []
+
+        def work():
+            calls.append(1)
+            if len(calls) < 3:
+                raise database_error("40P01")
+            return "done"
+
+        self.assertEqual(run_in_transaction(work, name="test"), "done")
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(metrics.snapshot()["counters"]["txn.test.retries"], 2)
+
+    def test_gives_up_after_max_attempts(self):
+        calls = []
+
+        def work():
+            calls.append(1)
+            raise database_error("40001")
+
+        with self.assertRaises(OperationalError):
+            run_in_transaction(work, name="test")
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(metrics.snapshot()["counters"]["txn.test.exhausted"], 1)
+
+    def test_other_errors_not_retried(self):
+        calls = []
+
+        def work():
+            calls.append(1)
+            raise database_error("23505")
+
+        with self.assertRaises(OperationalError):
+            run_in_transaction(work, name="test")
+        self.assertEqual(len(calls), 1)
+
+    def test_nested_runs_once(self):
+        calls = []
+
+        def work():
+            calls.append(1)
+            raise database_error("40P01")
+
+        with self.assertRaises(OperationalError):
+            with transaction.atomic():
+                run_in_transaction(work, name="test")
+        self.assertEqual(len(calls), 1)
+
+
+class UpdateOrInsertTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username="seller", password="pass", role="seller")
+        SellerStats.objects.filter(seller=self.seller).delete()
+
+    def add(self, value):
+        update_or_insert(
+            SellerStats, {"seller_id": self.seller.pk},
+            {"total_stock": F("total_stock") + value}, {"total_stock": value},
+        )
+
+    def test_inserts_then_updates(self):
+        self.add(3)
+        self.add(4)
+        self.assertEqual(SellerStats.objects.get(seller=self.seller).total_stock, 7)
+
+    def test_lost_insert_race_updates_winner(self):
+        SellerStats.objects.create(seller=self.seller, total_stock=3)
+        update = QuerySet.update
+        calls = []
+
+        def racing_update(queryset, **kwargs):
+            # The first UPDATE runs before the other transaction's row is visible.
+            calls.append(kwargs)
+            return 0 if len(calls) == 1 else update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, "update", autospec=True, side_effect=racing_update):
+            self.add(4)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(SellerStats.objects.get(seller=self.seller).total_stock, 7)
+
+
+class SeedDataTests(TestCase):
+    """
+    Test the benchmark dataset generator.
+    """
+    def seed(self, prefix, seed=7):
+        call_command(
+            "seed_data", buyers=20, sellers=5, products=50, sessions=30,
+            seed=seed, prefix=prefix, batch_size=16, stdout=io.StringIO(),
+        )
+
+    def test_counts_and_shared_password_hash(self):
+        self.seed("a")
+        users = User.objects.filter(username__startswith="a_")
+        self.assertEqual(users.count(), 25)
+        self.assertEqual(users.values("password").distinct().count(), 1)
+        self.assertTrue(users.first().check_password("SeedPassword123!"))
+        self.assertEqual(Product.objects.count(), 50)
+        self.assertEqual(ActiveSession.all_objects.count(), 30)
+
+    def test_deterministic(self):
+        def dataset():
+            return (
+                list(Product.objects.order_by("pk").values_list("seller__username", "cost", "amount_available")),
+                list(ActiveSession.all_objects.order_by("pk").values_list("session_id", "user__username")),
+            )
+
+        self.seed("a")
+        first = dataset()
+        User.objects.filter(username__startswith="a_").delete()
+        self.seed("a")
+        self.assertEqual(dataset(), first)
+
+    def test_popularity_is_skewed(self):
+        self.seed("a")
+        stock = list(Product.objects.order_by("pk").values_list("amount_available", flat=True))
+        self.assertGreater(stock[0], stock[-1] * 10)
+
+    def test_copy_loads_none_as_null(self):
+        seller = User.objects.create_user(username="seller", password="pass", role="seller")
+        fields = [field for field in Product._meta.concrete_fields if not field.primary_key]
+        with mock.patch.object(connection, "cursor") as cursor:
+            _copy_rows(Product, [Product(seller=seller, name="Cola", cost=5, amount_available=1)], fields)
+        sql, buffer = cursor.return_value.__enter__.return_value.copy_expert.call_args.args
+        self.assertIn('FORCE_NULL ("machine_id", "retired_at")', sql)
+        self.assertIn(',"",', buffer.getvalue())
+
+    @skipUnless(connection.vendor == "postgresql", "COPY needs Postgres")
+    def test_copy_on_postgres(self):
+        self.seed("a")
+        self.assertFalse(Product.objects.filter(machine__isnull=False).exists())
+        self.assertFalse(User.objects.filter(username__startswith="a_", last_login__isnull=False).exists())
+
+
+def plan(node_type, relation="products", cost=10.0, index=None):
+    node = {"Node Type": node_type, "Relation Name": relation, "Total Cost": cost}
+    if index:
+        node["Index Name"] = index
+    return {"Plan": {"Node Type": "Limit", "Total Cost": cost, "Plans": [node]}, "Execution Time": 0.1}
+
+
+class QueryPlanTests(SimpleTestCase):
+    """
+    Test query plan summaries and regression checks.
+    """
+    def test_summary(self):
+        summary = summarize(plan("Index Scan", index="products_pkey"))
+        self.assertEqual(summary["scans"], {"products": "Index Scan"})
+        self.assertEqual(summary["total_cost"], 10.0)
+
+    def test_seq_scan_regression(self):
+        baseline = summarize(plan("Index Scan"))
+        problems = compare(baseline, summarize(plan("Seq Scan")))
+        self.assertEqual(problems, ["products: Index Scan replaced by Seq Scan"])
+
+    def test_cost_regression(self):
+        baseline = summarize(plan("Index Scan", cost=10.0))
+        self.assertEqual(compare(baseline, summarize(plan("Index Scan", cost=15.0))), [])
+        self.assertEqual(len(compare(baseline, summarize(plan("Index Scan", cost=25.0)))), 1)
+
+    def test_check_fails_without_baseline(self):
+        command = "api.apps.core.management.commands.capture_query_plans"
+        queries = {"session_lookup": ("SELECT 1", []), "product_list_page": ("SELECT 2", [])}
+        with (
+            tempfile.TemporaryDirectory() as directory,
+            mock.patch(f"{command}.connection.vendor", "postgresql"),
+            mock.patch(f"{command}.hot_queries", return_value=queries),
+            mock.patch(f"{command}.explain", return_value=plan("Index Scan")),
+        ):
+            call_command("capture_query_plans", "--only", "session_lookup", output=directory, stdout=io.StringIO())
+            call_command("capture_query_plans", "--check", "--only", "session_lookup", output=directory,
+                         stdout=io.StringIO())
+
+            stdout = io.StringIO()
+            with self.assertRaisesMessage(CommandError, "1 query plan(s) have no stored baseline"):
+                call_command("capture_query_plans", "--check", output=directory, stdout=stdout)
+            self.assertIn("no stored plan for product_list_page", stdout.getvalue())
+
+
+class HotQueryTests(TestCase):
+    def test_hot_queries_need_postgres_and_data(self):
+        with self.assertRaises(CommandError):
+            call_command("capture_query_plans", stdout=io.StringIO())
+
+        call_command(
+            "seed_data", buyers=5, sellers=2, products=10, sessions=10, prefix="p", stdout=io.StringIO(),
+        )
+        queries = hot_queries()
+        self.assertIn("session_lookup", queries)
+        self.assertIn("LIMIT", queries["product_list_page"][0])
+
+
+class TracingTests(TestCase):
+    """
+    Test request tracing and OTLP export.
+    """
+    def setUp(self):
+        self.exporter = MemorySpanExporter(interval=3600)
+        patcher = mock.patch("api.apps.core.tracing._exporter", self.exporter)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.exporter.discard)
+
+        seller = User.objects.create_user(username="seller", password="pass", role="seller")
+        self.product = Product.objects.create(name="Cola", cost=50, amount_available=5, seller=seller)
+        User.objects.create_user(username="buyer", password="pass", role="buyer", deposit=100)
+        response = self.client.post(
+            reverse("token_obtain_pair"), {"username": "buyer", "password": "pass"}, content_type="application/json"
+        )
+        self.token = response.json()["access"]
+
+    def buy(self, **headers):
+        return self.client.post(
+            reverse("buy_product"), {"product": self.product.pk, "quantity": 1},
+            content_type="application/json", HTTP_AUTHORIZATION=f"Bearer {self.token}", **headers
+        )
+
+    def exported_spans(self):
+        self.exporter.flush()
+        return [
+            span
+            for payload in self.exporter.exported
+            for resource in payload["resourceSpans"]
+            for scope in resource["scopeSpans"]
+            for span in scope["spans"]
+        ]
+
+    @override_settings(TRACING_SAMPLE_RATE=1.0)
+    def test_sampled_request_exports_spans(self):
+        response = self.buy()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        spans = self.exported_spans()
+        trace_ids = {span["traceId"] for span in spans}
+        self.assertEqual(trace_ids, {response["X-Trace-Id"]})
+        names = {span["name"] for span in spans}
+        self.assertTrue({
+            "POST /api/products/buy/", "auth.jwt", "auth.session", "auth.permissions",
+            "serializer.validate", "db.query", "render",
+        } <= names)
+
+        root = next(span for span in spans if "parentSpanId" not in span)
+        self.assertEqual(response["traceparent"], f"00-{root['traceId']}-{root['spanId']}-01")
+        span_ids = {span["spanId"] for span in spans}
+        self.assertTrue(all(span["parentSpanId"] in span_ids for span in spans if span is not root))
+
+    def test_unsampled_request_only_propagates_ids(self):
+        response = self.buy()
+        self.assertRegex(response["traceparent"], r"^00-[0-9a-f]{32}-[0-9a-f]{16}-00$")
+        self.assertEqual(self.exported_spans(), [])
+
+    def test_incoming_traceparent_continues_trace(self):
+        trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+        response = self.buy(HTTP_TRACEPARENT=f"00-{trace_id}-00f067aa0ba902b7-01")
+        self.assertEqual(response["X-Trace-Id"], trace_id)
+        root = next(span for span in self.exported_spans() if span["kind"] == 2)
+        self.assertEqual(root["parentSpanId"], "00f067aa0ba902b7")
+
+    @override_settings(TRACING_SAMPLE_RATE=1.0)
+    @mock.patch.object(WriteBehindBuffer, "inline_only", False)
+    def test_http_export_off_request_thread(self):
+        exporter = HttpSpanExporter("http://collector.invalid/v1/traces", interval=0)
+        delivered = threading.Event()
+        threads = []
+
+        def urlopen(request, timeout):
+            threads.append(threading.current_thread())
+            delivered.set()
+            return mock.MagicMock()
+
+        with mock.patch("api.apps.core.tracing._exporter", exporter), \
+                mock.patch("urllib.request.urlopen", side_effect=urlopen):
+            self.buy()
+            self.assertTrue(delivered.wait(5))
+        self.assertNotIn(threading.current_thread(), threads)
@@ -0,0 +1,334 @@
+import asyncio
+import contextvars
+import fcntl
+import json
+import os
+import random
+import re
+import time
+import typing
+import urllib.request
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.utils.decorators import sync_and_async_middleware
+from rest_framework.renderers import JSONRenderer
+
+from api.apps.core.buffering import WriteBehindBuffer
+
+# OTLP span kinds
+INTERNAL, SERVER, CLIENT = 1, 2, 3
+# OTLP status codes
+STATUS_OK, STATUS_ERROR = 1, 2
+
+TRACEPARENT = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+
+# Longest SQL kept on a database span.
+MAX_STATEMENT_LENGTH = 2000
+
+
+class Trace:
+    def __init__(self, trace_id: str, sampled: bool):
+        self.trace_id = trace_id
+        self.sampled = sampled
+        self.spans: typing.List['Span'] = []
+
+
+class Span:
+    """
+    A timed operation within a trace.
+    """
+    __slots__ = ('trace', 'name', 'span_id', 'parent_id', 'kind', 'attributes', 'start', 'end', 'error')
+
+    def __init__(self, trace: Trace, name: str, parent_id: typing.Optional[str] = None,
+                 kind: int = INTERNAL, attributes: typing.Optional[dict] = None):
+        self.trace = trace
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = attributes or {}
+        self.start = time.time_ns()
+        self.end = None
+        self.error = None
+
+    def set(self, key: str, value):
+        self.attributes[key] = value
+
+    def finish(self):
+        self.end = time.time_ns()
+        self.trace.spans.append(self)
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace.trace_id}-{self.span_id}-{'01' if self.trace.sampled else '00'}"
+
+    def as_otlp(self) -> dict:
+        span = {
+            'traceId': self.trace.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': self.kind,
+            'startTimeUnixNano': str(self.start),
+            'endTimeUnixNano': str(self.end),
+            'attributes': [_otlp_attribute(key, value) for key, value in self.attributes.items()],
+            'status': {'code': STATUS_ERROR, 'message': self.error} if self.error else {'code': STATUS_OK},
+        }
+        if self.parent_id:
+            span['parentSpanId'] = self.parent_id
+        return span
+
+
+def _otlp_attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        return {'key': key, 'value': {'boolValue': value}}
+    if isinstance(value, int):
+        return {'key': key, 'value': {'intValue': str(value)}}
+    if isinstance(value, float):
+        return {'key': key, 'value': {'doubleValue': value}}
+    return {'key': key, 'value': {'stringValue': str(value)}}
+
+
+def otlp_request(spans: typing.Iterable[Span]) -> dict:
+    """
+    An OTLP/JSON ``ExportTraceServiceRequest`` holding ``spans``.
+    """
+    return {
+        'resourceSpans': [{
+            'resource': {'attributes': [_otlp_attribute('service.name', settings.TRACING_SERVICE_NAME)]},
+            'scopeSpans': [{
+                'scope': {'name': __name__},
+                'spans': [span.as_otlp() for span in spans],
+            }],
+        }],
+    }
+
+
+_current: contextvars.ContextVar[typing.Optional[Span]] = contextvars.ContextVar('current_span', default=None)
+
+
+def current_span() -> typing.Optional[Span]:
+    return _current.get()
+
+
+def is_recording() -> bool:
+    span = _current.get()
+    return span is not None and span.trace.sampled
+
+
+@contextmanager
+def span(name: str, kind: int = INTERNAL, **attributes):
+    """
+    Time the block as a child of the current span. Does nothing outside a
+    sampled trace.
+    """
+    parent = _current.get()
+    if parent is None or not parent.trace.sampled:
+        yield None
+        return
+
+    child = Span(parent.trace, name, parent.span_id, kind, attributes)
+    token = _current.set(child)
+    try:
+        yield child
+    except Exception as exc:
+        child.error = f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        child.finish()
+        _current.reset(token)
+
+
+def trace_db(execute, sql, params, many, context):
+    """
+    Database execute wrapper recording each statement as a client span.
+    """
+    if not is_recording():
+        return execute(sql, params, many, context)
+    connection = context['connection']
+    attributes = {
+        'db.system': connection.vendor,
+        'db.statement': sql[:MAX_STATEMENT_LENGTH],
+    }
+    if 'FOR UPDATE' in sql:
+        # Time spent here is mostly waiting for the row lock.
+        attributes['db.lock'] = True
+    with span('db.query', kind=CLIENT, **attributes):
+        return execute(sql, params, many, context)
+
+
+def install_db_tracing(sender, connection, **kwargs):
+    if trace_db not in connection.execute_wrappers:
+        connection.execute_wrappers.append(trace_db)
+
+
+class SpanExporter(WriteBehindBuffer):
+    """
+    Batches finished traces and hands them to ``deliver`` as one OTLP/JSON
+    request per flush. File and HTTP exporters deliver from a background
+    thread, so a slow disk or collector never delays a request.
+    """
+
+    def merge(self, old, new):
+        return old + new
+
+    def write(self, items):
+        self.deliver(otlp_request(span for spans in items.values() for span in spans))
+
+    def deliver(self, payload: dict):
+        raise NotImplementedError
+
+
+class FileSpanExporter(SpanExporter):
+    """
+    Appends one JSON line per batch to a file shared by all workers.
+    """
+
+    def __init__(self, path, interval: float):
+        super().__init__(interval, background=True)
+        self.path = path
+
+    def deliver(self, payload):
+        with open(self.path, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.write(json.dumps(payload, separators=(',', ':')) + '\n')
+
+
+class HttpSpanExporter(SpanExporter):
+    """
+    Posts batches to an OTLP/HTTP JSON endpoint, e.g. ``collect_traces``.
+    """
+
+    def __init__(self, url, interval: float):
+        super().__init__(interval, background=True)
+        self.url = url
+
+    def deliver(self, payload):
+        request = urllib.request.Request(
+            self.url, data=json.dumps(payload).encode(), headers={'Content-Type': 'application/json'}
+        )
+        urllib.request.urlopen(request, timeout=2).close()
+
+
+class MemorySpanExporter(SpanExporter):
+    def __init__(self, interval: float = 0):
+        super().__init__(interval)
+        self.exported: typing.List[dict] = []
+
+    def deliver(self, payload):
+        self.exported.append(payload)
+
+
+_exporter: typing.Optional[SpanExporter] = None
+
+
+def get_exporter() -> SpanExporter:
+    global _exporter
+    if _exporter is None:
+        if settings.TRACING_EXPORTER == 'http':
+            _exporter = HttpSpanExporter(settings.TRACING_COLLECTOR_URL, settings.TRACING_EXPORT_INTERVAL)
+        elif settings.TRACING_EXPORTER == 'memory':
+            _exporter = MemorySpanExporter(settings.TRACING_EXPORT_INTERVAL)
+        else:
+            _exporter = FileSpanExporter(settings.TRACING_EXPORT_PATH, settings.TRACING_EXPORT_INTERVAL)
+    return _exporter
+
+
+def _start_request(request) -> typing.Tuple[Span, contextvars.Token]:
+    match = TRACEPARENT.match(request.headers.get('traceparent', ''))
+    if match:
+        trace_id, parent_id, flags = match.groups()
+        sampled = bool(int(flags, 16) & 1)
+    else:
+        trace_id, parent_id = os.urandom(16).hex(), None
+        sampled = random.random() < settings.TRACING_SAMPLE_RATE
+
+    root = Span(Trace(trace_id, sampled), request.method, parent_id, SERVER, {
+        'http.method': request.method,
+        'http.target': request.path,
+    })
+    return root, _current.set(root)
+
+
+def _finish_request(root: Span, token, request, response=None, error=None):
+    _current.reset(token)
+    match = getattr(request, 'resolver_match', None)
+    if match is not None and match.route:
+        root.name = f"{request.method} /{match.route}"
+        root.set('http.route', f"/{match.route}")
+    if error is not None:
+        root.error = f"{type(error).__name__}: {error}"
+    if response is not None:
+        root.set('http.status_code', response.status_code)
+        if response.status_code >= 500:
+            root.error = root.error or f"HTTP {response.status_code}"
+        response['traceparent'] = root.traceparent
+        response['X-Trace-Id'] = root.trace.trace_id
+    root.finish()
+    if root.trace.sampled:
+        get_exporter().add(root.trace.trace_id, root.trace.spans)
+    return response
+
+
+@sync_and_async_middleware
+def tracing_middleware(get_response):
+    """
+    Opens the root span of each request, samples it, and returns the trace
+    context in ``traceparent``/``X-Trace-Id`` response headers.
+
+    An incoming ``traceparent`` header continues the caller's trace and
+    keeps its sampling decision.
+    """
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request):
+            root, token = _start_request(request)
+            try:
+                response = await get_response(request)
+            except Exception as exc:
+                _finish_request(root, token, request, error=exc)
+                raise
+            return _finish_request(root, token, request, response)
+    else:
+        def middleware(request):
+            root, token = _start_request(request)
+            try:
+                response = get_response(request)
+            except Exception as exc:
+                _finish_request(root, token, request, error=exc)
+                raise
+            return _finish_request(root, token, request, response)
+    return middleware
+
+
+class TracingMixin:
+    """
+    Adds authentication and permission spans to a DRF view.
+    """
+
+    def perform_authentication(self, request):
+        with span('auth.authenticate'):
+            super().perform_authentication(request)
+
+    def check_permissions(self, request):
+        with span('auth.permissions'):
+            super().check_permissions(request)
+
+    def check_object_permissions(self, request, obj):
+        with span('auth.object_permissions'):
+            super().check_object_permissions(request, obj)
+
+
+class TracedSerializerMixin:
+    """
+    Adds a validation span to a serializer.
+    """
+
+    def is_valid(self, *, raise_exception=False):
+        with span('serializer.validate', serializer=type(self).__name__):
+            return super().is_valid(raise_exception=raise_exception)
+
+
+class TracedJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with span('render'):
+            return super().render(data, accepted_media_type, renderer_context)
@@ -0,0 +1,85 @@
+from django.http import Http404, HttpResponse, HttpResponseNotModified, JsonResponse
+from django.utils.cache import patch_vary_headers
+from django.views import View
+from rest_framework import permissions
+from rest_framework.generics import GenericAPIView
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from api.apps.core.health import readiness
+from api.apps.core.metrics import metrics
+from api.apps.core.profiling import read_profile
+from api.apps.core.schema import get_document
+
+
+class SchemaFileView(View):
+    """
+    Serve the pre-generated OpenAPI schema from memory.
+    """
+
+    def get(self, request, format='.json'):
+        document = get_document(format)
+
+        if_none_match = request.headers.get('If-None-Match', '')
+        if document.etag in [tag.strip() for tag in if_none_match.split(',')]:
+            response = HttpResponseNotModified()
+        elif 'gzip' in request.headers.get('Accept-Encoding', ''):
+            response = HttpResponse(document.compressed, content_type=document.content_type)
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(document.content, content_type=document.content_type)
+
+        response['ETag'] = document.etag
+        response['Cache-Control'] = 'public, no-cache'
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+
+class MetricsView(GenericAPIView):
+    """
+    In-process metrics of the worker that serves the request.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request: Request) -> Response:
+        return Response(metrics.snapshot())
+
+
+class ProfileView(GenericAPIView):
+    """
+    A stored request profile in collapsed-stack format, for flamegraph tools.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request: Request, profile_id: str) -> HttpResponse:
+        profile = read_profile(profile_id)
+        if profile is None:
+            raise Http404
+        return HttpResponse(profile, content_type='text/plain; charset=utf-8')
+
+
+class LivenessView(View):
+    """
+    The process is up and serving requests. Does no I/O.
+    """
+
+    def get(self, request):
+        response = JsonResponse({'status': 'ok'})
+        response['Cache-Control'] = 'no-store'
+        return response
+
+
+class ReadinessView(View):
+    """
+    The database is reachable and fully migrated, as of the last check
+    (cached for ``READINESS_CACHE_TTL`` seconds).
+    """
+
+    def get(self, request):
+        ready, checks = readiness.get()
+        response = JsonResponse(
+            {'status': 'ready' if ready else 'unavailable', 'checks': checks},
+            status=200 if ready else 503,
+        )
+        response['Cache-Control'] = 'no-store'
+        return response
@@ -0,0 +1,44 @@
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from api.apps.jobs.models import Job
+
+
+class Command(BaseCommand):
+    help = "Measure jobs/sec by draining a batch of no-op jobs with several worker processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--jobs", type=int, default=10000)
+        parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+        parser.add_argument("--batch-size", type=int, default=50)
+
+    def handle(self, *args, **options):
+        for workers in options["workers"]:
+            now = timezone.now()
+            Job.objects.bulk_create(
+                (Job(name="jobs.noop", available_at=now) for _ in range(options["jobs"])), batch_size=5000
+            )
+
+            started = time.perf_counter()
+            processes = [
+                subprocess.Popen(
+                    [sys.executable, str(settings.BASE_DIR / "manage.py"), "run_jobs", "--once", "--name", "jobs.noop",
+                     "--batch-size", str(options["batch_size"])],
+                    stdout=subprocess.DEVNULL,
+                )
+                for _ in range(workers)
+            ]
+            for process in processes:
+                process.wait()
+            elapsed = time.perf_counter() - started
+
+            remaining = Job.objects.filter(name="jobs.noop").count()
+            Job.objects.filter(name="jobs.noop").delete()
+            done = options["jobs"] - remaining
+            self.stdout.write(
+                f"{workers} worker(s): {done} jobs in {elapsed:.2f}s ({done / elapsed:.0f} jobs/s)"
+            )
@@ -0,0 +1,52 @@
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from api.apps.jobs.queue import claim, run_job, worker_name
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs until stopped, or until the queue is empty with --once."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=settings.JOB_BATCH_SIZE)
+        parser.add_argument(
+            "--visibility-timeout", type=float, default=settings.JOB_VISIBILITY_TIMEOUT,
+            help="Seconds before a claimed job that was not finished can be claimed again.",
+        )
+        parser.add_argument("--poll-interval", type=float, default=settings.JOB_POLL_INTERVAL)
+        parser.add_argument("--name", nargs="*", default=None, help="Only run jobs with these names.")
+        parser.add_argument("--once", action="store_true", help="Exit when no jobs are due.")
+
+    def handle(self, *args, **options):
+        worker = worker_name()
+        stopping = False
+
+        def stop(signum, frame):
+            nonlocal stopping
+            stopping = True
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        succeeded = failed = 0
+        while not stopping:
+            close_old_connections()
+            jobs = claim(worker, options["batch_size"], options["visibility_timeout"], options["name"])
+            if not jobs:
+                if options["once"]:
+                    break
+                time.sleep(options["poll_interval"])
+                continue
+            for job in jobs:
+                # Jobs left unrun when stopping become claimable after the visibility timeout.
+                if stopping:
+                    break
+                if run_job(job):
+                    succeeded += 1
+                else:
+                    failed += 1
+
+        self.stdout.write(f"{worker}: {succeeded} succeeded, {failed} failed.")
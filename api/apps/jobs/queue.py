@@ -0,0 +1,138 @@
+import datetime
+import logging
+import os
+import socket
+import traceback
+import typing
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from api.apps.core.metrics import metrics
+from api.apps.jobs.models import Job
+
+logger = logging.getLogger(__name__)
+
+handlers: typing.Dict[str, typing.Callable[[dict], None]] = {}
+
+
+def task(name: str):
+    """
+    Register the decorated function as the handler for jobs called ``name``.
+    It is called with the job's payload.
+    """
+    def register(func):
+        handlers[name] = func
+        return func
+    return register
+
+
+def enqueue(name: str, payload: typing.Optional[dict] = None, priority: int = 0,
+            delay: float = 0, max_attempts: typing.Optional[int] = None) -> Job:
+    """
+    Queue a job. The row is written in the caller's transaction, so the job
+    only becomes visible to workers if that transaction commits.
+    """
+    if name not in handlers:
+        raise ValueError(f"No handler registered for job '{name}'.")
+    return Job.objects.create(
+        name=name,
+        payload=payload or {},
+        priority=priority,
+        available_at=timezone.now() + datetime.timedelta(seconds=delay),
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+
+
+def retry_delay(attempts: int) -> float:
+    return min(settings.JOB_RETRY_MAX_BACKOFF, settings.JOB_RETRY_BACKOFF * (2 ** (attempts - 1)))
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim(worker: str, batch_size: int, visibility_timeout: float,
+          names: typing.Optional[typing.Iterable[str]] = None) -> typing.List[Job]:
+    """
+    Claim up to ``batch_size`` due jobs for ``worker``, highest priority
+    first.
+
+    Rows locked by other workers' claims are skipped instead of waited on,
+    and the claim commits straight away, so workers never block each other
+    while jobs run.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        queryset = Job.objects.filter(
+            status__in=[Job.QUEUED, Job.RUNNING], available_at__lte=now
+        )
+        if names:
+            queryset = queryset.filter(name__in=list(names))
+        jobs = list(
+            queryset.select_for_update(skip_locked=True).order_by('-priority', 'available_at')[:batch_size]
+        )
+        if not jobs:
+            return []
+
+        Job.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            status=Job.RUNNING,
+            attempts=F('attempts') + 1,
+            locked_by=worker,
+            available_at=now + datetime.timedelta(seconds=visibility_timeout),
+        )
+    for job in jobs:
+        job.status, job.attempts, job.locked_by = Job.RUNNING, job.attempts + 1, worker
+    return jobs
+
+
+class JobReclaimed(Exception):
+    pass
+
+
+def _still_ours(job: Job):
+    # A job that outlived its visibility timeout may have been claimed again.
+    return Job.objects.filter(pk=job.pk, locked_by=job.locked_by, attempts=job.attempts)
+
+
+def run_job(job: Job) -> bool:
+    """
+    Run one claimed job and record the outcome; returns whether it succeeded.
+
+    The handler's writes and the job's removal commit together, so a job
+    whose database work committed is never run again. If another worker
+    reclaimed the job meanwhile, the handler's writes are rolled back.
+    """
+    handler = handlers.get(job.name)
+    try:
+        if handler is None:
+            raise LookupError(f"No handler registered for job '{job.name}'.")
+        with metrics.timer(f'jobs.run.{job.name}'), transaction.atomic():
+            handler(job.payload)
+            deleted, _ = _still_ours(job).delete()
+            if not deleted:
+                # Rolls back the handler's writes; the new owner runs it.
+                raise JobReclaimed(job.pk)
+    except JobReclaimed:
+        metrics.incr('jobs.reclaimed')
+        logger.warning("Job %s was reclaimed by another worker while running.", job)
+        return False
+    except Exception:
+        error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            _still_ours(job).update(status=Job.FAILED, last_error=error)
+            metrics.incr('jobs.failed')
+            logger.error("Job %s failed after %d attempts.", job, job.attempts)
+        else:
+            _still_ours(job).update(
+                status=Job.QUEUED,
+                last_error=error,
+                available_at=timezone.now() + datetime.timedelta(seconds=retry_delay(job.attempts)),
+            )
+            metrics.incr('jobs.retried')
+        return False
+
+    metrics.incr('jobs.succeeded')
+    return True
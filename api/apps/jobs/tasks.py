@@ -0,0 +1,8 @@
+from api.apps.jobs.queue import task
+
+
+@task('jobs.noop')
+def noop(payload):
+    """
+    Does nothing; used to measure the queue's own overhead.
+    """
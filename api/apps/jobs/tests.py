@@ -0,0 +1,113 @@
+import datetime
+import io
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import transaction
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from api.apps.jobs.models import Job
+from api.apps.jobs.queue import claim, enqueue, handlers, run_job, task
+from api.apps.users.models import User
+
+calls = []
+
+
+@task('tests.record')
+def record(payload):
+    calls.append(payload)
+
+
+@task('tests.write')
+def write(payload):
+    User.objects.create_user(username=payload['username'], password='password')
+
+
+@task('tests.fail')
+def fail(payload):
+    raise RuntimeError("boom")
+
+
+class JobQueueTests(TestCase):
+    """
+    Test enqueueing, claiming and running background jobs.
+    """
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_is_transactional(self):
+        try:
+            with transaction.atomic():
+                enqueue('tests.record', {'n': 1})
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertFalse(Job.objects.exists())
+
+        with self.assertRaises(ValueError):
+            enqueue('tests.unknown')
+
+    def test_claim_orders_by_priority_and_hides_claimed(self):
+        low = enqueue('tests.record', {'n': 'low'})
+        high = enqueue('tests.record', {'n': 'high'}, priority=5)
+        enqueue('tests.record', {'n': 'later'}, delay=60)
+
+        jobs = claim('worker-1', batch_size=10, visibility_timeout=30)
+        self.assertEqual([job.pk for job in jobs], [high.pk, low.pk])
+        self.assertEqual(claim('worker-2', batch_size=10, visibility_timeout=30), [])
+
+        # Once the visibility timeout passes another worker takes over.
+        Job.objects.filter(pk=low.pk).update(available_at=timezone.now() - datetime.timedelta(seconds=1))
+        jobs = claim('worker-2', batch_size=10, visibility_timeout=30)
+        self.assertEqual([(job.pk, job.attempts) for job in jobs], [(low.pk, 2)])
+
+    def test_success_removes_job(self):
+        enqueue('tests.record', {'n': 1})
+        job, = claim('worker', batch_size=1, visibility_timeout=30)
+        self.assertTrue(run_job(job))
+        self.assertEqual(calls, [{'n': 1}])
+        self.assertFalse(Job.objects.exists())
+
+    def test_reclaimed_job_rolls_back(self):
+        job = enqueue('tests.write', {'username': 'written'})
+        claimed, = claim('worker-1', batch_size=1, visibility_timeout=30)
+        # The visibility timeout passes mid-run and another worker claims it.
+        Job.objects.filter(pk=job.pk).update(locked_by='worker-2', attempts=F('attempts') + 1)
+
+        with self.assertLogs('api.apps.jobs.queue', 'WARNING'):
+            self.assertFalse(run_job(claimed))
+        self.assertFalse(User.objects.filter(username='written').exists())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by), (Job.RUNNING, 'worker-2'))
+
+    @override_settings(JOB_RETRY_BACKOFF=10)
+    def test_failure_retries_with_backoff_then_fails(self):
+        job = enqueue('tests.fail', max_attempts=2)
+
+        claimed, = claim('worker', batch_size=1, visibility_timeout=30)
+        self.assertFalse(run_job(claimed))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertGreater(job.available_at, timezone.now() + datetime.timedelta(seconds=5))
+        self.assertIn("boom", job.last_error)
+
+        Job.objects.filter(pk=job.pk).update(available_at=timezone.now())
+        claimed, = claim('worker', batch_size=1, visibility_timeout=30)
+        with self.assertLogs('api.apps.jobs.queue', 'ERROR'):
+            self.assertFalse(run_job(claimed))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+
+    def test_worker_drains_queue(self):
+        for n in range(5):
+            enqueue('tests.record', {'n': n})
+        output = io.StringIO()
+        with mock.patch('signal.signal'):
+            call_command('run_jobs', once=True, batch_size=2, stdout=output)
+        self.assertEqual(sorted(call['n'] for call in calls), list(range(5)))
+        self.assertIn("5 succeeded", output.getvalue())
+
+    def test_tasks_discovered(self):
+        self.assertIn('users.reap_expired_sessions', handlers)
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class MachinesConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "api.apps.machines"
+
+    def ready(self):
+        from api.apps.machines import signals  # noqa: F401
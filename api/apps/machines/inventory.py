@@ -0,0 +1,53 @@
+import typing
+
+from django.db.models import F
+
+from api.apps.core.db import update_or_insert
+from api.apps.machines.models import MachineCoin, MachineCredit
+
+COINS = (100, 50, 20, 10, 5)
+
+
+def _increment(model, lookup: dict, field: str, value: int):
+    update_or_insert(model, lookup, {field: F(field) + value}, {field: value})
+
+
+def add_coins(machine_id: int, coin: int, count: int = 1):
+    _increment(MachineCoin, {'machine_id': machine_id, 'coin': coin}, 'count', count)
+
+
+def add_credit(machine_id: int, user_id: int, amount: int):
+    _increment(MachineCredit, {'machine_id': machine_id, 'user_id': user_id}, 'amount', amount)
+
+
+def make_change(amount: int, available: typing.Dict[int, int]) -> typing.Optional[typing.Dict[int, int]]:
+    """
+    Coins adding up to ``amount`` using at most ``available[coin]`` of each,
+    largest coins first, or ``None`` when the machine cannot make it.
+
+    ``reachable[i][a]`` says whether ``a`` can be paid with the coins from
+    ``COINS[i]`` down, so picking the most of each coin that leaves a
+    reachable remainder never runs into a dead end.
+    """
+    reachable = [None] * len(COINS) + [[True] + [False] * amount]
+    for i in range(len(COINS) - 1, -1, -1):
+        coin, limit = COINS[i], available.get(COINS[i], 0)
+        row, used = list(reachable[i + 1]), [0] * (amount + 1)
+        for value in range(coin, amount + 1):
+            if not row[value] and row[value - coin] and used[value - coin] < limit:
+                row[value] = True
+                used[value] = used[value - coin] + 1
+        reachable[i] = row
+
+    if not reachable[0][amount]:
+        return None
+
+    change, remaining = {}, amount
+    for i, coin in enumerate(COINS):
+        for count in range(min(available.get(coin, 0), remaining // coin), -1, -1):
+            if reachable[i + 1][remaining - count * coin]:
+                break
+        if count:
+            change[coin] = count
+            remaining -= count * coin
+    return change
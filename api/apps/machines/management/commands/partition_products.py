@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from api.apps.machines.models import Machine
+from api.apps.machines.partitions import is_partitioned, partition_products
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the products table as one partition per machine, so load on one "
+        "machine's stock does not touch the pages and indexes of the others. Postgres only."
+    )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Partitioning needs Postgres.")
+        if is_partitioned():
+            self.stdout.write("Products are already partitioned by machine.")
+            return
+        machine_ids = list(Machine.objects.values_list("pk", flat=True))
+        partition_products(machine_ids)
+        self.stdout.write(self.style.SUCCESS(f"Partitioned products into {len(machine_ids)} machine partition(s)."))
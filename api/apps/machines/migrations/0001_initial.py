@@ -0,0 +1,61 @@
+# Generated by Django 4.2.26 on 2026-10-19 10:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Machine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('location', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'machines',
+            },
+        ),
+        migrations.CreateModel(
+            name='MachineCredit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.PositiveIntegerField(default=0, help_text='Credit (cents)')),
+                ('machine', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='credits', to='machines.machine')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='machine_credits', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'machine_credits',
+            },
+        ),
+        migrations.CreateModel(
+            name='MachineCoin',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('coin', models.PositiveIntegerField(help_text='Denomination (cents)')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('machine', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='coins', to='machines.machine')),
+            ],
+            options={
+                'db_table': 'machine_coins',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='machinecredit',
+            constraint=models.UniqueConstraint(fields=('machine', 'user'), name='machine_credits_machine_user_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='machinecoin',
+            constraint=models.UniqueConstraint(fields=('machine', 'coin'), name='machine_coins_machine_coin_uniq'),
+        ),
+    ]
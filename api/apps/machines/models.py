@@ -0,0 +1,48 @@
+from django.db import models
+
+
+class Machine(models.Model):
+    """
+    A physical vending machine. Products stocked in it are sold, and coins
+    deposited into it are held, per machine.
+    """
+    name = models.CharField(max_length=255)
+    location = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'machines'
+
+    def __str__(self):
+        return self.name
+
+
+class MachineCoin(models.Model):
+    """
+    The number of coins of one denomination held by a machine, used to pay
+    out change.
+    """
+    machine = models.ForeignKey(Machine, on_delete=models.CASCADE, related_name='coins', db_index=False)
+    coin = models.PositiveIntegerField(help_text="Denomination (cents)")
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'machine_coins'
+        constraints = [
+            models.UniqueConstraint(fields=['machine', 'coin'], name='machine_coins_machine_coin_uniq'),
+        ]
+
+
+class MachineCredit(models.Model):
+    """
+    What a buyer has deposited into a machine and not yet spent.
+    """
+    machine = models.ForeignKey(Machine, on_delete=models.CASCADE, related_name='credits', db_index=False)
+    user = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='machine_credits')
+    amount = models.PositiveIntegerField(default=0, help_text="Credit (cents)")
+
+    class Meta:
+        db_table = 'machine_credits'
+        constraints = [
+            models.UniqueConstraint(fields=['machine', 'user'], name='machine_credits_machine_user_uniq'),
+        ]
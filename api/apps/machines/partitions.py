@@ -0,0 +1,105 @@
+import typing
+
+from django.db import connection, transaction
+
+from api.apps.products.models import Product
+
+TABLE = Product._meta.db_table
+DEFAULT_PARTITION = f"{TABLE}_default"
+
+
+def partition_name(machine_id: int) -> str:
+    return f"{TABLE}_machine_{machine_id}"
+
+
+def is_partitioned() -> bool:
+    """
+    Whether ``products`` is list-partitioned by machine (Postgres only).
+    """
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)", [TABLE]
+        )
+        return cursor.fetchone() is not None
+
+
+def create_partition(cursor, machine_id: int):
+    """
+    Give a machine its own partition. Partitions carry their own primary
+    key, since the parent cannot have one without the nullable
+    ``machine_id`` in it.
+    """
+    name = connection.ops.quote_name(partition_name(machine_id))
+    cursor.execute(
+        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {connection.ops.quote_name(TABLE)} "
+        f"FOR VALUES IN ({int(machine_id)})"
+    )
+    cursor.execute(
+        "SELECT 1 FROM pg_index WHERE indrelid = to_regclass(%s) AND indisprimary", [partition_name(machine_id)]
+    )
+    if cursor.fetchone() is None:
+        cursor.execute(f"ALTER TABLE {name} ADD PRIMARY KEY (id)")
+
+
+def ensure_partition(machine_id: int):
+    if is_partitioned():
+        with connection.cursor() as cursor:
+            create_partition(cursor, machine_id)
+
+
+def partition_products(machine_ids: typing.Iterable[int]):
+    """
+    Rebuild ``products`` as a table list-partitioned on ``machine_id``, with
+    one partition per machine and a default partition for products outside
+    any machine.
+
+    Runs in one transaction under an exclusive lock on ``products``; the
+    rows are copied, and indexes and foreign keys recreated under their
+    existing names so later migrations still find them.
+    """
+    table = connection.ops.quote_name(TABLE)
+    old_name = f"{TABLE}_unpartitioned"
+    old = connection.ops.quote_name(old_name)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE")
+        constraints = connection.introspection.get_constraints(cursor, TABLE)
+
+        cursor.execute(f"ALTER TABLE {table} RENAME TO {old}")
+        cursor.execute(
+            f"CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING IDENTITY) "
+            f"PARTITION BY LIST (machine_id)"
+        )
+        cursor.execute(
+            f"CREATE TABLE {connection.ops.quote_name(DEFAULT_PARTITION)} PARTITION OF {table} DEFAULT"
+        )
+        cursor.execute(f"ALTER TABLE {connection.ops.quote_name(DEFAULT_PARTITION)} ADD PRIMARY KEY (id)")
+        for machine_id in machine_ids:
+            create_partition(cursor, machine_id)
+
+        cursor.execute(f"INSERT INTO {table} SELECT * FROM {old}")
+
+        # Keep ids increasing: an identity column gets a fresh sequence, a
+        # serial one keeps using the old table's.
+        cursor.execute("SELECT pg_get_serial_sequence(%s, 'id'), pg_get_serial_sequence(%s, 'id')", [TABLE, old_name])
+        sequence, old_sequence = cursor.fetchone()
+        if sequence is None:
+            cursor.execute(f"ALTER SEQUENCE {old_sequence} OWNED BY {table}.id")
+        else:
+            cursor.execute(f"SELECT setval(%s, COALESCE(MAX(id), 0) + 1, false) FROM {table}", [sequence])
+
+        cursor.execute(f"DROP TABLE {old}")
+
+        for name, constraint in constraints.items():
+            columns = ", ".join(connection.ops.quote_name(column) for column in constraint['columns'])
+            if constraint['foreign_key']:
+                target_table, target_column = constraint['foreign_key']
+                cursor.execute(
+                    f"ALTER TABLE {table} ADD CONSTRAINT {connection.ops.quote_name(name)} "
+                    f"FOREIGN KEY ({columns}) REFERENCES {connection.ops.quote_name(target_table)} "
+                    f"({connection.ops.quote_name(target_column)}) DEFERRABLE INITIALLY DEFERRED"
+                )
+            elif constraint['index'] and not constraint['primary_key'] and not constraint['unique']:
+                cursor.execute(f"CREATE INDEX {connection.ops.quote_name(name)} ON {table} ({columns})")
@@ -0,0 +1,15 @@
+from rest_framework import serializers
+from api.apps.machines.models import Machine
+from api.apps.core.tracing import TracedSerializerMixin
+
+
+class MachineSerializer(TracedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Machine
+        fields = ('id', 'name', 'location', 'created_at')
+        read_only_fields = ('id', 'created_at')
+
+
+class MachineBuySerializer(TracedSerializerMixin, serializers.Serializer):
+    product = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1)
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from api.apps.machines.models import Machine
+from api.apps.machines.partitions import ensure_partition
+
+
+@receiver(post_save, sender=Machine)
+def create_product_partition(sender, instance, created, **kwargs):
+    if created:
+        ensure_partition(instance.pk)
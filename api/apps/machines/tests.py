@@ -0,0 +1,130 @@
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from api.apps.machines.inventory import make_change
+from api.apps.machines.models import Machine, MachineCoin, MachineCredit
+from api.apps.products.leaderboard import sales_counter
+from api.apps.products.models import Product, SellerStats
+
+User = get_user_model()
+
+
+def tearDownModule():
+    sales_counter.discard()
+
+
+class MakeChangeTestCase(SimpleTestCase):
+    def test_uses_largest_coins_available(self):
+        self.assertEqual(make_change(0, {}), {})
+        self.assertEqual(make_change(85, {100: 5, 50: 5, 20: 5, 10: 5, 5: 5}), {50: 1, 20: 1, 10: 1, 5: 1})
+        self.assertEqual(make_change(40, {50: 1, 10: 4}), {10: 4})
+
+    def test_avoids_greedy_dead_ends(self):
+        # Taking the 50 leaves 10, which three 20s cannot pay.
+        self.assertEqual(make_change(60, {50: 1, 20: 3}), {20: 3})
+
+    def test_impossible_change(self):
+        self.assertIsNone(make_change(15, {10: 3}))
+        self.assertIsNone(make_change(5, {}))
+
+
+class MachineTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_user(username="admin", password="password", role="seller", is_staff=True)
+        self.seller = User.objects.create_user(username="seller", password="password", role="seller")
+        self.buyer = User.objects.create_user(username="buyer", password="password", role="buyer")
+        self.machine = Machine.objects.create(name="Lobby")
+        self.other_machine = Machine.objects.create(name="Canteen")
+
+    def stock(self, machine, **data):
+        self.client.force_authenticate(user=self.seller)
+        response = self.client.post(reverse("machine-products", args=[machine.pk]), data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return Product.objects.get(pk=response.data["id"])
+
+    def deposit(self, machine, *coins):
+        self.client.force_authenticate(user=self.buyer)
+        for coin in coins:
+            response = self.client.post(reverse("machine-deposit", args=[machine.pk]), {"amount": coin}, format="json")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def test_only_admins_create_machines(self):
+        self.client.force_authenticate(user=self.seller)
+        response = self.client.post(reverse("machine-list"), {"name": "Gym"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.post(reverse("machine-list"), {"name": "Gym"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_products_are_scoped_to_machine(self):
+        cola = self.stock(self.machine, name="Cola", cost=50, amount_available=3)
+        self.stock(self.other_machine, name="Water", cost=20, amount_available=5)
+
+        self.client.force_authenticate(user=self.buyer)
+        response = self.client.get(reverse("machine-products", args=[self.machine.pk]))
+        self.assertEqual([product["id"] for product in response.data["results"]], [cola.pk])
+        self.assertEqual(cola.machine_id, self.machine.pk)
+        self.assertEqual(SellerStats.objects.get(seller=self.seller).product_count, 2)
+
+    def test_buy_pays_change_from_machine_coins(self):
+        cola = self.stock(self.machine, name="Cola", cost=30, amount_available=3)
+        response = self.deposit(self.machine, 50, 20, 10)
+        self.assertEqual(response.data["current_deposit"], 80)
+
+        response = self.client.post(
+            reverse("machine-buy", args=[self.machine.pk]), {"product": cola.pk, "quantity": 1}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["change"], [50])
+        self.assertEqual(
+            dict(MachineCoin.objects.filter(machine=self.machine).values_list("coin", "count")),
+            {50: 0, 20: 1, 10: 1},
+        )
+        self.assertFalse(MachineCredit.objects.exists())
+        cola.refresh_from_db()
+        self.assertEqual(cola.amount_available, 2)
+
+    def test_buy_refused_without_change(self):
+        cola = self.stock(self.machine, name="Cola", cost=5, amount_available=3)
+        self.deposit(self.machine, 20)
+
+        response = self.client.post(
+            reverse("machine-buy", args=[self.machine.pk]), {"product": cola.pk, "quantity": 1}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(MachineCredit.objects.get().amount, 20)
+
+        response = self.client.post(
+            reverse("machine-buy", args=[self.machine.pk]), {"product": cola.pk, "quantity": 4}, format="json"
+        )
+        self.assertEqual(response.data["detail"], "Only 3 items available.")
+
+    def test_credit_and_products_stay_in_their_machine(self):
+        water = self.stock(self.other_machine, name="Water", cost=20, amount_available=5)
+        self.deposit(self.machine, 20)
+
+        response = self.client.post(
+            reverse("machine-buy", args=[self.machine.pk]), {"product": water.pk, "quantity": 1}, format="json"
+        )
+        self.assertIn("product", response.data)
+
+        response = self.client.post(
+            reverse("machine-buy", args=[self.other_machine.pk]), {"product": water.pk, "quantity": 1}, format="json"
+        )
+        self.assertEqual(response.data["detail"], "Insufficient funds.")
+
+        self.buyer.deposit = 100
+        self.buyer.save()
+        response = self.client.post(reverse("buy_product"), {"product": water.pk, "quantity": 1}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_partitioning_needs_postgres(self):
+        with self.assertRaises(CommandError):
+            call_command("partition_products")
@@ -0,0 +1,8 @@
+from rest_framework.routers import DefaultRouter
+
+from api.apps.machines.views import MachineViewSet
+
+router = DefaultRouter()
+router.register('', MachineViewSet, basename='machine')
+
+urlpatterns = router.urls
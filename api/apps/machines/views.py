@@ -0,0 +1,173 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from rest_framework import mixins, permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from api.apps.core.db import run_in_transaction, locked_get
+from api.apps.core.tracing import TracingMixin
+from api.apps.machines.inventory import add_coins, add_credit, make_change
+from api.apps.machines.models import Machine, MachineCoin, MachineCredit
+from api.apps.machines.serializers import MachineSerializer, MachineBuySerializer
+from api.apps.products.events import publish_product_change
+from api.apps.products.history import record_product_change
+from api.apps.products.leaderboard import record_sale
+from api.apps.products.models import Product, ProductHistory
+from api.apps.products.serializers import ProductSerializer
+from api.apps.products.stats import record_stock_change
+from api.apps.products.views import create_product
+from api.apps.users.permissions import IsBuyer, IsSeller
+from api.apps.users.serializers import DepositSerializer
+
+
+class MachineViewSet(
+    TracingMixin,
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.CreateModelMixin,
+    mixins.UpdateModelMixin,
+    viewsets.GenericViewSet,
+):
+    """
+    Vending machines, with the products, deposits and purchases of each.
+
+    Every query here is scoped to one machine and served by indexes leading
+    with ``machine_id``, so machines don't contend with each other.
+    """
+    queryset = Machine.objects.order_by('id')
+    serializer_class = MachineSerializer
+
+    def get_permissions(self):
+        """
+        Anyone authenticated can browse machines and their products.
+        Sellers stock products, buyers deposit and buy, admins manage
+        machines.
+        """
+        if self.action in ('list', 'retrieve') or (self.action == 'products' and self.request.method == 'GET'):
+            return [permissions.IsAuthenticated()]
+        elif self.action == 'products':
+            return [IsSeller()]
+        elif self.action in ('buy', 'deposit'):
+            return [IsBuyer()]
+        else:
+            return [permissions.IsAdminUser()]
+
+    @action(detail=True, methods=['get', 'post'], serializer_class=ProductSerializer)
+    def products(self, request, *args, **kwargs):
+        """
+        Products stocked in the machine. Sellers add products with POST.
+        """
+        machine = self.get_object()
+        if request.method == 'POST':
+            serializer = self.get_serializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            with transaction.atomic():
+                create_product(serializer, seller_id=request.user.pk, machine_id=machine.pk)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+        queryset = Product.objects.filter(machine_id=machine.pk).order_by('id')
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer(queryset, many=True).data)
+
+    @action(detail=True, methods=['post'], serializer_class=DepositSerializer)
+    def deposit(self, request, *args, **kwargs):
+        """
+        Insert a coin into the machine, crediting the buyer there.
+        """
+        machine = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        amount = serializer.validated_data['amount']
+
+        def deposit():
+            add_credit(machine.pk, request.user.pk, amount)
+            add_coins(machine.pk, amount)
+            return MachineCredit.objects.get(machine_id=machine.pk, user_id=request.user.pk).amount
+
+        credit = run_in_transaction(
+            deposit, name='machine_deposit', isolation=settings.MONEY_TRANSACTION_ISOLATION
+        )
+        return Response({
+            'message': f'{amount} cents deposited successfully.',
+            'current_deposit': credit,
+        }, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['post'], serializer_class=MachineBuySerializer)
+    def buy(self, request, *args, **kwargs):
+        """
+        Buy a product stocked in the machine with the buyer's credit there.
+        Change is paid out of the machine's coins.
+        """
+        machine = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        product_id = serializer.validated_data['product']
+        quantity = serializer.validated_data['quantity']
+
+        def purchase():
+            try:
+                product = locked_get(Product.objects, pk=product_id, machine_id=machine.pk)
+            except Product.DoesNotExist:
+                return Response(
+                    {'product': ['Product with the given ID is not sold by this machine.']},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            credit = (
+                MachineCredit.objects.select_for_update()
+                .filter(machine_id=machine.pk, user_id=request.user.pk).first()
+            )
+            balance = credit.amount if credit else 0
+
+            if product.amount_available < quantity:
+                return Response(
+                    {'detail': f'Only {product.amount_available} items available.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            total_cost = product.cost * quantity
+            if balance < total_cost:
+                return Response(
+                    {
+                        'detail': 'Insufficient funds.',
+                        'required': total_cost,
+                        'available': balance,
+                    },
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            coins = MachineCoin.objects.select_for_update().filter(machine_id=machine.pk)
+            change = make_change(balance - total_cost, {coin.coin: coin.count for coin in coins})
+            if change is None:
+                return Response(
+                    {'detail': 'The machine cannot return change for this purchase.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            for coin, count in change.items():
+                MachineCoin.objects.filter(machine_id=machine.pk, coin=coin).update(count=F('count') - count)
+
+            product.amount_available -= quantity
+            product.version += 1
+            product.save(update_fields=['amount_available', 'version', 'updated_at'])
+            record_stock_change(product.seller_id, product.amount_available + quantity, product.amount_available)
+            publish_product_change(product)
+            record_product_change(product, ProductHistory.PURCHASED)
+            record_sale(product, quantity)
+
+            if credit is not None:
+                credit.delete()
+
+            return Response({
+                'total_spent': total_cost,
+                'product_name': product.name,
+                'quantity': quantity,
+                'change': [coin for coin, count in sorted(change.items(), reverse=True) for _ in range(count)],
+            }, status=status.HTTP_200_OK)
+
+        return run_in_transaction(
+            purchase, name='machine_buy', isolation=settings.MONEY_TRANSACTION_ISOLATION
+        )
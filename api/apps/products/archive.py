@@ -0,0 +1,81 @@
+import collections
+import datetime
+import typing
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from api.apps.core.metrics import metrics
+from api.apps.products.events import publish_product_change
+from api.apps.products.models import ArchivedProduct, Product
+from api.apps.products.stats import apply_delta, stock_delta
+
+ARCHIVED_FIELDS = (
+    'id', 'seller_id', 'machine_id', 'name', 'cost', 'amount_available', 'created_at', 'updated_at', 'retired_at',
+)
+
+
+def archive_candidates(empty_days: int):
+    """
+    Products to move to the archive: retired ones, and ones that have been
+    out of stock and unchanged for ``empty_days``.
+    """
+    cutoff = timezone.now() - datetime.timedelta(days=empty_days)
+    return Product.all_objects.filter(
+        Q(retired_at__isnull=False) | Q(amount_available=0, updated_at__lt=cutoff)
+    )
+
+
+def archive_batch(empty_days: int, batch_size: int) -> int:
+    """
+    Move up to ``batch_size`` candidates to the archive in one transaction
+    and return how many were moved.
+
+    Rows locked by a purchase or an edit are skipped until the next batch.
+    Products archived while still on sale leave the seller's counters and
+    are announced as deleted.
+    """
+    with transaction.atomic():
+        products = list(
+            archive_candidates(empty_days).select_for_update(skip_locked=True).order_by('id')[:batch_size]
+        )
+        if not products:
+            return 0
+
+        now = timezone.now()
+        ArchivedProduct.objects.bulk_create([
+            ArchivedProduct(archived_at=now, **{field: getattr(product, field) for field in ARCHIVED_FIELDS})
+            for product in products
+        ])
+
+        deltas = collections.defaultdict(collections.Counter)
+        for product in products:
+            if product.retired_at is None:
+                deltas[product.seller_id].update(stock_delta(product.amount_available, None))
+                publish_product_change(product, 'product.deleted')
+        for seller_id, delta in deltas.items():
+            apply_delta(seller_id, **delta)
+
+        Product.all_objects.filter(pk__in=[product.pk for product in products]).delete()
+
+    metrics.incr('products.archived', len(products))
+    return len(products)
+
+
+def archive_products(empty_days: typing.Optional[int] = None, batch_size: typing.Optional[int] = None) -> int:
+    """
+    Archive every candidate, one committed batch at a time, so the locks
+    taken on ``products`` stay short. Returns the number archived.
+    """
+    if empty_days is None:
+        empty_days = settings.PRODUCT_ARCHIVE_EMPTY_DAYS
+    batch_size = batch_size or settings.PRODUCT_ARCHIVE_BATCH_SIZE
+
+    archived = 0
+    while True:
+        moved = archive_batch(empty_days, batch_size)
+        archived += moved
+        if moved < batch_size:
+            return archived
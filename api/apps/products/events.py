@@ -0,0 +1,208 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import threading
+import typing
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+
+from api.apps.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Largest event a socket broker will send or receive.
+MAX_EVENT_SIZE = 4096
+
+
+class Subscription:
+    """
+    A single client's view of the stock event stream.
+
+    Events are filtered by product and/or seller; an empty filter receives
+    everything. The queue is bounded: a client that falls ``maxsize`` events
+    behind is dropped instead of buffering without limit.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, products=(), sellers=(), maxsize: int = 100):
+        self.loop = loop
+        self.products = frozenset(products)
+        self.sellers = frozenset(sellers)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.dropped = False
+
+    def matches(self, event: dict) -> bool:
+        if not self.products and not self.sellers:
+            return True
+        return event['product'] in self.products or event['seller'] in self.sellers
+
+    def offer(self, event: dict):
+        """
+        Queue ``event`` for the client; must run on the subscription's loop.
+        """
+        if self.dropped:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped = True
+            metrics.incr('stock_events.dropped_clients')
+            # Discard the backlog so the stream ends on the next read.
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class EventHub:
+    """
+    Fan-out of stock events to the subscriptions of this process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions: typing.Set[Subscription] = set()
+
+    def subscribe(self, products=(), sellers=(), maxsize: typing.Optional[int] = None) -> Subscription:
+        if maxsize is None:
+            maxsize = settings.STOCK_EVENTS_QUEUE_SIZE
+        subscription = Subscription(asyncio.get_running_loop(), products, sellers, maxsize)
+        with self._lock:
+            self._subscriptions.add(subscription)
+            metrics.gauge('stock_events.subscribers', len(self._subscriptions))
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+            metrics.gauge('stock_events.subscribers', len(self._subscriptions))
+
+    def dispatch(self, event: dict):
+        """
+        Deliver ``event`` to matching subscriptions; safe to call from any thread.
+        """
+        with self._lock:
+            subscriptions = [s for s in self._subscriptions if s.matches(event)]
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, event)
+            except RuntimeError:
+                # The subscriber's event loop has already shut down.
+                self.unsubscribe(subscription)
+
+
+class LocalBroker:
+    """
+    Delivers events to subscribers of the publishing process only.
+    """
+
+    def __init__(self, hub: EventHub):
+        self.hub = hub
+
+    def start(self):
+        pass
+
+    def publish(self, event: dict):
+        self.hub.dispatch(event)
+
+
+class SocketBroker:
+    """
+    Cross-worker fan-out over Unix datagram sockets, a local stand-in for a
+    pub/sub server.
+
+    Every process that has subscribers binds ``<directory>/<pid>.sock`` and
+    publishing sends the event to every socket in the directory, so all
+    workers on the host see every change. Sockets of dead workers are
+    removed the first time a send to them fails.
+    """
+
+    def __init__(self, hub: EventHub, directory):
+        self.hub = hub
+        self.directory = Path(directory)
+        self._lock = threading.Lock()
+        self._receiver: typing.Optional[socket.socket] = None
+        self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sender.setblocking(False)
+
+    @property
+    def path(self) -> Path:
+        return self.directory / f"{os.getpid()}.sock"
+
+    def start(self):
+        with self._lock:
+            if self._receiver is not None:
+                return
+            self.directory.mkdir(parents=True, exist_ok=True)
+            if self.path.exists():
+                self.path.unlink()
+            receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            receiver.bind(str(self.path))
+            self._receiver = receiver
+        threading.Thread(target=self._receive, name='stock-events', daemon=True).start()
+
+    def stop(self):
+        with self._lock:
+            if self._receiver is None:
+                return
+            self._receiver.close()
+            self._receiver = None
+            if self.path.exists():
+                self.path.unlink()
+
+    def _receive(self):
+        receiver = self._receiver
+        while True:
+            try:
+                data = receiver.recv(MAX_EVENT_SIZE)
+            except OSError:
+                return
+            try:
+                self.hub.dispatch(json.loads(data))
+            except ValueError:
+                logger.warning("Discarding malformed stock event.")
+
+    def publish(self, event: dict):
+        data = json.dumps(event).encode()
+        for path in self.directory.glob('*.sock'):
+            try:
+                self._sender.sendto(data, str(path))
+            except (ConnectionRefusedError, FileNotFoundError):
+                path.unlink(missing_ok=True)
+            except BlockingIOError:
+                # The receiving worker is not keeping up; its clients miss this event.
+                metrics.incr('stock_events.send_dropped')
+
+
+hub = EventHub()
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        if settings.STOCK_EVENTS_BROKER == 'socket':
+            _broker = SocketBroker(hub, settings.STOCK_EVENTS_SOCKET_DIR)
+        else:
+            _broker = LocalBroker(hub)
+    return _broker
+
+
+def product_event(product, event_type: str) -> dict:
+    return {
+        'type': event_type,
+        'product': product.pk,
+        'seller': product.seller_id,
+        'cost': product.cost,
+        'amount_available': product.amount_available,
+    }
+
+
+def publish_product_change(product, event_type: str = 'product.updated'):
+    """
+    Broadcast the product's current cost and stock once the transaction commits.
+    """
+    event = product_event(product, event_type)
+    transaction.on_commit(lambda: get_broker().publish(event))
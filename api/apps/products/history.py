@@ -0,0 +1,167 @@
+import datetime
+import typing
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from api.apps.core.metrics import metrics
+from api.apps.products.models import ProductHistory
+
+TABLE = ProductHistory._meta.db_table
+DEFAULT_PARTITION = f"{TABLE}_default"
+
+
+def month_start(value: datetime.date) -> datetime.date:
+    return datetime.date(value.year, value.month, 1)
+
+
+def add_months(month: datetime.date, months: int) -> datetime.date:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: datetime.date) -> str:
+    return f"{TABLE}_{month:%Y_%m}"
+
+
+def is_partitioned() -> bool:
+    return connection.vendor == 'postgresql'
+
+
+def _bound(month: datetime.date) -> datetime.datetime:
+    return datetime.datetime(month.year, month.month, 1, tzinfo=datetime.timezone.utc)
+
+
+def list_partitions() -> typing.Dict[str, datetime.date]:
+    """
+    Monthly partitions of the history table by name, with the month each holds.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = %s",
+            [TABLE],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = {}
+    for name in names:
+        try:
+            partitions[name] = datetime.datetime.strptime(name[len(TABLE) + 1:], '%Y_%m').date()
+        except ValueError:
+            continue  # the default partition
+    return partitions
+
+
+def create_partition(month: datetime.date):
+    """
+    Add the partition for ``month``, moving any of its rows that already
+    landed in the default partition.
+    """
+    name = connection.ops.quote_name(partition_name(month))
+    table = connection.ops.quote_name(TABLE)
+    default = connection.ops.quote_name(DEFAULT_PARTITION)
+    start, end = _bound(month), _bound(add_months(month, 1))
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT EXISTS (SELECT 1 FROM {default} WHERE changed_at >= %s AND changed_at < %s)",
+            [start, end],
+        )
+        if not cursor.fetchone()[0]:
+            cursor.execute(
+                f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)", [start, end]
+            )
+            return
+
+        cursor.execute(f"ALTER TABLE {table} DETACH PARTITION {default}")
+        cursor.execute(
+            f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)", [start, end]
+        )
+        cursor.execute(
+            f"WITH moved AS (DELETE FROM {default} WHERE changed_at >= %s AND changed_at < %s RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved",
+            [start, end],
+        )
+        cursor.execute(f"ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT")
+
+
+def ensure_partitions(months_ahead: int, today: typing.Optional[datetime.date] = None) -> typing.List[str]:
+    """
+    Create the partitions for this month and the next ``months_ahead``.
+    Returns the names of the partitions created.
+    """
+    if not is_partitioned():
+        return []
+    current = month_start(today or timezone.now().date())
+    existing = list_partitions()
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        if partition_name(month) not in existing:
+            create_partition(month)
+            created.append(partition_name(month))
+    return created
+
+
+def prune_history(retain_months: int, today: typing.Optional[datetime.date] = None) -> typing.List[str]:
+    """
+    Remove history older than the last ``retain_months`` months (counting
+    the current one).
+
+    On Postgres whole monthly partitions are dropped, which costs the same
+    however many rows they hold; returns their names. Without partitions
+    the rows are deleted instead and nothing is returned.
+    """
+    cutoff = add_months(month_start(today or timezone.now().date()), 1 - retain_months)
+    if not is_partitioned():
+        ProductHistory.objects.filter(changed_at__lt=_bound(cutoff)).delete()
+        return []
+
+    dropped = []
+    for name, month in sorted(list_partitions().items(), key=lambda item: item[1]):
+        if month >= cutoff:
+            break
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE {connection.ops.quote_name(name)}")
+        dropped.append(name)
+    return dropped
+
+
+def price_at(product_id: int, when: datetime.datetime) -> typing.Optional[ProductHistory]:
+    """
+    The last recorded state of the product at or before ``when``.
+    """
+    return ProductHistory.objects.filter(
+        product_id=product_id, changed_at__lte=when
+    ).order_by('-changed_at').first()
+
+
+def _entry(product, change: str) -> ProductHistory:
+    return ProductHistory(
+        product_id=product.pk,
+        seller_id=product.seller_id,
+        cost=product.cost,
+        amount_available=product.amount_available,
+        change=change,
+        changed_at=timezone.now(),
+    )
+
+
+def record_product_change(product, change: str = ProductHistory.UPDATED):
+    """
+    Record the product's current cost and stock. Call inside the transaction
+    that made the change, so the row commits or rolls back with it.
+    """
+    _entry(product, change).save(force_insert=True)
+    metrics.incr('product_history.recorded')
+
+
+def record_product_changes(products: typing.Sequence, change: str):
+    """
+    ``record_product_change`` for many products with one ``bulk_create``.
+    """
+    ProductHistory.objects.bulk_create([_entry(product, change) for product in products])
+    metrics.incr('product_history.recorded', len(products))
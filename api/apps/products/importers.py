@@ -0,0 +1,223 @@
+import csv
+import io
+import json
+import time
+import typing
+
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from api.apps.products.models import MAX_STOCK, Product, ProductHistory
+from api.apps.products.history import record_product_changes
+from api.apps.products.stats import apply_delta
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+DEFAULT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+NAME_MAX_LENGTH = Product._meta.get_field('name').max_length
+
+
+class ImportResult:
+    """
+    Outcome of a product import: rows written, rows rejected and timing.
+    """
+
+    def __init__(self, max_errors: int = MAX_REPORTED_ERRORS):
+        self.created = 0
+        self.failed = 0
+        self.errors: typing.List[dict] = []
+        self.elapsed = 0.0
+        self.max_errors = max_errors
+
+    @property
+    def rows(self) -> int:
+        return self.created + self.failed
+
+    @property
+    def rows_per_second(self) -> float:
+        if not self.elapsed:
+            return 0.0
+        return self.rows / self.elapsed
+
+    def add_error(self, line: int, errors: dict):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'line': line, 'errors': errors})
+
+    def as_dict(self) -> dict:
+        return {
+            'created': self.created,
+            'failed': self.failed,
+            'errors': self.errors,
+            'elapsed': round(self.elapsed, 3),
+            'rows_per_second': round(self.rows_per_second, 1),
+        }
+
+
+def detect_format(filename: str) -> typing.Optional[str]:
+    """
+    Guess the import format from a file name.
+    """
+    name = (filename or '').lower()
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    return None
+
+
+def text_stream(binary: typing.BinaryIO) -> io.TextIOWrapper:
+    """
+    Decode an import file as UTF-8. Undecodable bytes are kept as lone
+    surrogates so ``iter_rows`` can reject the lines holding them.
+    """
+    return io.TextIOWrapper(binary, encoding='utf-8', errors='surrogateescape', newline='')
+
+
+def _is_undecodable(text: str) -> bool:
+    try:
+        text.encode('utf-8')
+    except UnicodeEncodeError:
+        return True
+    return False
+
+
+def iter_rows(stream: typing.Iterable[str], fmt: str) -> typing.Iterator[typing.Tuple[int, typing.Any]]:
+    """
+    Lazily yield ``(line_number, row)`` pairs from a text stream.
+
+    Rows that cannot be parsed or decoded are yielded as ``None`` so they
+    are reported alongside validation errors instead of aborting the import.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            values = [value for value in row.values() if isinstance(value, str)]
+            yield reader.line_num, None if _is_undecodable(''.join(values)) else row
+    elif fmt == 'ndjson':
+        for line_number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            if _is_undecodable(line):
+                yield line_number, None
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except ValueError:
+                yield line_number, None
+    else:
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+
+def _parse_int(value) -> typing.Optional[int]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    try:
+        return int(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def validate_batch(rows: typing.List[typing.Tuple[int, typing.Any]], seller):
+    """
+    Apply ``ProductSerializer``'s rules to a whole batch of raw rows.
+
+    Returns the unsaved ``Product`` instances for valid rows and a list of
+    ``(line_number, errors)`` pairs for the rest.
+    """
+    products, errors = [], []
+
+    for line_number, row in rows:
+        if not isinstance(row, dict):
+            errors.append((line_number, {'non_field_errors': [_("Malformed row.")]}))
+            continue
+
+        row_errors = {}
+        name = row.get('name') or ''
+        if isinstance(name, str):
+            name = name.strip()
+        cost = _parse_int(row.get('cost'))
+        amount_available = _parse_int(row.get('amount_available'))
+
+        if not isinstance(name, str):
+            row_errors['name'] = [_("Name must be a string.")]
+        elif not name:
+            row_errors['name'] = [_("This field is required.")]
+        elif len(name) > NAME_MAX_LENGTH:
+            row_errors['name'] = [_(f"Ensure this field has no more than {NAME_MAX_LENGTH} characters.")]
+        elif '\x00' in name:
+            row_errors['name'] = [_("Null characters are not allowed.")]
+
+        if cost is None:
+            row_errors['cost'] = [_("A valid integer is required.")]
+        elif cost < 0:
+            row_errors['cost'] = [_("Ensure this value is greater than or equal to 0.")]
+        elif cost > MAX_STOCK:
+            # Past the integer column's range.
+            row_errors['cost'] = [_(f"Ensure this value is less than or equal to {MAX_STOCK}.")]
+        elif not cost % 5 == 0:
+            row_errors['cost'] = [_("Cost must be in multiples of 5.")]
+
+        if amount_available is None:
+            row_errors['amount_available'] = [_("A valid integer is required.")]
+        elif amount_available < 1:
+            row_errors['amount_available'] = [_("Ensure this value is greater than or equal to 1.")]
+        elif amount_available > MAX_STOCK:
+            row_errors['amount_available'] = [_(f"Ensure this value is less than or equal to {MAX_STOCK}.")]
+
+        if row_errors:
+            errors.append((line_number, row_errors))
+            continue
+
+        products.append(
+            Product(seller_id=seller.pk, name=name, cost=cost, amount_available=amount_available)
+        )
+
+    return products, errors
+
+
+def _write_batch(rows, seller, result: ImportResult, batch_size: int):
+    products, errors = validate_batch(rows, seller)
+    for line_number, row_errors in errors:
+        result.add_error(line_number, row_errors)
+
+    if products:
+        with transaction.atomic():
+            Product.objects.bulk_create(products, batch_size=batch_size)
+            apply_delta(
+                seller.pk,
+                product_count=len(products),
+                total_stock=sum(product.amount_available for product in products),
+            )
+            record_product_changes(products, ProductHistory.IMPORTED)
+        result.created += len(products)
+
+
+def import_products(
+    stream: typing.Iterable[str], seller, fmt: str = 'csv', batch_size: int = DEFAULT_BATCH_SIZE
+) -> ImportResult:
+    """
+    Stream products from ``stream`` into the catalog for ``seller``.
+
+    Rows are parsed incrementally and written in batches of ``batch_size``;
+    each batch is committed on its own, so a failure part-way through keeps
+    the batches already written.
+    """
+    result = ImportResult()
+    started = time.perf_counter()
+
+    batch = []
+    for line_number, row in iter_rows(stream, fmt):
+        batch.append((line_number, row))
+        if len(batch) >= batch_size:
+            _write_batch(batch, seller, result, batch_size)
+            batch = []
+
+    if batch:
+        _write_batch(batch, seller, result, batch_size)
+
+    result.elapsed = time.perf_counter() - started
+    return result
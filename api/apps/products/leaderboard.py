@@ -0,0 +1,138 @@
+import datetime
+import threading
+import time
+import typing
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from api.apps.core.buffering import WriteBehindBuffer
+from api.apps.core.db import run_in_transaction, update_or_insert
+from api.apps.core.metrics import metrics
+from api.apps.products.models import Product, ProductSales
+
+PERIODS = (ProductSales.HOUR, ProductSales.DAY)
+
+# Most cached leaderboards per worker before the cache is emptied.
+MAX_CACHED = 1000
+
+
+def bucket_start(period: str, now: typing.Optional[datetime.datetime] = None) -> datetime.datetime:
+    now = (now or timezone.now()).astimezone(datetime.timezone.utc)
+    if period == ProductSales.HOUR:
+        return now.replace(minute=0, second=0, microsecond=0)
+    return now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _add_units(period: str, start: datetime.datetime, product_id: int, seller_id: int, units: int):
+    update_or_insert(
+        ProductSales,
+        {'period': period, 'bucket_start': start, 'product_id': product_id},
+        {'units': F('units') + units},
+        {'seller_id': seller_id, 'units': units},
+    )
+
+
+def prune_sales(retain_days: int) -> int:
+    cutoff = timezone.now() - datetime.timedelta(days=retain_days)
+    deleted, _ = ProductSales.objects.filter(bucket_start__lt=cutoff).delete()
+    return deleted
+
+
+class SalesCounter(WriteBehindBuffer):
+    """
+    Units sold per product and bucket, merged in memory so a purchase costs
+    one dict update; each flush adds them to ``product_sales`` with one
+    ``F()`` increment per product and bucket, and at most hourly drops
+    buckets past ``LEADERBOARD_RETENTION_DAYS``.
+
+    Flushes run on a background thread, and rows are updated in key order
+    so that workers flushing the same products cannot deadlock.
+    """
+
+    def __init__(self, interval: float, max_pending: int = 10000):
+        super().__init__(interval, max_pending, background=True)
+        self._last_prune = 0.0
+
+    def merge(self, old, new):
+        return old[0], old[1] + new[1]
+
+    def record(self, product_id: int, seller_id: int, units: int, now=None):
+        for period in PERIODS:
+            self.add((period, bucket_start(period, now), product_id), (seller_id, units))
+
+    def write(self, items):
+        def add_all():
+            for (period, start, product_id), (seller_id, units) in sorted(items.items()):
+                _add_units(period, start, product_id, seller_id, units)
+
+        run_in_transaction(add_all, 'leaderboard.flush')
+        metrics.incr('leaderboard.flushed', len(items))
+
+        if time.monotonic() - self._last_prune >= 3600:
+            self._last_prune = time.monotonic()
+            prune_sales(settings.LEADERBOARD_RETENTION_DAYS)
+
+
+sales_counter = SalesCounter(interval=settings.LEADERBOARD_FLUSH_INTERVAL)
+
+
+def record_sale(product, quantity: int):
+    """
+    Count a purchase towards the leaderboards once the transaction commits.
+    """
+    product_id, seller_id = product.pk, product.seller_id
+    transaction.on_commit(lambda: sales_counter.record(product_id, seller_id, quantity))
+
+
+_cache: typing.Dict[tuple, typing.Tuple[float, list]] = {}
+_cache_lock = threading.Lock()
+
+
+def top_products(period: str = ProductSales.HOUR, seller_id: typing.Optional[int] = None,
+                 limit: int = 10) -> typing.List[dict]:
+    """
+    Best sellers of the current bucket, most units first.
+
+    Rows are read in index order from ``product_sales`` with no aggregation,
+    and each worker reuses the result for ``LEADERBOARD_CACHE_TTL`` seconds.
+    """
+    start = bucket_start(period)
+    key = (period, start, seller_id, limit)
+    now = time.monotonic()
+    cached = _cache.get(key)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+
+    rows = ProductSales.objects.filter(period=period, bucket_start=start)
+    if seller_id is not None:
+        rows = rows.filter(seller_id=seller_id)
+    rows = list(rows.order_by('-units', 'product_id').values('product_id', 'seller_id', 'units')[:limit])
+    products = Product.objects.in_bulk([row['product_id'] for row in rows])
+
+    leaders = []
+    for row in rows:
+        product = products.get(row['product_id'])
+        if product is None:
+            # Retired or archived since.
+            continue
+        leaders.append({
+            'id': product.pk,
+            'name': product.name,
+            'cost': product.cost,
+            'seller': row['seller_id'],
+            'units_sold': row['units'],
+        })
+
+    with _cache_lock:
+        if len(_cache) >= MAX_CACHED:
+            _cache.clear()
+        _cache[key] = (now + settings.LEADERBOARD_CACHE_TTL, leaders)
+    return leaders
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from api.apps.products.archive import archive_candidates, archive_products
+
+
+class Command(BaseCommand):
+    help = "Move retired and long out-of-stock products from products to products_archive."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--empty-days", type=int, default=settings.PRODUCT_ARCHIVE_EMPTY_DAYS,
+            help="Archive products out of stock and unchanged for this many days.",
+        )
+        parser.add_argument("--batch-size", type=int, default=settings.PRODUCT_ARCHIVE_BATCH_SIZE)
+        parser.add_argument("--dry-run", action="store_true", help="Only count the products to archive.")
+
+    def handle(self, *args, **options):
+        if options["dry_run"]:
+            count = archive_candidates(options["empty_days"]).count()
+            self.stdout.write(f"{count} product(s) would be archived.")
+            return
+        archived = archive_products(options["empty_days"], options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} product(s)."))
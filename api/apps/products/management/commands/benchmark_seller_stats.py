@@ -0,0 +1,47 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from api.apps.products.models import Product, SellerStats
+from api.apps.products.stats import COUNTERS, aggregate_seller_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare reading seller counters from seller_stats with aggregating "
+        "products on the fly, for the sellers with the most products."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sellers", type=int, default=10, help="How many of the largest sellers to time.")
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def _time(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
+
+    def handle(self, *args, **options):
+        sellers = list(
+            SellerStats.objects.order_by("-product_count")
+            .values_list("seller_id", "product_count")[:options["sellers"]]
+        )
+        if not sellers:
+            raise CommandError("No seller counters, run `python manage.py seed_data` first.")
+
+        for seller_id, product_count in sellers:
+            counters = self._time(
+                lambda: list(SellerStats.objects.filter(seller_id=seller_id).values(*COUNTERS)),
+                options["repeat"],
+            )
+            aggregate = self._time(
+                lambda: list(aggregate_seller_stats(Product.objects.filter(seller_id=seller_id))),
+                options["repeat"],
+            )
+            self.stdout.write(
+                f"seller {seller_id} ({product_count} products): counters {counters:.3f} ms, "
+                f"aggregate {aggregate:.3f} ms ({aggregate / counters if counters else 0:.0f}x)"
+            )
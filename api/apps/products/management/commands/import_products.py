@@ -0,0 +1,41 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from api.apps.users.models import User, Role
+from api.apps.products.importers import (
+    IMPORT_FORMATS, DEFAULT_BATCH_SIZE, detect_format, import_products, text_stream,
+)
+
+
+class Command(BaseCommand):
+    help = "Bulk import products for a seller from a CSV or NDJSON file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import, '-' for stdin.")
+        parser.add_argument("--seller", required=True, help="Username of the owning seller.")
+        parser.add_argument("--format", choices=IMPORT_FORMATS, dest="fmt")
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            seller = User.objects.get(username=options["seller"], role=Role.SELLER)
+        except User.DoesNotExist:
+            raise CommandError(f"Seller '{options['seller']}' does not exist.")
+
+        fmt = options["fmt"] or detect_format(options["path"])
+        if fmt is None:
+            raise CommandError("Cannot infer the file format, pass --format.")
+
+        if options["path"] == "-":
+            stream = text_stream(sys.stdin.buffer)
+            result = import_products(stream, seller, fmt=fmt, batch_size=options["batch_size"])
+        else:
+            with text_stream(open(options["path"], "rb")) as stream:
+                result = import_products(stream, seller, fmt=fmt, batch_size=options["batch_size"])
+
+        for error in result.errors:
+            self.stderr.write(f"line {error['line']}: {error['errors']}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result.created} products, {result.failed} rejected "
+            f"in {result.elapsed:.2f}s ({result.rows_per_second:.0f} rows/s)."
+        ))
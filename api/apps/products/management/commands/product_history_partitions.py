@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from api.apps.products.history import ensure_partitions, is_partitioned, prune_history
+
+
+class Command(BaseCommand):
+    help = (
+        "Create upcoming monthly partitions of the product history table and "
+        "drop the ones past the retention period."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--retain-months", type=int, default=settings.PRODUCT_HISTORY_RETENTION_MONTHS,
+            help="Months of history to keep, including the current one.",
+        )
+        parser.add_argument(
+            "--ahead", type=int, default=settings.PRODUCT_HISTORY_MONTHS_AHEAD,
+            help="Future months to create partitions for.",
+        )
+
+    def handle(self, *args, **options):
+        for name in ensure_partitions(options["ahead"]):
+            self.stdout.write(f"Created {name}.")
+
+        dropped = prune_history(options["retain_months"])
+        for name in dropped:
+            self.stdout.write(f"Dropped {name}.")
+        if not is_partitioned():
+            self.stdout.write("History table is not partitioned; old rows were deleted instead.")
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from api.apps.products.stats import reconcile_seller_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute per-seller product counters from the products table and fix drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seller", type=int, nargs="*", default=None, help="Only these seller ids.")
+
+    def handle(self, *args, **options):
+        fixed = reconcile_seller_stats(options["seller"])
+        self.stdout.write(self.style.SUCCESS(f"Corrected counters for {fixed} seller(s)."))
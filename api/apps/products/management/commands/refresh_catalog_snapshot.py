@@ -0,0 +1,30 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from api.apps.products.snapshot import write_snapshot
+
+
+class Command(BaseCommand):
+    help = "Write the shared catalog snapshot, once or every --interval seconds."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default=None, help="Defaults to CATALOG_SNAPSHOT_PATH.")
+        parser.add_argument("--interval", type=float, default=0, help="Keep refreshing every N seconds.")
+
+    def handle(self, *args, **options):
+        path = options["path"] or settings.CATALOG_SNAPSHOT_PATH
+        if not path:
+            raise CommandError("Set DJ_CATALOG_SNAPSHOT_PATH or pass --path.")
+
+        while True:
+            started = time.perf_counter()
+            version = write_snapshot(path)
+            self.stdout.write(
+                f"Catalog snapshot v{version} written in {time.perf_counter() - started:.3f}s."
+            )
+            if not options["interval"]:
+                return
+            close_old_connections()
+            time.sleep(options["interval"])
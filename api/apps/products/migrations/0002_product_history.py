@@ -0,0 +1,69 @@
+# Generated by Django 4.2.26 on 2026-10-19 09:45
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+PARTITIONED_TABLE_SQL = """
+CREATE TABLE product_history (
+    id bigserial,
+    product_id bigint NOT NULL,
+    seller_id bigint NOT NULL,
+    cost integer NOT NULL CHECK (cost >= 0),
+    amount_available integer NOT NULL CHECK (amount_available >= 0),
+    change varchar(16) NOT NULL,
+    changed_at timestamp with time zone NOT NULL,
+    PRIMARY KEY (id, changed_at)
+) PARTITION BY RANGE (changed_at);
+CREATE INDEX product_his_product_fb572d_idx ON product_history (product_id, changed_at);
+CREATE TABLE product_history_default PARTITION OF product_history DEFAULT;
+"""
+
+
+def create_history_table(apps, schema_editor):
+    """
+    Range-partitioned by month on Postgres; monthly partitions are added by
+    the ``product_history_partitions`` command. A plain table elsewhere.
+    """
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(PARTITIONED_TABLE_SQL)
+    else:
+        schema_editor.create_model(apps.get_model('products', 'ProductHistory'))
+
+
+def drop_history_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("DROP TABLE product_history CASCADE")
+    else:
+        schema_editor.delete_model(apps.get_model('products', 'ProductHistory'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='ProductHistory',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('product_id', models.BigIntegerField()),
+                        ('seller_id', models.BigIntegerField()),
+                        ('cost', models.PositiveIntegerField()),
+                        ('amount_available', models.PositiveIntegerField()),
+                        ('change', models.CharField(choices=[('created', 'Created'), ('updated', 'Updated'), ('purchased', 'Purchased'), ('imported', 'Imported')], max_length=16)),
+                        ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                    ],
+                    options={
+                        'db_table': 'product_history',
+                        'indexes': [models.Index(fields=['product_id', 'changed_at'], name='product_his_product_fb572d_idx')],
+                    },
+                ),
+            ],
+        ),
+        migrations.RunPython(create_history_table, drop_history_table),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.26 on 2026-10-19 09:50
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+import django.db.models.deletion
+
+
+def backfill_seller_stats(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    SellerStats = apps.get_model('products', 'SellerStats')
+    totals = Product.objects.order_by().values('seller_id').annotate(
+        product_count=Count('id'),
+        total_stock=Sum('amount_available'),
+        out_of_stock_count=Count('id', filter=Q(amount_available=0)),
+    )
+    SellerStats.objects.bulk_create((SellerStats(**row) for row in totals.iterator()), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_activesession_expiry_date'),
+        ('products', '0002_product_history'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SellerStats',
+            fields=[
+                ('seller', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='product_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('product_count', models.PositiveIntegerField(default=0)),
+                ('total_stock', models.PositiveBigIntegerField(default=0)),
+                ('out_of_stock_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'seller_stats',
+            },
+        ),
+        migrations.RunPython(backfill_seller_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.26 on 2026-10-19 10:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('machines', '0001_initial'),
+        ('products', '0004_product_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedproduct',
+            name='machine_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='machine',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='products', to='machines.machine'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['machine', 'id'], name='products_machine_ece30c_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.26 on 2026-10-19 10:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_product_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=8)),
+                ('bucket_start', models.DateTimeField()),
+                ('product_id', models.BigIntegerField()),
+                ('seller_id', models.BigIntegerField()),
+                ('units', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'product_sales',
+                'indexes': [models.Index(fields=['period', 'bucket_start', '-units'], name='product_sales_top_idx'), models.Index(fields=['seller_id', 'period', 'bucket_start', '-units'], name='product_sales_seller_top_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='productsales',
+            constraint=models.UniqueConstraint(fields=('period', 'bucket_start', 'product_id'), name='product_sales_bucket_product_uniq'),
+        ),
+    ]
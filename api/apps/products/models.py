@@ -1,18 +1,161 @@
 from django.db import models
+from django.utils import timezone
+
+
+# Largest stock a product may hold: the top of PositiveIntegerField on every
+# backend, which also fits the catalog snapshot's uint32 columns.
+MAX_STOCK = 2 ** 31 - 1
+
+
+class ProductManager(models.Manager):
+    def get_queryset(self):
+        return super().get_queryset().filter(retired_at__isnull=True)
 
 
 class Product(models.Model):
+    """
+    A product on sale. Deleting a product retires it: ``objects`` hides
+    retired rows, and ``archive_products`` later moves them, along with
+    products long out of stock, to ``ArchivedProduct``.
+    """
     seller = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='products')
+    # Empty for products sold outside any machine.
+    machine = models.ForeignKey(
+        'machines.Machine', on_delete=models.PROTECT, related_name='products',
+        null=True, blank=True, db_index=False,
+    )
     name = models.CharField(max_length=255)
     cost = models.PositiveIntegerField(default=0)
     amount_available = models.PositiveIntegerField(default=0)
+    # Bumped by every write; the product's ETag, checked by conditional updates.
+    version = models.PositiveIntegerField(default=1)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    retired_at = models.DateTimeField(null=True, blank=True)
+
+    objects = ProductManager()
+    all_objects = models.Manager()
     
     class Meta:
         db_table = 'products'
         indexes = [
             models.Index(fields=['seller']),
             models.Index(fields=['name']),
-        ]
\ No newline at end of file
+            models.Index(fields=['machine', 'id']),
+        ]
+
+    def retire(self) -> bool:
+        """
+        Retire the product unless it changed since it was loaded.
+        """
+        now = timezone.now()
+        retired = Product.objects.filter(pk=self.pk, version=self.version).update(
+            retired_at=now, updated_at=now, version=models.F('version') + 1
+        )
+        if retired:
+            self.retired_at, self.updated_at, self.version = now, now, self.version + 1
+        return bool(retired)
+
+
+class ArchivedProduct(models.Model):
+    """
+    A retired or long out-of-stock product moved out of ``products``. Keeps
+    the product's id; ``retired_at`` is empty for products archived for
+    being out of stock.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    seller = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='archived_products')
+    machine_id = models.BigIntegerField(null=True, blank=True)
+    name = models.CharField(max_length=255)
+    cost = models.PositiveIntegerField()
+    amount_available = models.PositiveIntegerField()
+
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    retired_at = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'products_archive'
+
+
+class ProductHistory(models.Model):
+    """
+    The cost and stock of a product after each change to either.
+
+    On Postgres the table is range-partitioned by month on ``changed_at``
+    (see ``api.apps.products.history``), so products are referenced by id
+    rather than by foreign key and history outlives deleted products.
+    """
+    CREATED = 'created'
+    UPDATED = 'updated'
+    PURCHASED = 'purchased'
+    IMPORTED = 'imported'
+    CHANGE_CHOICES = [
+        (CREATED, 'Created'),
+        (UPDATED, 'Updated'),
+        (PURCHASED, 'Purchased'),
+        (IMPORTED, 'Imported'),
+    ]
+
+    product_id = models.BigIntegerField()
+    seller_id = models.BigIntegerField()
+    cost = models.PositiveIntegerField()
+    amount_available = models.PositiveIntegerField()
+    change = models.CharField(max_length=16, choices=CHANGE_CHOICES)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'product_history'
+        indexes = [
+            models.Index(fields=['product_id', 'changed_at']),
+        ]
+
+
+class SellerStats(models.Model):
+    """
+    Per-seller product counters, kept in step with ``products`` by
+    ``api.apps.products.stats`` in the same transaction as each change.
+    """
+    seller = models.OneToOneField(
+        'users.User', on_delete=models.CASCADE, primary_key=True, related_name='product_stats'
+    )
+    product_count = models.PositiveIntegerField(default=0)
+    total_stock = models.PositiveBigIntegerField(default=0)
+    out_of_stock_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'seller_stats'
+
+
+class ProductSales(models.Model):
+    """
+    Units sold per product in one hour or day, the best-sellers leaderboard.
+    Counted in memory at purchase time and added here in batches by
+    ``api.apps.products.leaderboard``.
+    """
+    HOUR = 'hour'
+    DAY = 'day'
+    PERIOD_CHOICES = [
+        (HOUR, 'Hour'),
+        (DAY, 'Day'),
+    ]
+
+    period = models.CharField(max_length=8, choices=PERIOD_CHOICES)
+    bucket_start = models.DateTimeField()
+    product_id = models.BigIntegerField()
+    seller_id = models.BigIntegerField()
+    units = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'product_sales'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['period', 'bucket_start', 'product_id'], name='product_sales_bucket_product_uniq'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['period', 'bucket_start', '-units'], name='product_sales_top_idx'),
+            models.Index(fields=['seller_id', 'period', 'bucket_start', '-units'], name='product_sales_seller_top_idx'),
+        ]
@@ -1,10 +1,14 @@
+from django.conf import settings
 from rest_framework import serializers
 from django.utils.translation import gettext_lazy as _
-from api.apps.products.models import Product
+from api.apps.products.models import MAX_STOCK, ArchivedProduct, Product, ProductSales, SellerStats
+from api.apps.products.importers import detect_format
+from api.apps.products.snapshot import get_snapshot
+from api.apps.core.tracing import TracedSerializerMixin
 
 
-class ProductSerializer(serializers.ModelSerializer):
-    amount_available = serializers.IntegerField(min_value=1)
+class ProductSerializer(TracedSerializerMixin, serializers.ModelSerializer):
+    amount_available = serializers.IntegerField(min_value=1, max_value=MAX_STOCK)
     
     class Meta:
         model = Product
@@ -20,18 +24,68 @@ class ProductSerializer(serializers.ModelSerializer):
     
     def validate(self, attrs):
         validated_data = super().validate(attrs)
-        validated_data['seller'] = self.context['request'].user
+        validated_data['seller_id'] = self.context['request'].user.pk
         return validated_data
 
     def create(self, validated_data):
         return super().create(validated_data)
 
 
-class BuyProductSerializer(serializers.Serializer):
+class ArchivedProductSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ArchivedProduct
+        fields = ('id', 'name', 'cost', 'amount_available', 'retired_at', 'archived_at')
+
+
+class LeaderboardQuerySerializer(serializers.Serializer):
+    period = serializers.ChoiceField(choices=ProductSales.PERIOD_CHOICES, default=ProductSales.HOUR)
+    seller = serializers.IntegerField(required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=settings.LEADERBOARD_SIZE, default=10)
+
+
+class RestockSerializer(serializers.Serializer):
+    quantity = serializers.IntegerField(min_value=1, max_value=MAX_STOCK)
+
+
+class SellerStatsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SellerStats
+        fields = ('product_count', 'total_stock', 'out_of_stock_count')
+
+
+class ProductBatchSerializer(serializers.Serializer):
+    ids = serializers.CharField()
+
+    def validate_ids(self, value):
+        # A dict keeps the first occurrence of each id, in order.
+        ids = {}
+        for part in value.split(','):
+            part = part.strip()
+            if not (part.isascii() and part.isdigit()):
+                raise serializers.ValidationError(
+                    _("Enter a comma-separated list of product IDs.")
+                )
+            ids[int(part)] = None
+            if len(ids) > settings.PRODUCT_BATCH_MAX:
+                raise serializers.ValidationError(
+                    _(f"Ensure there are no more than {settings.PRODUCT_BATCH_MAX} IDs.")
+                )
+        return list(ids)
+
+
+class BuyProductSerializer(TracedSerializerMixin, serializers.Serializer):
     product = serializers.IntegerField()
     quantity = serializers.IntegerField(min_value=1)
 
     def validate_product(self, value):
+        # The snapshot only saves the lookup; stock and existence are
+        # re-checked under lock when the purchase is made.
+        snapshot = get_snapshot()
+        if snapshot is not None:
+            product = snapshot.get_product(value)
+            if product is not None:
+                return product
+
         try:
             product = Product.objects.get(id=value)
         except Product.DoesNotExist:
@@ -39,3 +93,14 @@ class BuyProductSerializer(serializers.Serializer):
                 _("Product with the given ID does not exist.")
             )
         return product
+
+
+class ProductImportSerializer(serializers.Serializer):
+    file = serializers.FileField()
+
+    def validate_file(self, value):
+        if detect_format(value.name) is None:
+            raise serializers.ValidationError(
+                _("Only .csv and .ndjson files can be imported.")
+            )
+        return value
@@ -0,0 +1,235 @@
+import array
+import bisect
+import mmap
+import os
+import struct
+import threading
+import time
+import typing
+from pathlib import Path
+
+from django.conf import settings
+from api.apps.products.models import Product
+
+# magic, version, generated_at, count, names size
+HEADER = struct.Struct('<8sQdII')
+MAGIC = b'VNDCAT03'
+VERSION = struct.Struct('<Q')
+
+# How often a reader without a snapshot looks for one to appear.
+REOPEN_INTERVAL = 1.0
+
+
+def version_path(path: Path) -> Path:
+    return path.with_name(path.name + '.version')
+
+
+def _read_version(path: Path) -> int:
+    try:
+        return VERSION.unpack(version_path(path).read_bytes())[0]
+    except (FileNotFoundError, struct.error):
+        return 0
+
+
+def write_snapshot(path, queryset=None) -> int:
+    """
+    Dump the catalog into a compact array-backed file and publish it.
+
+    The file is written next to ``path`` and renamed into place, then the
+    version stamp is bumped so readers remap it. Returns the new version.
+
+    Layout after the header, all in native byte order: product ids (int64),
+    seller ids (int64), ``updated_at`` timestamps (float64), costs (uint32),
+    stock (uint32), versions (uint32), name offsets (uint32, count + 1
+    entries) and the UTF-8 encoded names.
+    """
+    path = Path(path)
+    if queryset is None:
+        queryset = Product.objects.all()
+
+    ids, sellers, updated = array.array('q'), array.array('q'), array.array('d')
+    costs, stocks, versions = array.array('I'), array.array('I'), array.array('I')
+    offsets, names = array.array('I', [0]), bytearray()
+
+    rows = queryset.order_by('id').values_list(
+        'id', 'seller_id', 'updated_at', 'cost', 'amount_available', 'version', 'name'
+    )
+    for product_id, seller_id, updated_at, cost, amount_available, product_version, name in rows.iterator(chunk_size=10000):
+        ids.append(product_id)
+        sellers.append(seller_id)
+        updated.append(updated_at.timestamp())
+        costs.append(cost)
+        stocks.append(amount_available)
+        versions.append(product_version)
+        names.extend(name.encode())
+        offsets.append(len(names))
+
+    version = _read_version(path) + 1
+    header = HEADER.pack(MAGIC, version, time.time(), len(ids), len(names))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        for column in (ids, sellers, updated, costs, stocks, versions, offsets):
+            f.write(column.tobytes())
+        f.write(names)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+    # Bump the stamp in place so readers that have it mapped see the change.
+    stamp = version_path(path)
+    if not stamp.exists():
+        stamp.write_bytes(VERSION.pack(0))
+    with open(stamp, 'r+b') as f:
+        f.write(VERSION.pack(version))
+    return version
+
+
+class SnapshotColumns:
+    """
+    The columns of one published snapshot. Never modified once built, so a
+    reader holding a reference sees one consistent catalog even while a
+    newer snapshot is being mapped.
+    """
+
+    def __init__(self, data: mmap.mmap, path):
+        magic, version, generated_at, count, names_size = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a catalog snapshot.")
+
+        view = memoryview(data)
+        offset = HEADER.size
+
+        def column(fmt, length):
+            nonlocal offset
+            size = struct.calcsize(fmt) * length
+            values = view[offset:offset + size].cast(fmt)
+            offset += size
+            return values
+
+        self.ids = column('q', count)
+        self.sellers = column('q', count)
+        self.updated = column('d', count)
+        self.costs = column('I', count)
+        self.stocks = column('I', count)
+        self.versions = column('I', count)
+        self.offsets = column('I', count + 1)
+        self.names = view[offset:offset + names_size]
+        self.generated_at = generated_at
+        self.version = version
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _row(self, index: int) -> dict:
+        return {
+            'id': self.ids[index],
+            'name': bytes(self.names[self.offsets[index]:self.offsets[index + 1]]).decode(),
+            'cost': self.costs[index],
+            'amount_available': self.stocks[index],
+        }
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._row(i) for i in range(*index.indices(len(self)))]
+        return self._row(index)
+
+    def index_of(self, product_id: int) -> typing.Optional[int]:
+        index = bisect.bisect_left(self.ids, product_id)
+        if index < len(self.ids) and self.ids[index] == product_id:
+            return index
+        return None
+
+    def get(self, product_id: int) -> typing.Optional[dict]:
+        index = self.index_of(product_id)
+        if index is None:
+            return None
+        return self._row(index)
+
+    def get_product(self, product_id: int) -> typing.Optional[Product]:
+        """
+        An unsaved ``Product`` built from the snapshot, for read-only checks.
+        """
+        index = self.index_of(product_id)
+        if index is None:
+            return None
+        return Product(seller_id=self.sellers[index], **self._row(index))
+
+
+class CatalogSnapshot:
+    """
+    Read-only, zero-copy view of the catalog snapshot at ``path``.
+
+    Columns are ``memoryview`` casts over a shared ``mmap``, so every worker
+    reads the same page-cache pages. Each access checks the mapped version
+    stamp and remaps when the refresher has published a new file. A remap
+    swaps in a whole new ``SnapshotColumns``; readers take ``columns`` once
+    and use that reference throughout.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._stamp: typing.Optional[mmap.mmap] = None
+        self._next_open = 0.0
+        self.columns: typing.Optional[SnapshotColumns] = None
+
+    def _open_stamp(self) -> bool:
+        if self._stamp is not None:
+            return True
+        now = time.monotonic()
+        if now < self._next_open:
+            return False
+        self._next_open = now + REOPEN_INTERVAL
+        try:
+            with open(version_path(self.path), 'rb') as f:
+                self._stamp = mmap.mmap(f.fileno(), VERSION.size, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            return False
+        return True
+
+    def _map(self) -> SnapshotColumns:
+        with open(self.path, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return SnapshotColumns(data, self.path)
+
+    def current(self) -> typing.Optional[SnapshotColumns]:
+        """
+        Remap if a newer snapshot was published, and return its columns;
+        ``None`` if no snapshot is usable.
+        """
+        if not self._open_stamp():
+            return None
+        version = VERSION.unpack_from(self._stamp)[0]
+        columns = self.columns
+        if columns is None or columns.version != version:
+            with self._lock:
+                columns = self.columns
+                if columns is None or columns.version != version:
+                    try:
+                        columns = self.columns = self._map()
+                    except (FileNotFoundError, ValueError, struct.error):
+                        return None
+        if time.time() - columns.generated_at > settings.CATALOG_SNAPSHOT_MAX_AGE:
+            return None
+        return columns
+
+
+_snapshot: typing.Optional[CatalogSnapshot] = None
+
+
+def get_snapshot() -> typing.Optional[SnapshotColumns]:
+    """
+    The current snapshot's columns, or ``None`` when disabled or unavailable.
+    Callers keep the returned object for the whole request, so every lookup
+    reads the same snapshot.
+    """
+    global _snapshot
+    if not settings.CATALOG_SNAPSHOT_PATH:
+        return None
+    snapshot = _snapshot
+    if snapshot is None or snapshot.path != Path(settings.CATALOG_SNAPSHOT_PATH):
+        snapshot = _snapshot = CatalogSnapshot(settings.CATALOG_SNAPSHOT_PATH)
+    return snapshot.current()
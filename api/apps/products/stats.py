@@ -0,0 +1,109 @@
+import typing
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Greatest
+
+from api.apps.core.db import locked_get, update_or_insert
+from api.apps.core.metrics import metrics
+from api.apps.jobs.queue import enqueue
+from api.apps.products.models import Product, SellerStats
+
+COUNTERS = ('product_count', 'total_stock', 'out_of_stock_count')
+
+
+def stock_delta(before: typing.Optional[int], after: typing.Optional[int]) -> typing.Dict[str, int]:
+    """
+    Counter changes for one product whose stock went from ``before`` to
+    ``after``; ``None`` means the product did not exist on that side.
+    """
+    return {
+        'product_count': (after is not None) - (before is not None),
+        'total_stock': (after or 0) - (before or 0),
+        'out_of_stock_count': (after == 0) - (before == 0),
+    }
+
+
+def apply_delta(seller_id: int, **delta: int):
+    """
+    Add ``delta`` to the seller's counters with a single ``F()`` UPDATE.
+
+    Must run in the transaction that changes the products, so the counters
+    commit or roll back with them. Counters that have drifted and would go
+    below zero are clamped at zero instead of failing the change, and the
+    seller is queued for ``reconcile_seller_stats``.
+    """
+    delta = {name: value for name, value in delta.items() if value}
+    if not delta:
+        return
+    stays_positive = Q(**{f'{name}__gte': -value for name, value in delta.items() if value < 0})
+    changes = {name: F(name) + value for name, value in delta.items()}
+    if SellerStats.objects.filter(stays_positive, seller_id=seller_id).update(**changes):
+        return
+
+    # Either a counter has drifted or this is the seller's first change.
+    if any(value < 0 for value in delta.values()):
+        _drifted(seller_id)
+    update_or_insert(
+        SellerStats,
+        {'seller_id': seller_id},
+        {name: Greatest(F(name) + value, 0) for name, value in delta.items()},
+        {name: max(value, 0) for name, value in delta.items()},
+    )
+
+
+def _drifted(seller_id: int):
+    metrics.incr('seller_stats.drift')
+    enqueue('products.reconcile_stats', {'seller_ids': [seller_id]})
+
+
+def record_stock_change(seller_id: int, before: typing.Optional[int], after: typing.Optional[int]):
+    apply_delta(seller_id, **stock_delta(before, after))
+
+
+def aggregate_seller_stats(queryset=None):
+    """
+    Counters computed from ``products``, one row per seller with products.
+    """
+    if queryset is None:
+        queryset = Product.objects.all()
+    return queryset.order_by().values('seller_id').annotate(
+        product_count=Count('id'),
+        total_stock=Sum('amount_available'),
+        out_of_stock_count=Count('id', filter=Q(amount_available=0)),
+    )
+
+
+def reconcile_seller_stats(seller_ids: typing.Optional[typing.Iterable[int]] = None) -> int:
+    """
+    Recompute the counters from ``products`` and fix the ones that drifted.
+    Returns the number of sellers corrected.
+
+    Drift is found with one grouped aggregate; each drifted seller is then
+    recounted under its stats row lock, so changes committed meanwhile are
+    not overwritten.
+    """
+    products = Product.objects.all()
+    stats = SellerStats.objects.all()
+    if seller_ids is not None:
+        seller_ids = list(seller_ids)
+        products = products.filter(seller_id__in=seller_ids)
+        stats = stats.filter(seller_id__in=seller_ids)
+
+    expected = {row.pop('seller_id'): row for row in aggregate_seller_stats(products)}
+    stored = {row.pop('seller_id'): row for row in stats.values('seller_id', *COUNTERS)}
+    empty = dict.fromkeys(COUNTERS, 0)
+    drifted = [
+        seller_id for seller_id in expected.keys() | stored.keys()
+        if expected.get(seller_id, empty) != stored.get(seller_id, empty)
+    ]
+
+    for seller_id in drifted:
+        with transaction.atomic():
+            SellerStats.objects.get_or_create(seller_id=seller_id)
+            row = locked_get(SellerStats.objects, seller_id=seller_id)
+            counts = next(iter(aggregate_seller_stats(Product.objects.filter(seller_id=seller_id))), empty)
+            for name in COUNTERS:
+                setattr(row, name, counts[name])
+            row.save(update_fields=COUNTERS)
+    return len(drifted)
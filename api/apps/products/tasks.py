@@ -0,0 +1,13 @@
+from api.apps.jobs.queue import task
+from api.apps.products.archive import archive_products
+from api.apps.products.stats import reconcile_seller_stats
+
+
+@task('products.archive')
+def archive(payload):
+    archive_products(payload.get('empty_days'), payload.get('batch_size'))
+
+
+@task('products.reconcile_stats')
+def reconcile_stats(payload):
+    reconcile_seller_stats(payload.get('seller_ids'))
@@ -1,16 +1,39 @@
+import asyncio
+import datetime
+import io
 import json
+import tempfile
+from unittest import mock
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APIClient
-from api.apps.products.models import Product
+from api.apps.jobs.models import Job
+from api.apps.jobs.queue import claim, run_job
+from api.apps.products.models import ArchivedProduct, Product, ProductHistory, ProductSales, SellerStats
 from api.apps.products.utils import amount_to_denominations
+from api.apps.products.importers import import_products, validate_batch
+from api.apps.products.events import EventHub, SocketBroker
+from api.apps.products.views import _parse_ids
+from api.apps.products.stats import apply_delta, reconcile_seller_stats
+from api.apps.products.archive import archive_products
+from api.apps.products.snapshot import CatalogSnapshot, write_snapshot
+from api.apps.products.leaderboard import clear_cache, sales_counter
+from api.apps.products.history import add_months, partition_name, price_at, prune_history
 
 User = get_user_model()
 
 
+def tearDownModule():
+    # Don't let buffered sales flush into the destroyed test database.
+    sales_counter.discard()
+
+
 class UtilsTestCase(TestCase):
     """Test utility functions."""
 
@@ -82,6 +105,115 @@ class ProductTestCase(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data["results"]), 1)
 
+    def test_batch_preserves_order_and_reports_missing(self):
+        """Test batch lookup of products by ID"""
+        first = Product.objects.create(name="Cola", cost=50, amount_available=10, seller=self.seller)
+        second = Product.objects.create(name="Water", cost=20, amount_available=3, seller=self.seller)
+        self.client.force_authenticate(user=self.buyer)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                reverse("product-batch"), {"ids": f"{second.pk},0,{first.pk},{second.pk}"}
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([p["id"] for p in response.data["results"]], [second.pk, first.pk])
+        self.assertEqual(response.data["missing"], [0])
+
+    def test_batch_rejects_invalid_and_oversized(self):
+        """Test batch lookup validation"""
+        self.client.force_authenticate(user=self.buyer)
+        response = self.client.get(reverse("product-batch"), {"ids": "1,abc"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(reverse("product-batch"), {"ids": "1,\u00b2"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        with override_settings(PRODUCT_BATCH_MAX=2):
+            response = self.client.get(reverse("product-batch"), {"ids": "1,2,3"})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            response = self.client.get(reverse("product-batch"), {"ids": "1,2,1,2"})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_retrieve_conditional(self):
+        """Test ETag and Last-Modified handling on product detail"""
+        product = Product.objects.create(name="Cola", cost=50, amount_available=10, seller=self.seller)
+        url = reverse("product-detail", args=[product.pk])
+        self.client.force_authenticate(user=self.buyer)
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response["ETag"]
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.buyer.deposit = 100
+        self.buyer.save()
+        self.client.post(reverse("buy_product"), {"product": product.pk, "quantity": 1}, format="json")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+        response = self.client.get(reverse("product-detail", args=["\u00b2"]), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_conditional_update(self):
+        """Test If-Match updates fail with 412 once the product changed"""
+        product = Product.objects.create(name="Cola", cost=50, amount_available=10, seller=self.seller)
+        url = reverse("product-detail", args=[product.pk])
+        self.client.force_authenticate(user=self.seller)
+        etag = self.client.get(url)["ETag"]
+
+        self.buyer.deposit = 100
+        self.buyer.save()
+        self.client.force_authenticate(user=self.buyer)
+        self.client.post(reverse("buy_product"), {"product": product.pk, "quantity": 1}, format="json")
+
+        self.client.force_authenticate(user=self.seller)
+        response = self.client.patch(url, {"amount_available": 20}, format="json", HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        product.refresh_from_db()
+        self.assertEqual(product.amount_available, 9)
+
+        etag = self.client.get(url)["ETag"]
+        response = self.client.patch(url, {"amount_available": 20}, format="json", HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+        product.refresh_from_db()
+        self.assertEqual((product.amount_available, product.version), (20, 3))
+
+        response = self.client.delete(url, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+
+    def test_restock(self):
+        """Test restocking adds to the current stock"""
+        product = Product.objects.create(name="Cola", cost=50, amount_available=0, seller=self.seller)
+        reconcile_seller_stats()
+        self.client.force_authenticate(user=self.seller)
+
+        response = self.client.post(reverse("product-restock", args=[product.pk]), {"quantity": 5}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["amount_available"], 5)
+        self.assertEqual(reconcile_seller_stats(), 0)
+
+        # Units sold since the seller last looked are kept.
+        Product.objects.filter(pk=product.pk).update(amount_available=3)
+        response = self.client.post(reverse("product-restock", args=[product.pk]), {"quantity": 5}, format="json")
+        self.assertEqual(response.data["amount_available"], 8)
+        self.assertEqual(Product.objects.get(pk=product.pk).version, 3)
+
+        response = self.client.post(reverse("product-restock", args=[product.pk]), {"quantity": 0}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(
+            reverse("product-restock", args=[product.pk]), {"quantity": 2 ** 31 - 8}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Product.objects.get(pk=product.pk).amount_available, 8)
+
     def test_create_product_invalid_cost(self):
         """Test create product negative cost that's not a multiple of 5"""
         self.client.force_authenticate(user=self.seller)
@@ -231,4 +363,462 @@ class ProductTestCase(TestCase):
             reverse('product-detail', args=[product.id])
         )
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
-        self.assertEqual(Product.objects.count(), 0)
\ No newline at end of file
+        self.assertEqual(Product.objects.count(), 0)
+        self.assertIsNotNone(Product.all_objects.get(pk=product.pk).retired_at)
+
+        response = self.client.get(reverse('product-detail', args=[product.id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+class ProductImportTestCase(TestCase):
+    """
+    Test bulk product import from CSV and NDJSON files.
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.import_url = reverse("import_products")
+        self.seller = User.objects.create_user(
+            username="test_seller",
+            password="StrongPassword123!",  # noqa: S106
+            role="seller"
+        )
+
+    def test_validate_batch(self):
+        rows = [
+            (2, {"name": "Cola", "cost": "50", "amount_available": "10"}),
+            (3, {"name": "Chips", "cost": "52", "amount_available": "10"}),
+            (4, {"name": "", "cost": "50", "amount_available": "0"}),
+            (5, None),
+            (6, {"name": 123, "cost": 50, "amount_available": 3}),
+            (7, {"name": "Big", "cost": 50, "amount_available": 99999999999999999999}),
+            (8, {"name": "Dear", "cost": 2 ** 31, "amount_available": 3}),
+            (9, {"name": "Co\x00la", "cost": 50, "amount_available": 3}),
+        ]
+        products, errors = validate_batch(rows, self.seller)
+        self.assertEqual([p.name for p in products], ["Cola"])
+        self.assertEqual([line for line, _ in errors], [3, 4, 5, 6, 7, 8, 9])
+        self.assertIn("cost", errors[0][1])
+        self.assertIn("name", errors[1][1])
+        self.assertIn("amount_available", errors[1][1])
+        self.assertEqual(errors[3][1], {"name": ["Name must be a string."]})
+        self.assertEqual(list(errors[4][1]), ["amount_available"])
+        self.assertEqual(list(errors[5][1]), ["cost"])
+        self.assertEqual(errors[6][1], {"name": ["Null characters are not allowed."]})
+
+    def test_import_csv(self):
+        content = "name,cost,amount_available\nCola,50,10\nChips,52,10\nWater,25,3\n"
+        upload = SimpleUploadedFile("products.csv", content.encode(), content_type="text/csv")
+
+        self.client.force_authenticate(user=self.seller)
+        response = self.client.post(self.import_url, {"file": upload}, format="multipart")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual(response.data["failed"], 1)
+        self.assertEqual(response.data["errors"][0]["line"], 3)
+        self.assertEqual(Product.objects.filter(seller=self.seller).count(), 2)
+
+    def test_import_rejects_undecodable_lines(self):
+        content = b"name,cost,amount_available\nCola,50,10\nCh\xff\xfeips,50,10\nWater,25,3\n"
+        upload = SimpleUploadedFile("products.csv", content, content_type="text/csv")
+
+        self.client.force_authenticate(user=self.seller)
+        response = self.client.post(self.import_url, {"file": upload}, format="multipart")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data["created"], response.data["failed"]), (2, 1))
+        self.assertEqual(response.data["errors"][0]["line"], 3)
+
+    def test_import_ndjson_batches(self):
+        lines = [json.dumps({"name": f"Item {i}", "cost": 5, "amount_available": 1}) for i in range(7)]
+        stream = io.StringIO("\n".join(lines + ["{not json"]))
+
+        result = import_products(stream, self.seller, fmt="ndjson", batch_size=3)
+
+        self.assertEqual(result.created, 7)
+        self.assertEqual(result.failed, 1)
+        self.assertEqual(Product.objects.count(), 7)
+
+    def test_import_out_of_range_rows_do_not_abort(self):
+        lines = [
+            json.dumps({"name": "Big", "cost": 5, "amount_available": 99999999999999999999}),
+            json.dumps({"name": "Dear", "cost": 2 ** 31, "amount_available": 1}),
+            json.dumps({"name": "Cola", "cost": 5, "amount_available": 1}),
+        ]
+        result = import_products(io.StringIO("\n".join(lines)), self.seller, fmt="ndjson", batch_size=1)
+        self.assertEqual((result.created, result.failed), (1, 2))
+
+    def test_import_unsupported_file(self):
+        upload = SimpleUploadedFile("products.txt", b"name,cost\n")
+        self.client.force_authenticate(user=self.seller)
+        response = self.client.post(self.import_url, {"file": upload}, format="multipart")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class StockEventTestCase(SimpleTestCase):
+    """
+    Test fan-out of stock events to subscribers.
+    """
+    def event(self, product=1, seller=1, amount_available=5):
+        return {
+            "type": "product.updated", "product": product, "seller": seller,
+            "cost": 50, "amount_available": amount_available,
+        }
+
+    def test_stream_filter_ids(self):
+        self.assertEqual(_parse_ids(" 1,\u00b2,2 ,x,"), {1, 2})
+
+    async def test_subscription_filters(self):
+        event_hub = EventHub()
+        by_product = event_hub.subscribe(products=[1])
+        by_seller = event_hub.subscribe(sellers=[7])
+
+        event_hub.dispatch(self.event(product=1, seller=2))
+        event_hub.dispatch(self.event(product=3, seller=7))
+        await asyncio.sleep(0)
+
+        self.assertEqual(by_product.queue.qsize(), 1)
+        self.assertEqual((await by_seller.queue.get())["product"], 3)
+        self.assertTrue(by_seller.queue.empty())
+
+    async def test_slow_client_dropped(self):
+        event_hub = EventHub()
+        subscription = event_hub.subscribe(maxsize=2)
+
+        for amount in range(3):
+            event_hub.dispatch(self.event(amount_available=amount))
+        await asyncio.sleep(0)
+
+        self.assertTrue(subscription.dropped)
+        self.assertIsNone(await subscription.queue.get())
+
+    async def test_socket_broker_fan_out(self):
+        event_hub = EventHub()
+        subscription = event_hub.subscribe()
+        with tempfile.TemporaryDirectory() as directory:
+            broker = SocketBroker(event_hub, directory)
+            broker.start()
+            try:
+                broker.publish(self.event(amount_available=3))
+                event = await asyncio.wait_for(subscription.queue.get(), timeout=2)
+            finally:
+                broker.stop()
+        self.assertEqual(event["amount_available"], 3)
+
+
+class StockEventPublishTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.seller = User.objects.create_user(username="test_seller", password="pass", role="seller")
+        self.buyer = User.objects.create_user(username="test_buyer", password="pass", role="buyer", deposit=100)
+        self.product = Product.objects.create(name="Cola", cost=50, amount_available=10, seller=self.seller)
+
+    def test_buy_publishes_stock(self):
+        self.client.force_authenticate(user=self.buyer)
+
+        with mock.patch("api.apps.products.events.get_broker") as get_broker:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    reverse("buy_product"), data=json.dumps({"product": self.product.pk, "quantity": 2}),
+                    content_type="application/json"
+                )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        event = get_broker.return_value.publish.call_args.args[0]
+        self.assertEqual(event["product"], self.product.pk)
+        self.assertEqual(event["amount_available"], 8)
+
+
+class CatalogSnapshotTestCase(TestCase):
+    """
+    Test the memory-mapped catalog snapshot and the views that read it.
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = f"{self.directory.name}/catalog.bin"
+        self.seller = User.objects.create_user(username="test_seller", password="pass", role="seller")
+        self.buyer = User.objects.create_user(username="test_buyer", password="pass", role="buyer")
+        self.products = [
+            Product.objects.create(name=name, cost=50, amount_available=5, seller=self.seller)
+            for name in ("Cola", "Café", "Water")
+        ]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip_and_remap(self):
+        write_snapshot(self.path)
+        snapshot = CatalogSnapshot(self.path)
+        columns = snapshot.current()
+        self.assertEqual(len(columns), 3)
+        self.assertEqual(columns.get(self.products[1].pk)["name"], "Café")
+        self.assertIsNone(columns.get(0))
+
+        Product.objects.filter(pk=self.products[0].pk).update(amount_available=1)
+        write_snapshot(self.path)
+        remapped = snapshot.current()
+        self.assertIsNot(remapped, columns)
+        self.assertEqual(remapped.get(self.products[0].pk)["amount_available"], 1)
+        # A reader holding the previous columns keeps a consistent view.
+        self.assertEqual(columns.get(self.products[0].pk)["amount_available"], 5)
+
+    def test_list_and_retrieve_from_snapshot(self):
+        write_snapshot(self.path)
+        Product.objects.all().delete()
+        self.client.force_authenticate(user=self.buyer)
+
+        with override_settings(CATALOG_SNAPSHOT_PATH=self.path):
+            response = self.client.get(reverse("product-list"), {"limit": 2, "offset": 1})
+            self.assertEqual(response.data["count"], 3)
+            self.assertEqual([p["name"] for p in response.data["results"]], ["Café", "Water"])
+
+            response = self.client.get(reverse("product-detail", args=[self.products[2].pk]))
+            self.assertEqual(response.data["name"], "Water")
+
+            response = self.client.get(
+                reverse("product-detail", args=[self.products[2].pk]), HTTP_IF_NONE_MATCH=response["ETag"]
+            )
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+            response = self.client.get(reverse("product-detail", args=["\u00b2"]))
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_buy_rechecks_snapshot_product(self):
+        write_snapshot(self.path)
+        Product.objects.filter(pk=self.products[0].pk).delete()
+        self.buyer.deposit = 100
+        self.buyer.save()
+        self.client.force_authenticate(user=self.buyer)
+
+        with override_settings(CATALOG_SNAPSHOT_PATH=self.path):
+            response = self.client.post(
+                reverse("buy_product"), data=json.dumps({"product": self.products[0].pk, "quantity": 1}),
+                content_type="application/json"
+            )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ProductHistoryTestCase(TestCase):
+    """
+    Test recording and pruning of cost and stock history.
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.seller = User.objects.create_user(username="test_seller", password="pass", role="seller")
+        self.buyer = User.objects.create_user(username="test_buyer", password="pass", role="buyer", deposit=100)
+        self.product = Product.objects.create(name="Cola", cost=50, amount_available=5, seller=self.seller)
+
+    def test_update_and_buy_recorded(self):
+        self.client.force_authenticate(user=self.seller)
+        self.client.patch(reverse("product-detail", args=[self.product.pk]), {"cost": 40}, format="json")
+        self.client.patch(reverse("product-detail", args=[self.product.pk]), {"name": "Cola Zero"}, format="json")
+        self.client.force_authenticate(user=self.buyer)
+        self.client.post(reverse("buy_product"), {"product": self.product.pk, "quantity": 2}, format="json")
+
+        rows = list(ProductHistory.objects.order_by("id").values_list("change", "cost", "amount_available"))
+        self.assertEqual(rows, [("updated", 40, 5), ("purchased", 40, 3)])
+        self.assertEqual(price_at(self.product.pk, timezone.now()).amount_available, 3)
+
+    def test_history_rolls_back_with_change(self):
+        self.client.force_authenticate(user=self.buyer)
+        with mock.patch("api.apps.products.views.record_sale", side_effect=RuntimeError), \
+                self.assertRaises(RuntimeError):
+            self.client.post(reverse("buy_product"), {"product": self.product.pk, "quantity": 2}, format="json")
+        self.assertFalse(ProductHistory.objects.exists())
+
+    def test_months_and_partition_names(self):
+        self.assertEqual(add_months(datetime.date(2026, 11, 1), 3), datetime.date(2027, 2, 1))
+        self.assertEqual(add_months(datetime.date(2026, 1, 1), -1), datetime.date(2025, 12, 1))
+        self.assertEqual(partition_name(datetime.date(2026, 3, 1)), "product_history_2026_03")
+
+    def test_prune_without_partitions_deletes_old_rows(self):
+        for changed_at in (datetime.datetime(2025, 12, 31, tzinfo=datetime.timezone.utc),
+                           datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)):
+            ProductHistory.objects.create(
+                product_id=self.product.pk, seller_id=self.seller.pk, cost=50, amount_available=5,
+                change=ProductHistory.UPDATED, changed_at=changed_at,
+            )
+
+        prune_history(retain_months=3, today=datetime.date(2026, 3, 15))
+        self.assertEqual(ProductHistory.objects.count(), 1)
+
+
+class SellerStatsTestCase(TestCase):
+    """
+    Test the per-seller product counters.
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.seller = User.objects.create_user(username="test_seller", password="pass", role="seller")
+        self.buyer = User.objects.create_user(username="test_buyer", password="pass", role="buyer", deposit=500)
+
+    def counters(self):
+        response = self.client.get(reverse("product-stats"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_counters_follow_changes(self):
+        self.client.force_authenticate(user=self.seller)
+        for amount in (3, 10):
+            self.client.post(reverse("product-list"), {"name": "Cola", "cost": 50, "amount_available": amount})
+        first, second = Product.objects.order_by("pk")
+        self.client.patch(reverse("product-detail", args=[second.pk]), {"amount_available": 4}, format="json")
+        self.assertEqual(
+            self.counters(), {"product_count": 2, "total_stock": 7, "out_of_stock_count": 0}
+        )
+
+        self.client.force_authenticate(user=self.buyer)
+        self.client.post(reverse("buy_product"), {"product": first.pk, "quantity": 3}, format="json")
+        self.client.force_authenticate(user=self.seller)
+        self.assertEqual(
+            self.counters(), {"product_count": 2, "total_stock": 4, "out_of_stock_count": 1}
+        )
+
+        self.client.delete(reverse("product-detail", args=[first.pk]))
+        self.assertEqual(
+            self.counters(), {"product_count": 1, "total_stock": 4, "out_of_stock_count": 0}
+        )
+
+    def test_reconcile_fixes_drift(self):
+        Product.objects.create(name="Cola", cost=50, amount_available=0, seller=self.seller)
+        Product.objects.create(name="Water", cost=20, amount_available=6, seller=self.seller)
+        SellerStats.objects.create(seller=self.buyer, product_count=1)
+
+        self.assertEqual(reconcile_seller_stats(), 2)
+        stats = SellerStats.objects.get(seller=self.seller)
+        self.assertEqual((stats.product_count, stats.total_stock, stats.out_of_stock_count), (2, 6, 1))
+        self.assertEqual(SellerStats.objects.get(seller=self.buyer).product_count, 0)
+        self.assertEqual(reconcile_seller_stats(), 0)
+
+        output = io.StringIO()
+        call_command("benchmark_seller_stats", repeat=1, stdout=output)
+        self.assertIn(f"seller {self.seller.pk} (2 products)", output.getvalue())
+
+    def test_drifted_counters_clamp_and_reconcile(self):
+        product = Product.objects.create(name="Cola", cost=50, amount_available=5, seller=self.seller)
+        SellerStats.objects.create(seller=self.seller, product_count=1, total_stock=2)
+
+        self.client.force_authenticate(user=self.buyer)
+        response = self.client.post(reverse("buy_product"), {"product": product.pk, "quantity": 5}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        stats = SellerStats.objects.get(seller=self.seller)
+        self.assertEqual((stats.total_stock, stats.out_of_stock_count), (0, 1))
+
+        job, = claim("worker", batch_size=1, visibility_timeout=30)
+        self.assertEqual(job.name, "products.reconcile_stats")
+        Product.objects.filter(pk=product.pk).update(amount_available=3)
+        self.assertTrue(run_job(job))
+        stats.refresh_from_db()
+        self.assertEqual((stats.total_stock, stats.out_of_stock_count), (3, 0))
+
+        apply_delta(self.buyer.pk, product_count=1, total_stock=-2)
+        stats = SellerStats.objects.get(seller=self.buyer)
+        self.assertEqual((stats.product_count, stats.total_stock), (1, 0))
+        self.assertEqual(Job.objects.filter(name="products.reconcile_stats").count(), 1)
+
+
+class ProductArchiveTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.seller = User.objects.create_user(username="seller", password="password", role="seller")
+        self.client.force_authenticate(user=self.seller)
+
+    def create(self, name, amount_available, days_old=0):
+        response = self.client.post(
+            reverse("product-list"), {"name": name, "cost": 50, "amount_available": 1}, format="json"
+        )
+        product = Product.objects.get(pk=response.data["id"])
+        updated_at = timezone.now() - datetime.timedelta(days=days_old)
+        Product.objects.filter(pk=product.pk).update(amount_available=amount_available, updated_at=updated_at)
+        reconcile_seller_stats()
+        return product
+
+    def test_archive_moves_retired_and_long_empty_products(self):
+        retired = self.create("Cola", 4)
+        stale = self.create("Water", 0, days_old=60)
+        recent = self.create("Juice", 0, days_old=1)
+        stocked = self.create("Tea", 3, days_old=60)
+        self.client.delete(reverse("product-detail", args=[retired.pk]))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(archive_products(empty_days=30, batch_size=1), 2)
+
+        self.assertEqual(
+            set(Product.all_objects.values_list("pk", flat=True)), {recent.pk, stocked.pk}
+        )
+        archived = {product.pk: product for product in ArchivedProduct.objects.all()}
+        self.assertEqual(set(archived), {retired.pk, stale.pk})
+        self.assertIsNotNone(archived[retired.pk].retired_at)
+        self.assertIsNone(archived[stale.pk].retired_at)
+        self.assertEqual(archived[retired.pk].amount_available, 4)
+        self.assertEqual(reconcile_seller_stats(), 0)
+
+        response = self.client.get(reverse("archived-product-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual({product["id"] for product in response.data["results"]}, {retired.pk, stale.pk})
+
+        other = User.objects.create_user(username="other", password="password", role="seller")
+        self.client.force_authenticate(user=other)
+        response = self.client.get(reverse("archived-product-detail", args=[stale.pk]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_dry_run_only_counts(self):
+        self.create("Water", 0, days_old=60)
+        output = io.StringIO()
+        call_command("archive_products", dry_run=True, stdout=output)
+        self.assertIn("1 product(s) would be archived.", output.getvalue())
+        self.assertEqual(Product.objects.count(), 1)
+
+
+class LeaderboardTestCase(TestCase):
+    def setUp(self):
+        clear_cache()
+        sales_counter.discard()
+        self.addCleanup(clear_cache)
+        self.client = APIClient()
+        self.seller = User.objects.create_user(username="seller", password="password", role="seller")
+        self.other_seller = User.objects.create_user(username="other", password="password", role="seller")
+        self.buyer = User.objects.create_user(username="buyer", password="password", role="buyer", deposit=0)
+        self.cola = Product.objects.create(name="Cola", cost=5, amount_available=100, seller=self.seller)
+        self.water = Product.objects.create(name="Water", cost=5, amount_available=100, seller=self.other_seller)
+
+    def buy(self, product, quantity):
+        User.objects.filter(pk=self.buyer.pk).update(deposit=100)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("buy_product"), {"product": product.pk, "quantity": quantity}, format="json"
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_purchases_rank_products(self):
+        self.client.force_authenticate(user=self.buyer)
+        with mock.patch.object(sales_counter, "interval", 3600):
+            self.buy(self.cola, 2)
+            self.buy(self.water, 3)
+            self.buy(self.cola, 4)
+            self.assertFalse(ProductSales.objects.exists())
+        self.assertEqual(sales_counter.flush(), 4)
+
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("product-popular"))
+        self.assertEqual(
+            [(row["name"], row["units_sold"]) for row in response.data], [("Cola", 6), ("Water", 3)]
+        )
+        with self.assertNumQueries(0):
+            self.client.get(reverse("product-popular"))
+
+        response = self.client.get(reverse("product-popular"), {"period": "day", "seller": self.other_seller.pk})
+        self.assertEqual([(row["name"], row["units_sold"]) for row in response.data], [("Water", 3)])
+
+        response = self.client.get(reverse("product-popular"), {"period": "week"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_flush_updates_rows_in_key_order(self):
+        with mock.patch.object(sales_counter, "interval", 3600):
+            sales_counter.record(self.water.pk, self.other_seller.pk, 1)
+            sales_counter.record(self.cola.pk, self.seller.pk, 1)
+        with mock.patch("api.apps.products.leaderboard._add_units") as add_units:
+            sales_counter.flush()
+        keys = [call.args[:3] for call in add_units.call_args_list]
+        self.assertEqual(keys, sorted(keys))
+        self.assertEqual(len(keys), 4)
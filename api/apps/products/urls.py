@@ -1,11 +1,19 @@
 from django.urls import path, include
-from rest_framework.routers import DefaultRouter
+from rest_framework.routers import DefaultRouter, SimpleRouter
 
-from api.apps.products.views import ProductViewSet, BuyProductView
+from api.apps.products.views import (
+    ProductViewSet, ArchivedProductViewSet, BuyProductView, ProductImportView, ProductStreamView,
+)
 
 router = DefaultRouter()
 router.register('', ProductViewSet, basename='product')
 
+# Registered ahead of the product routes, whose detail pattern would match `archive/`.
+archive_router = SimpleRouter()
+archive_router.register('archive', ArchivedProductViewSet, basename='archived-product')
+
 urlpatterns = [
     path('buy/', BuyProductView.as_view(), name='buy_product'),
-] + router.urls
\ No newline at end of file
+    path('import/', ProductImportView.as_view(), name='import_products'),
+    path('stream/', ProductStreamView.as_view(), name='product_stream'),
+] + archive_router.urls + router.urls
\ No newline at end of file
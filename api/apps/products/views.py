@@ -1,14 +1,99 @@
+import asyncio
+import json
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.db import transaction
+from django.db.models import F
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils import timezone
+from django.utils.http import http_date, parse_etags, quote_etag
+from django.views import View
 from rest_framework import generics, permissions, viewsets, status
+from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
+from rest_framework.exceptions import APIException, AuthenticationFailed
 from rest_framework.response import Response
 from api.apps.users.models import User
-from api.apps.products.models import Product
+from api.apps.products.models import MAX_STOCK, ArchivedProduct, Product, ProductHistory, SellerStats
 from api.apps.users.permissions import IsBuyer, IsSeller, IsProductOwner
-from api.apps.products.serializers import ProductSerializer, BuyProductSerializer
+from api.apps.products.serializers import (
+    ProductSerializer, ProductBatchSerializer, BuyProductSerializer, ProductImportSerializer,
+    SellerStatsSerializer, ArchivedProductSerializer, RestockSerializer, LeaderboardQuerySerializer,
+)
+from api.apps.products.importers import detect_format, import_products, text_stream
+from api.apps.core.db import run_in_transaction, locked_get
+from api.apps.core.tracing import TracingMixin
+from api.apps.products.events import get_broker, hub, publish_product_change
+from api.apps.products.history import record_product_change
+from api.apps.products.leaderboard import record_sale, top_products
+from api.apps.products.stats import record_stock_change
+from api.apps.products.snapshot import get_snapshot
+from api.apps.users.authentication import SessionAuthentication
 from api.apps.products.utils import amount_to_denominations
 
 
-class ProductViewSet(viewsets.ModelViewSet):
+def is_id(value: str) -> bool:
+    # str.isdigit() also accepts digits int() cannot parse, such as "²".
+    return value.isascii() and value.isdigit()
+
+
+def product_validators(pk, version: int, updated_at: float):
+    """
+    The ``ETag`` and ``Last-Modified`` timestamp of a product version.
+    """
+    return quote_etag(f"{pk}-{version}"), int(updated_at)
+
+
+def is_conditional(request) -> bool:
+    return 'If-None-Match' in request.headers or 'If-Modified-Since' in request.headers
+
+
+def not_modified(request, etag, last_modified):
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        with_validators(response, etag, last_modified)
+    return response
+
+
+def with_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = 'The product has changed since it was read.'
+    default_code = 'precondition_failed'
+
+
+def expected_version(request, product) -> int:
+    """
+    The version an update may apply to: the one loaded for this request,
+    provided it matches the client's ``If-Match`` header when one is sent.
+    """
+    if_match = request.headers.get('If-Match')
+    if if_match is not None:
+        etags = parse_etags(if_match)
+        if '*' not in etags and quote_etag(f"{product.pk}-{product.version}") not in etags:
+            raise PreconditionFailed()
+    return product.version
+
+
+def create_product(serializer, **fields) -> Product:
+    """
+    Save a new product and update the seller's counters, subscribers and
+    history. Call inside a transaction.
+    """
+    product = serializer.save(**fields)
+    record_stock_change(product.seller_id, None, product.amount_available)
+    publish_product_change(product, 'product.created')
+    record_product_change(product, ProductHistory.CREATED)
+    return product
+
+
+class ProductViewSet(TracingMixin, viewsets.ModelViewSet):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
     
@@ -16,20 +101,200 @@ class ProductViewSet(viewsets.ModelViewSet):
         """
         GET requests can be made by anyone authenticated.
         POST requires seller role.
-        PUT/DELETE require seller role and ownership.
+        PUT/DELETE and restocking require seller role and ownership.
         """
-        if self.action == 'list' or self.action == 'retrieve':
+        if self.action in ('list', 'retrieve', 'batch', 'popular'):
             return [permissions.IsAuthenticated()]
-        elif self.action == 'create':
+        elif self.action in ('create', 'stats'):
             return [IsSeller()]
         else:  
             return [IsProductOwner()]
     
+    def list(self, request, *args, **kwargs):
+        snapshot = get_snapshot()
+        if snapshot is None:
+            return super().list(request, *args, **kwargs)
+
+        page = self.paginate_queryset(snapshot)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(snapshot[:])
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Product detail with ``ETag``/``Last-Modified`` validators taken from
+        ``updated_at``. Conditional requests are answered from a
+        ``values_list('updated_at')`` probe, so unchanged products get a 304
+        without loading or serialising the row.
+        """
+        pk = kwargs['pk']
+        snapshot = get_snapshot()
+        if snapshot is not None and is_id(pk):
+            index = snapshot.index_of(int(pk))
+            if index is not None:
+                validators = product_validators(pk, snapshot.versions[index], snapshot.updated[index])
+                response = not_modified(request, *validators)
+                if response is None:
+                    response = with_validators(Response(snapshot[index]), *validators)
+                return response
+
+        if is_id(pk) and is_conditional(request):
+            row = self.get_queryset().filter(pk=pk).values_list('version', 'updated_at').first()
+            if row is not None:
+                response = not_modified(request, *product_validators(pk, row[0], row[1].timestamp()))
+                if response is not None:
+                    return response
+
+        instance = self.get_object()
+        serializer = self.get_serializer(instance)
+        return with_validators(Response(serializer.data), *self.validators(instance))
+
+    def validators(self, product):
+        return product_validators(product.pk, product.version, product.updated_at.timestamp())
+
+    def update(self, request, *args, **kwargs):
+        """
+        Conditional on ``If-Match`` when sent; the new ``ETag`` is returned.
+        """
+        partial = kwargs.pop('partial', False)
+        instance = self.get_object()
+        serializer = self.get_serializer(instance, data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        product = self.perform_update(serializer)
+        return with_validators(Response(serializer.data), *self.validators(product))
+
+    @action(detail=True, methods=['post'], serializer_class=RestockSerializer)
+    def restock(self, request, *args, **kwargs):
+        """
+        Add ``quantity`` units with a relative ``F()`` increment, so
+        purchases made meanwhile are never overwritten.
+        """
+        product = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        quantity = serializer.validated_data['quantity']
+
+        with transaction.atomic():
+            restocked = Product.objects.filter(pk=product.pk, amount_available__lte=MAX_STOCK - quantity).update(
+                amount_available=F('amount_available') + quantity,
+                version=F('version') + 1,
+                updated_at=timezone.now(),
+            )
+            if not restocked:
+                return Response(
+                    {'quantity': [f'Stock cannot exceed {MAX_STOCK} units.']},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            # Read back under the row lock the UPDATE holds.
+            product.refresh_from_db(fields=['cost', 'amount_available', 'version', 'updated_at'])
+            record_stock_change(product.seller_id, product.amount_available - quantity, product.amount_available)
+            publish_product_change(product)
+            record_product_change(product, ProductHistory.UPDATED)
+
+        return with_validators(Response(ProductSerializer(product).data), *self.validators(product))
+
+    @action(detail=False, methods=['get'])
+    def batch(self, request, *args, **kwargs):
+        """
+        Products for ``?ids=1,2,3`` in the requested order, with the IDs that
+        were not found listed under ``missing``.
+        """
+        query = ProductBatchSerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+        ids = query.validated_data['ids']
+
+        found = {}
+        snapshot = get_snapshot()
+        if snapshot is not None:
+            for product_id in ids:
+                product = snapshot.get(product_id)
+                if product is not None:
+                    found[product_id] = product
+
+        remaining = [product_id for product_id in ids if product_id not in found]
+        if remaining:
+            products = self.get_queryset().filter(id__in=remaining)
+            for product in self.get_serializer(products, many=True).data:
+                found[product['id']] = product
+
+        return Response({
+            'results': [found[product_id] for product_id in ids if product_id in found],
+            'missing': [product_id for product_id in ids if product_id not in found],
+        })
+
+    @action(detail=False, methods=['get'])
+    def popular(self, request, *args, **kwargs):
+        """
+        Best sellers of the current hour or day (``?period=``), optionally
+        of one ``?seller=``, most units sold first.
+        """
+        query = LeaderboardQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+        return Response(top_products(
+            query.validated_data['period'], query.validated_data.get('seller'), query.validated_data['limit']
+        ))
+
+    @action(detail=False, methods=['get'])
+    def stats(self, request, *args, **kwargs):
+        """
+        Product, stock and out-of-stock counts of the authenticated seller.
+        """
+        stats = SellerStats.objects.filter(seller_id=request.user.pk).first() or SellerStats()
+        return Response(SellerStatsSerializer(stats).data)
+
+    @transaction.atomic
     def perform_create(self, serializer):
-        serializer.save(seller=self.request.user)
+        create_product(serializer, seller_id=self.request.user.pk)
 
+    @transaction.atomic
+    def perform_update(self, serializer):
+        """
+        Apply the changes with one ``UPDATE ... WHERE version = ?`` against
+        the version that was read, so a purchase or edit committed in
+        between fails the update with 412 instead of being overwritten.
+        """
+        product = serializer.instance
+        version = expected_version(self.request, product)
+        previous = (product.cost, product.amount_available)
+        changes = dict(serializer.validated_data, updated_at=timezone.now())
+
+        if not Product.objects.filter(pk=product.pk, version=version).update(version=F('version') + 1, **changes):
+            raise PreconditionFailed()
+        for name, value in changes.items():
+            setattr(product, name, value)
+        product.version = version + 1
+
+        record_stock_change(product.seller_id, previous[1], product.amount_available)
+        publish_product_change(product)
+        if (product.cost, product.amount_available) != previous:
+            record_product_change(product, ProductHistory.UPDATED)
+        return product
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        # Retired products leave the catalog now and the table when
+        # `archive_products` next runs.
+        expected_version(self.request, instance)
+        if not instance.retire():
+            raise PreconditionFailed()
+        publish_product_change(instance, 'product.deleted')
+        record_stock_change(instance.seller_id, instance.amount_available, None)
+
+
+class ArchivedProductViewSet(TracingMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    The authenticated seller's archived products.
+    """
+    serializer_class = ArchivedProductSerializer
+    permission_classes = [IsSeller]
 
-class BuyProductView(generics.GenericAPIView):
+    def get_queryset(self):
+        return ArchivedProduct.objects.filter(seller_id=self.request.user.pk).order_by('-archived_at', '-id')
+
+
+class BuyProductView(TracingMixin, generics.GenericAPIView):
     queryset = Product.objects.all()
     permission_classes = [IsBuyer]
     serializer_class = BuyProductSerializer
@@ -43,18 +308,29 @@ class BuyProductView(generics.GenericAPIView):
         product = serializer.validated_data['product']
         quantity = serializer.validated_data['quantity']
 
-        with transaction.atomic():
-            product = Product.objects.select_for_update().get(pk=product.pk)
-            user = User.objects.select_for_update().get(pk=request.user.pk)
-        
-            if product.amount_available < quantity:
+        def purchase():
+            try:
+                locked_product = locked_get(Product.objects, pk=product.pk)
+            except Product.DoesNotExist:
                 return Response(
-                    {'detail': f'Only {product.amount_available} items available.'},
+                    {'product': ['Product with the given ID does not exist.']},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            
-            total_cost = product.cost * quantity
-            
+            if locked_product.machine_id is not None:
+                return Response(
+                    {'detail': f'This product is sold at machine {locked_product.machine_id}.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            user = locked_get(User.objects, pk=request.user.pk)
+
+            if locked_product.amount_available < quantity:
+                return Response(
+                    {'detail': f'Only {locked_product.amount_available} items available.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            total_cost = locked_product.cost * quantity
+
             # check sufficient funds
             if user.deposit < total_cost:
                 return Response(
@@ -65,25 +341,105 @@ class BuyProductView(generics.GenericAPIView):
                     },
                     status=status.HTTP_400_BAD_REQUEST
                 )
-        
-        
+
             change_amount = user.deposit - total_cost
             change = amount_to_denominations(change_amount)
-        
-            
-            product.amount_available -= quantity
-            product.save(update_fields=['amount_available'])
-        
+
+            locked_product.amount_available -= quantity
+            locked_product.version += 1
+            locked_product.save(update_fields=['amount_available', 'version', 'updated_at'])
+            record_stock_change(
+                locked_product.seller_id, locked_product.amount_available + quantity, locked_product.amount_available
+            )
+            publish_product_change(locked_product)
+            record_product_change(locked_product, ProductHistory.PURCHASED)
+            record_sale(locked_product, quantity)
+
             user.deposit = 0
             user.save(update_fields=['deposit'])
-    
-        response_data = {
-            'total_spent': total_cost,
-            'product_name': product.name,
-            'quantity': quantity,
-            'change': change
-        }
-    
-        return Response(response_data, status=status.HTTP_200_OK)
 
-        
\ No newline at end of file
+            response_data = {
+                'total_spent': total_cost,
+                'product_name': locked_product.name,
+                'quantity': quantity,
+                'change': change
+            }
+            return Response(response_data, status=status.HTTP_200_OK)
+
+        return run_in_transaction(
+            purchase, name='buy_product', isolation=settings.MONEY_TRANSACTION_ISOLATION
+        )
+
+
+class ProductImportView(TracingMixin, generics.GenericAPIView):
+    """
+    Bulk import products for the authenticated seller from a CSV or NDJSON file.
+    """
+    permission_classes = [IsSeller]
+    serializer_class = ProductImportSerializer
+    parser_classes = [MultiPartParser]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.serializer_class(data=request.data)
+
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        upload = serializer.validated_data['file']
+        stream = text_stream(upload.file)
+        result = import_products(stream, request.user, fmt=detect_format(upload.name))
+
+        return Response(result.as_dict(), status=status.HTTP_200_OK)
+
+
+def _parse_ids(value: str):
+    parts = (part.strip() for part in value.split(','))
+    return {int(part) for part in parts if is_id(part)}
+
+
+class ProductStreamView(View):
+    """
+    Server-sent events with live cost and stock changes.
+
+    Filter with ``?product=1,2`` and/or ``?seller=3``; without filters every
+    change is streamed. Clients that cannot keep up are disconnected.
+    """
+
+    async def get(self, request):
+        try:
+            auth = await sync_to_async(SessionAuthentication().authenticate)(request)
+        except AuthenticationFailed as exc:
+            return JsonResponse({'detail': str(exc.detail)}, status=status.HTTP_401_UNAUTHORIZED)
+        if auth is None:
+            return JsonResponse(
+                {'detail': 'Authentication credentials were not provided.'},
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+
+        get_broker().start()
+        subscription = hub.subscribe(
+            products=_parse_ids(request.GET.get('product', '')),
+            sellers=_parse_ids(request.GET.get('seller', '')),
+        )
+
+        response = StreamingHttpResponse(self.stream(subscription), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def stream(self, subscription):
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                try:
+                    event = await asyncio.wait_for(
+                        subscription.queue.get(), timeout=settings.STOCK_EVENTS_KEEPALIVE
+                    )
+                except asyncio.TimeoutError:
+                    yield ': keepalive\n\n'
+                    continue
+                if event is None:
+                    return
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            hub.unsubscribe(subscription)
@@ -0,0 +1,60 @@
+import datetime
+import typing
+
+from django.conf import settings
+from django.db.models import Case, DateTimeField, Value, When
+from django.utils import timezone
+
+from api.apps.core.buffering import WriteBehindBuffer
+from api.apps.core.metrics import metrics
+
+# Sessions updated per UPDATE statement.
+CHUNK_SIZE = 500
+
+
+class ActivityTracker(WriteBehindBuffer):
+    """
+    Coalesces ``ActiveSession.last_activity`` touches into periodic batched
+    UPDATEs.
+
+    Any number of requests on a session within one interval become a single
+    row in the next batch, and rows whose stored activity is newer than
+    ``min_age`` seconds are skipped by the UPDATE itself, so other workers
+    touching the same session don't rewrite it either. Batches are written
+    by the background flusher, never by a request.
+    """
+
+    def __init__(self, interval: float, min_age: float):
+        super().__init__(interval, background=True)
+        self.min_age = min_age
+
+    def merge(self, old, new):
+        return max(old, new)
+
+    def touch(self, session_id, when: typing.Optional[datetime.datetime] = None):
+        self.add(str(session_id), when or timezone.now())
+
+    def write(self, items):
+        from api.apps.users.models import ActiveSession
+
+        cutoff = timezone.now() - datetime.timedelta(seconds=self.min_age)
+        session_ids = list(items)
+        updated = 0
+        for start in range(0, len(session_ids), CHUNK_SIZE):
+            chunk = session_ids[start:start + CHUNK_SIZE]
+            updated += ActiveSession.all_objects.filter(
+                session_id__in=chunk, last_activity__lt=cutoff
+            ).update(
+                last_activity=Case(
+                    *[When(session_id=session_id, then=Value(items[session_id])) for session_id in chunk],
+                    output_field=DateTimeField(),
+                )
+            )
+        metrics.incr('session_activity.flushed', len(items))
+        metrics.incr('session_activity.rows_updated', updated)
+
+
+activity_tracker = ActivityTracker(
+    interval=settings.SESSION_ACTIVITY_FLUSH_INTERVAL,
+    min_age=settings.SESSION_ACTIVITY_MIN_AGE,
+)
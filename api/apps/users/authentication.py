@@ -1,6 +1,47 @@
+import typing
+
+from django.utils.functional import SimpleLazyObject
 from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework_simplejwt.exceptions import InvalidToken
-from api.apps.users.models import User, ActiveSession
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from api.apps.core.tracing import span
+from api.apps.users.cache import user_cache
+from api.apps.users.models import User
+from api.apps.users.sessions import get_session_store
+
+
+def bearer_user_id(request) -> typing.Optional[int]:
+    """
+    The user id in the request's access token, checked for signature and
+    expiry only, with no database lookup; ``None`` without a valid token.
+    For middleware running before authentication.
+    """
+    header = request.META.get(api_settings.AUTH_HEADER_NAME, '').split()
+    if len(header) != 2 or header[0] not in api_settings.AUTH_HEADER_TYPES:
+        return None
+    try:
+        return AccessToken(header[1])[api_settings.USER_ID_CLAIM]
+    except (TokenError, KeyError):
+        return None
+
+
+class ClaimsUser(SimpleLazyObject):
+    """
+    Stand-in for ``User`` built from the signed token claims.
+
+    ``pk``, ``id`` and ``role`` are answered from the token; touching any
+    other attribute loads the full user (through the per-worker cache) once.
+    """
+
+    def __init__(self, user_id: int, role: str):
+        super().__init__(lambda: user_cache.get(user_id))
+        self.__dict__.update(
+            pk=user_id, id=user_id, role=role, is_authenticated=True, is_anonymous=False
+        )
+
+    def __bool__(self):
+        return True
 
 
 class SessionAuthentication(JWTAuthentication):
@@ -8,20 +49,36 @@ class SessionAuthentication(JWTAuthentication):
     This authentication class implements session management with JWT
     """
     def get_user(self, validated_token):
-        user: "User" = super().get_user(validated_token)
         token_sid = validated_token.get('sid')
+        role = validated_token.get('role')
+
+        if role is None:
+            # Tokens issued before the role claim existed.
+            user: "User" = super().get_user(validated_token)
+            user_id = user.pk
+        else:
+            user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+            if user_id is None:
+                raise InvalidToken("Token contained no recognizable user identification")
+            user = ClaimsUser(user_id, role)
 
         if not token_sid:
             raise InvalidToken("Token is missing session ID claim.")
 
-        try:
-            ActiveSession.objects.get(user=user, session_id=token_sid)
-        except ActiveSession.DoesNotExist:
+        session_store = get_session_store()
+        with span('auth.session'):
+            session_active = session_store.is_active(user_id, token_sid)
+        if not session_active:
             # This token's session is no longer active.
             raise InvalidToken("This session has been terminated.")
-            
+
+        session_store.touch(token_sid)
         return user
 
+    def get_validated_token(self, raw_token):
+        with span('auth.jwt'):
+            return super().get_validated_token(raw_token)
+
     def authenticate(self, request):
         resp =  super().authenticate(request)
         if resp is None:
@@ -33,4 +90,4 @@ class SessionAuthentication(JWTAuthentication):
             request.session_id = validated_token.get('sid')
         else:
             request.session_id = None
-        return resp
\ No newline at end of file
+        return resp
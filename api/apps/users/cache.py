@@ -0,0 +1,50 @@
+import copy
+import threading
+import time
+import typing
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+class UserCache:
+    """
+    Per-worker LRU cache of ``User`` rows keyed by id.
+
+    Entries expire after ``USER_CACHE_TTL`` seconds and are dropped when the
+    user is saved or deleted in this process, see ``api.apps.users.signals``.
+    Callers get a copy, so mutating it never leaks into other requests.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, typing.Tuple[float, typing.Any]]" = OrderedDict()
+
+    def get(self, user_id: int):
+        from api.apps.users.models import User
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                return copy.copy(entry[1])
+
+        user = User.objects.get(pk=user_id)
+        with self._lock:
+            self._entries[user_id] = (now + settings.USER_CACHE_TTL, user)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > settings.USER_CACHE_SIZE:
+                self._entries.popitem(last=False)
+        return copy.copy(user)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache()
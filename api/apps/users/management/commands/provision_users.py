@@ -0,0 +1,35 @@
+import csv
+import sys
+
+from django.core.management.base import BaseCommand
+from api.apps.users.models import Role
+from api.apps.users.provisioning import DEFAULT_BATCH_SIZE, provision_users
+
+
+class Command(BaseCommand):
+    help = "Bulk register users from a CSV file with username, password and optional role columns."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV file, '-' for stdin.")
+        parser.add_argument("--role", choices=Role.values, default=Role.BUYER, help="Role for rows without one.")
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+
+    def provision(self, stream, options):
+        reader = csv.DictReader(stream)
+        rows = ((reader.line_num, row) for row in reader)
+        return provision_users(rows, default_role=options["role"], batch_size=options["batch_size"])
+
+    def handle(self, *args, **options):
+        if options["path"] == "-":
+            result = self.provision(sys.stdin, options)
+        else:
+            with open(options["path"], encoding="utf-8", newline="") as stream:
+                result = self.provision(stream, options)
+
+        for error in result.as_dict()["errors"]:
+            self.stderr.write(f"line {error['row']}: {error['errors']}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {result.created} users, {result.failed} rejected "
+            f"in {result.elapsed:.2f}s ({result.users_per_second:.0f} users/s)."
+        ))
@@ -1,8 +1,10 @@
-from django.db import models, transaction
+from django.conf import settings
+from django.db import models
 from django.utils import timezone
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator
 from django.core.exceptions import ValidationError
+from api.apps.core.db import run_in_transaction, locked_get
 
 
 class Role(models.TextChoices):
@@ -29,11 +31,21 @@ class User(AbstractUser):
         return f"{self.username} ({self.role})"
     
     def reset_deposit(self):
-        with transaction.atomic():
-            user = User.objects.select_for_update().get(pk=self.pk)
+        """
+        Set the deposit to zero and return the amount it held before.
+        """
+        def reset():
+            user = locked_get(User.objects, pk=self.pk)
+            previous_deposit = user.deposit
             user.deposit = 0
             user.save(update_fields=['deposit'])
-        return user.deposit
+            return previous_deposit
+
+        previous_deposit = run_in_transaction(
+            reset, name='reset_deposit', isolation=settings.MONEY_TRANSACTION_ISOLATION
+        )
+        self.deposit = 0
+        return previous_deposit
 
 
 class ActiveSessionManager(models.Manager):
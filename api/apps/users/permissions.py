@@ -36,7 +36,7 @@ class IsProductOwner(IsSeller):
     code = "is_not_product_owner"
     
     def has_object_permission(self, request, view, obj):
-        return super().has_permission(request, view) and obj.seller == request.user
+        return super().has_permission(request, view) and obj.seller_id == request.user.pk
 
 
 class IsProductOwnerOrReadOnly(IsProductOwner):
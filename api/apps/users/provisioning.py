@@ -0,0 +1,226 @@
+import concurrent.futures
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+import typing
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.password_validation import validate_password
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.translation import gettext as _
+from api.apps.users.models import Role, User
+
+DEFAULT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+USERNAME_MAX_LENGTH = User._meta.get_field('username').max_length
+username_validator = UnicodeUsernameValidator()
+
+
+class ProvisionResult:
+    """
+    Outcome of a bulk registration: users created, rows rejected and timing.
+    """
+
+    def __init__(self, max_errors: int = MAX_REPORTED_ERRORS):
+        self.created = 0
+        self.failed = 0
+        self.errors: typing.List[dict] = []
+        self.elapsed = 0.0
+        self.max_errors = max_errors
+
+    @property
+    def users_per_second(self) -> float:
+        if not self.elapsed:
+            return 0.0
+        return self.created / self.elapsed
+
+    def add_error(self, row: int, errors: dict):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'row': row, 'errors': errors})
+
+    def as_dict(self) -> dict:
+        return {
+            'created': self.created,
+            'failed': self.failed,
+            'errors': sorted(self.errors, key=lambda error: error['row']),
+            'elapsed': round(self.elapsed, 3),
+            'users_per_second': round(self.users_per_second, 1),
+        }
+
+
+def hash_password(item: typing.Tuple[str, str, str]) -> typing.Tuple[typing.Optional[str], typing.Optional[list]]:
+    """
+    Run the password validators and hash one password. Runs in the pool.
+    """
+    username, role, password = item
+    try:
+        validate_password(password, user=User(username=username, role=role))
+    except ValidationError as exc:
+        return None, [str(message) for message in exc.messages]
+    return make_password(password), None
+
+
+_pool: typing.Optional[concurrent.futures.ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_hash_pool() -> concurrent.futures.ProcessPoolExecutor:
+    """
+    The process-wide hashing pool, started on first use.
+
+    Workers are spawned rather than forked, since forking a server process
+    that is running threads is unsafe.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=settings.PROVISIONING_HASH_WORKERS or os.cpu_count(),
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=django.setup,
+            )
+        return _pool
+
+
+def validate_rows(rows: typing.List[typing.Tuple[int, typing.Any]], default_role: str = Role.BUYER):
+    """
+    Check usernames and roles of a batch, looking up existing usernames in
+    one query.
+
+    Returns ``(row_number, username, role, password)`` for rows that pass and
+    ``(row_number, errors)`` for the rest.
+    """
+    valid, errors, seen = [], [], set()
+    parsed = []
+    for row_number, row in rows:
+        if not isinstance(row, dict):
+            errors.append((row_number, {'non_field_errors': [_("Malformed row.")]}))
+            continue
+
+        row_errors = {}
+        username = row.get('username') or ''
+        role = row.get('role') or default_role
+        password = row.get('password') or ''
+        for field, value in (('username', username), ('role', role), ('password', password)):
+            if not isinstance(value, str):
+                row_errors[field] = [_(f"{field.capitalize()} must be a string.")]
+        if row_errors:
+            errors.append((row_number, row_errors))
+            continue
+        username = username.strip()
+
+        if not username:
+            row_errors['username'] = [_("This field is required.")]
+        elif len(username) > USERNAME_MAX_LENGTH:
+            row_errors['username'] = [_(f"Ensure this field has no more than {USERNAME_MAX_LENGTH} characters.")]
+        else:
+            try:
+                username_validator(username)
+            except ValidationError as exc:
+                row_errors['username'] = exc.messages
+        if not row_errors.get('username'):
+            if username in seen:
+                row_errors['username'] = [_("Duplicate username in this batch.")]
+            seen.add(username)
+
+        if role not in Role.values:
+            row_errors['role'] = [_(f'"{role}" is not a valid choice.')]
+        if not password:
+            row_errors['password'] = [_("This field is required.")]
+
+        if row_errors:
+            errors.append((row_number, row_errors))
+        else:
+            parsed.append((row_number, username, role, password))
+
+    taken = set(
+        User.objects.filter(username__in=[username for _, username, _, _ in parsed])
+        .values_list('username', flat=True)
+    )
+    for row_number, username, role, password in parsed:
+        if username in taken:
+            errors.append((row_number, {'username': [_("A user with that username already exists.")]}))
+        else:
+            valid.append((row_number, username, role, password))
+    return valid, errors
+
+
+def _insert(users: typing.List[typing.Tuple[int, User]], result: ProvisionResult):
+    try:
+        with transaction.atomic():
+            User.objects.bulk_create([user for _, user in users])
+    except IntegrityError:
+        # Someone registered one of these usernames since the check.
+        taken = set(
+            User.objects.filter(username__in=[user.username for _, user in users])
+            .values_list('username', flat=True)
+        )
+        remaining = []
+        for row_number, user in users:
+            if user.username in taken:
+                result.add_error(row_number, {'username': [_("A user with that username already exists.")]})
+            else:
+                remaining.append((row_number, user))
+        if remaining and len(remaining) < len(users):
+            _insert(remaining, result)
+        elif remaining:
+            raise
+        return
+    result.created += len(users)
+
+
+def provision_users(
+    rows: typing.Iterable[typing.Tuple[int, typing.Any]], default_role: str = Role.BUYER,
+    batch_size: int = DEFAULT_BATCH_SIZE, executor: typing.Optional[concurrent.futures.Executor] = None,
+) -> ProvisionResult:
+    """
+    Create users from ``(row_number, {"username", "password", "role"})``
+    pairs.
+
+    Each batch is checked against existing usernames in one query, its
+    passwords are validated and hashed in parallel on ``executor`` (the
+    shared process pool by default) and the users are written with one
+    ``bulk_create``. Batches commit independently.
+    """
+    result = ProvisionResult()
+    executor = executor or get_hash_pool()
+    started = time.perf_counter()
+    now = timezone.now()
+
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            break
+
+        valid, errors = validate_rows(batch, default_role)
+        for row_number, row_errors in errors:
+            result.add_error(row_number, row_errors)
+
+        chunksize = max(1, len(valid) // (4 * (os.cpu_count() or 1)))
+        hashed = executor.map(
+            hash_password, [(username, role, password) for _, username, role, password in valid],
+            chunksize=chunksize,
+        )
+        users = []
+        for (row_number, username, role, password), (password_hash, password_errors) in zip(valid, hashed):
+            if password_errors:
+                result.add_error(row_number, {'password': password_errors})
+            else:
+                user = User(username=username, role=role, password=password_hash, date_joined=now)
+                users.append((row_number, user))
+
+        if users:
+            _insert(users, result)
+
+    result.elapsed = time.perf_counter() - started
+    return result
@@ -3,7 +3,9 @@ from django.conf import settings
 from django.utils import timezone
 from django.contrib.auth.password_validation import validate_password
 from django.utils.translation import gettext_lazy as _
-from api.apps.users.models import User, ActiveSession
+from api.apps.users.models import Role, User
+from api.apps.users.sessions import get_session_store
+from api.apps.core.tracing import TracedSerializerMixin
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer, TokenBlacklistSerializer
 
 
@@ -15,7 +17,7 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'deposit')
 
 
-class UserCreateSerializer(serializers.ModelSerializer):
+class UserCreateSerializer(TracedSerializerMixin, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=True, validators=[validate_password])
     password_confirm = serializers.CharField(write_only=True, required=True)
 
@@ -38,15 +40,34 @@ class UserCreateSerializer(serializers.ModelSerializer):
         return user
     
 
-class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+class BulkUserSerializer(serializers.Serializer):
+    users = serializers.ListField(child=serializers.DictField(), allow_empty=False)
+    role = serializers.ChoiceField(choices=Role.choices, default=Role.BUYER)
+
+    def validate_users(self, value):
+        if len(value) > settings.PROVISIONING_MAX_USERS:
+            raise serializers.ValidationError(
+                _(f"Ensure there are no more than {settings.PROVISIONING_MAX_USERS} users.")
+            )
+        return value
+
+
+class CustomTokenObtainPairSerializer(TracedSerializerMixin, TokenObtainPairSerializer):
     """Custom token serializer to validate active sessions."""
 
-    
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        # Signed claim so permission checks don't need to load the user.
+        token['role'] = user.role
+        return token
+
     def validate(self, attrs):
         data = super().validate(attrs)
         user = self.user
 
-        session_count = user.active_sessions.count()
+        session_store = get_session_store()
+        session_count = session_store.count(user.pk)
         if session_count >= settings.MAX_USER_SESSIONS:
             raise serializers.ValidationError({
                 'detail': 'There is already an active session using your account.',
@@ -67,8 +88,8 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
             refresh['exp'], 
             tz=timezone.utc 
         )
-        ActiveSession.objects.create(
-            user=self.user,
+        session_store.create(
+            user_id=self.user.pk,
             session_id=jti,
             ip_address=ip_address,
             user_agent=user_agent,
@@ -89,9 +110,7 @@ class CustomTokenRefreshSerializer(TokenRefreshSerializer):
         except Exception:
             old_jti = None 
 
-        try:
-            ActiveSession.objects.get(session_id=old_jti)
-        except ActiveSession.DoesNotExist:
+        if old_jti is None or not get_session_store().exists(old_jti):
             raise serializers.ValidationError(
                 {"detail": "Session is no longer active.", "active_sessions": False}
             )
@@ -104,7 +123,7 @@ class CustomTokenRefreshSerializer(TokenRefreshSerializer):
         return data
     
 
-class DepositSerializer(serializers.Serializer):
+class DepositSerializer(TracedSerializerMixin, serializers.Serializer):
     amount = serializers.IntegerField()
 
     def validate_amount(self, value):
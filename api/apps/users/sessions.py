@@ -0,0 +1,279 @@
+import datetime
+import json
+import sqlite3
+import threading
+import time
+import typing
+
+from django.conf import settings
+from django.utils import timezone
+
+from api.apps.users.activity import activity_tracker
+from api.apps.users.models import ActiveSession
+
+
+class SessionStore:
+    """
+    Storage for login sessions; one session per refresh token ``jti``.
+    """
+
+    def create(self, user_id: int, session_id, expiry_date: datetime.datetime,
+               ip_address: typing.Optional[str] = None, user_agent: typing.Optional[str] = None):
+        raise NotImplementedError
+
+    def is_active(self, user_id: int, session_id) -> bool:
+        raise NotImplementedError
+
+    def exists(self, session_id) -> bool:
+        raise NotImplementedError
+
+    def touch(self, session_id):
+        pass
+
+    def revoke(self, user_id: int, session_id):
+        raise NotImplementedError
+
+    def revoke_all(self, user_id: int):
+        raise NotImplementedError
+
+    def count(self, user_id: int) -> int:
+        raise NotImplementedError
+
+
+class DatabaseSessionStore(SessionStore):
+    """
+    Sessions as ``ActiveSession`` rows in Postgres.
+    """
+
+    def create(self, user_id, session_id, expiry_date, ip_address=None, user_agent=None):
+        ActiveSession.objects.create(
+            user_id=user_id,
+            session_id=session_id,
+            ip_address=ip_address,
+            user_agent=user_agent,
+            expiry_date=expiry_date
+        )
+
+    def is_active(self, user_id, session_id):
+        return ActiveSession.objects.filter(
+            user_id=user_id, session_id=session_id, user__is_active=True
+        ).exists()
+
+    def exists(self, session_id):
+        return ActiveSession.objects.filter(session_id=session_id).exists()
+
+    def touch(self, session_id):
+        activity_tracker.touch(session_id)
+
+    def revoke(self, user_id, session_id):
+        ActiveSession.objects.filter(user_id=user_id, session_id=session_id).delete()
+
+    def revoke_all(self, user_id):
+        ActiveSession.objects.filter(user_id=user_id).delete()
+
+    def count(self, user_id):
+        return ActiveSession.objects.filter(user_id=user_id).count()
+
+
+class LocalKeyValue:
+    """
+    In-process stand-in for a key-value server, for tests and single-worker runs.
+
+    Implements the subset of the redis-py client API used by
+    ``KeyValueSessionStore``, so a real client can be dropped in.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data: typing.Dict[str, typing.Tuple[typing.Any, typing.Optional[float]]] = {}
+
+    def _live(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires = entry
+        if expires is not None and expires <= time.time():
+            del self._data[key]
+            return None
+        return value
+
+    def get(self, key):
+        with self._lock:
+            return self._live(key)
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            self._data[key] = (value, time.time() + ex if ex else None)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def sadd(self, key, *members):
+        with self._lock:
+            current = self._live(key) or set()
+            expires = self._data[key][1] if key in self._data else None
+            self._data[key] = (current | set(members), expires)
+
+    def srem(self, key, *members):
+        with self._lock:
+            current = self._live(key)
+            if current is not None:
+                self._data[key] = (current - set(members), self._data[key][1])
+
+    def smembers(self, key):
+        with self._lock:
+            return set(self._live(key) or ())
+
+    def expire(self, key, seconds):
+        with self._lock:
+            value = self._live(key)
+            if value is not None:
+                self._data[key] = (value, time.time() + seconds)
+
+
+class FileKeyValue:
+    """
+    Key-value stand-in shared by every process on the host, kept in a SQLite file.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._local = threading.local()
+        with self._connection() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT, expires REAL)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        if not hasattr(self._local, 'db'):
+            self._local.db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            self._local.db.execute("PRAGMA journal_mode=WAL")
+        return self._local.db
+
+    def _read(self, db, key):
+        row = db.execute(
+            "SELECT value FROM kv WHERE key = ? AND (expires IS NULL OR expires > ?)", (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _write(self, db, key, value, expires):
+        db.execute(
+            "INSERT OR REPLACE INTO kv (key, value, expires) VALUES (?, ?, ?)",
+            (key, json.dumps(value), expires),
+        )
+
+    def _expires(self, db, key):
+        row = db.execute("SELECT expires FROM kv WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def get(self, key):
+        return self._read(self._connection(), key)
+
+    def set(self, key, value, ex=None):
+        self._write(self._connection(), key, value, time.time() + ex if ex else None)
+
+    def delete(self, *keys):
+        db = self._connection()
+        db.executemany("DELETE FROM kv WHERE key = ?", [(key,) for key in keys])
+
+    def _update_set(self, key, change):
+        db = self._connection()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            members = set(self._read(db, key) or ())
+            self._write(db, key, sorted(change(members)), self._expires(db, key))
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+
+    def sadd(self, key, *members):
+        self._update_set(key, lambda current: current | set(members))
+
+    def srem(self, key, *members):
+        self._update_set(key, lambda current: current - set(members))
+
+    def smembers(self, key):
+        return set(self.get(key) or ())
+
+    def expire(self, key, seconds):
+        self._connection().execute(
+            "UPDATE kv SET expires = ? WHERE key = ?", (time.time() + seconds, key)
+        )
+
+
+class KeyValueSessionStore(SessionStore):
+    """
+    Sessions in a key-value store: one expiring key per session plus a set of
+    session ids per user, so validating a request is a single ``GET``.
+
+    Expired sessions disappear with their key; their ids are pruned from the
+    user's set the next time it is counted.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    @staticmethod
+    def _session_key(session_id):
+        return f"session:{session_id}"
+
+    @staticmethod
+    def _user_key(user_id):
+        return f"user_sessions:{user_id}"
+
+    def create(self, user_id, session_id, expiry_date, ip_address=None, user_agent=None):
+        ttl = max(1, int((expiry_date - timezone.now()).total_seconds()))
+        self.client.set(self._session_key(session_id), {
+            'user_id': user_id,
+            'ip_address': ip_address,
+            'user_agent': user_agent,
+            'created_at': time.time(),
+        }, ex=ttl)
+        self.client.sadd(self._user_key(user_id), str(session_id))
+        self.client.expire(self._user_key(user_id), ttl)
+
+    def is_active(self, user_id, session_id):
+        session = self.client.get(self._session_key(session_id))
+        return session is not None and session['user_id'] == user_id
+
+    def exists(self, session_id):
+        return self.client.get(self._session_key(session_id)) is not None
+
+    def revoke(self, user_id, session_id):
+        self.client.delete(self._session_key(session_id))
+        self.client.srem(self._user_key(user_id), str(session_id))
+
+    def revoke_all(self, user_id):
+        session_ids = self.client.smembers(self._user_key(user_id))
+        self.client.delete(self._user_key(user_id), *[self._session_key(sid) for sid in session_ids])
+
+    def count(self, user_id):
+        session_ids = self.client.smembers(self._user_key(user_id))
+        expired = [sid for sid in session_ids if not self.exists(sid)]
+        if expired:
+            self.client.srem(self._user_key(user_id), *expired)
+        return len(session_ids) - len(expired)
+
+
+_stores: typing.Dict[typing.Tuple[str, str], SessionStore] = {}
+
+
+def get_session_store() -> SessionStore:
+    """
+    The session store selected by ``SESSION_STORE_BACKEND``.
+    """
+    backend, path = settings.SESSION_STORE_BACKEND, settings.SESSION_STORE_PATH
+    key = (backend, path)
+    if key not in _stores:
+        if backend == 'database':
+            _stores[key] = DatabaseSessionStore()
+        elif backend == 'memory':
+            _stores[key] = KeyValueSessionStore(LocalKeyValue())
+        elif backend == 'file':
+            _stores[key] = KeyValueSessionStore(FileKeyValue(path))
+        else:
+            raise ValueError(f"Unknown session store backend: {backend}")
+    return _stores[key]
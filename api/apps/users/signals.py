@@ -0,0 +1,19 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from api.apps.users.cache import user_cache
+from api.apps.users.models import User
+from api.apps.users.sessions import get_session_store
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    user_cache.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def revoke_inactive_user_sessions(sender, instance, **kwargs):
+    # Stores other than the database can't join on is_active when validating.
+    if not instance.is_active:
+        get_session_store().revoke_all(instance.pk)
@@ -0,0 +1,9 @@
+from django.utils import timezone
+
+from api.apps.jobs.queue import task
+from api.apps.users.models import ActiveSession
+
+
+@task('users.reap_expired_sessions')
+def reap_expired_sessions(payload):
+    ActiveSession.all_objects.filter(expiry_date__lte=timezone.now()).delete()
@@ -1,16 +1,33 @@
 import json
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+import uuid
+from unittest import mock
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 
+from datetime import timedelta
+from django.utils import timezone
+from api.apps.core.buffering import WriteBehindBuffer
+from api.apps.users.activity import ActivityTracker, activity_tracker
+from api.apps.users.authentication import ClaimsUser
+from api.apps.users.cache import user_cache
 from api.apps.users.models import ActiveSession
+from api.apps.users import sessions
+from api.apps.users.provisioning import provision_users
 
 User = get_user_model()
 
 
+def tearDownModule():
+    # Pending touches refer to the test database, which is gone at exit.
+    activity_tracker.discard()
+
+
 class UserRegisterViewTests(TestCase):
     """
     Test user registration: buyer and seller roles, invalid data.
@@ -360,4 +377,232 @@ class ResetDepositViewTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIn("Deposit reset successfully.", response.data["message"])
         self.assertEqual(response.data["previous_deposit"], 250)
-        self.assertEqual(response.data["current_deposit"], 0)
\ No newline at end of file
+        self.assertEqual(response.data["current_deposit"], 0)
+
+
+class ClaimsAuthenticationTests(TestCase):
+    """
+    Test that role-gated requests are authorised from token claims.
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="buyeruser",
+            password="StrongPassword123!",  # noqa: S106
+            role="buyer"
+        )
+        user_cache.clear()
+        login_response = self.client.post(
+            reverse("token_obtain_pair"),
+            data=json.dumps({"username": "buyeruser", "password": "StrongPassword123!"}),
+            content_type="application/json"
+        )
+        self.access_token = login_response.data["access"]
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access_token}')
+        # Start a fresh interval so no activity flush lands in a counted request.
+        activity_tracker.flush()
+
+    def test_role_check_single_auth_query(self):
+        """Only the session lookup runs before an invalid deposit is rejected"""
+        with self.assertNumQueries(1):
+            response = self.client.post(
+                reverse("deposit"), data=json.dumps({"amount": 30}), content_type="application/json"
+            )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_claims_user_loads_lazily(self):
+        claims_user = ClaimsUser(self.user.pk, "buyer")
+        with self.assertNumQueries(0):
+            self.assertTrue(claims_user.is_authenticated)
+            self.assertEqual(claims_user.role, "buyer")
+        with self.assertNumQueries(1):
+            self.assertEqual(claims_user.username, "buyeruser")
+            self.assertEqual(claims_user.deposit, 0)
+
+    def test_user_cache_invalidated_on_save(self):
+        self.assertEqual(user_cache.get(self.user.pk).deposit, 0)
+        self.user.deposit = 50
+        self.user.save()
+        self.assertEqual(user_cache.get(self.user.pk).deposit, 50)
+
+    def test_inactive_user_rejected(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        response = self.client.get(reverse("user_view"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class SessionActivityTests(TestCase):
+    """
+    Test write-behind of ActiveSession.last_activity.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(username="buyeruser", password="pass", role="buyer")
+        self.stale = timezone.now() - timedelta(minutes=10)
+        self.sessions = []
+        for _ in range(3):
+            session = ActiveSession.objects.create(
+                user=self.user, session_id=uuid.uuid4(), expiry_date=timezone.now() + timedelta(days=1)
+            )
+            self.sessions.append(session)
+        ActiveSession.objects.update(last_activity=self.stale)
+        self.tracker = ActivityTracker(interval=3600, min_age=60)
+
+    def tearDown(self):
+        self.tracker.discard()
+
+    def test_touches_coalesced_into_one_update(self):
+        for _ in range(5):
+            for session in self.sessions:
+                self.tracker.touch(session.session_id)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.tracker.flush(), 3)
+        for session in self.sessions:
+            session.refresh_from_db()
+            self.assertGreater(session.last_activity, self.stale)
+
+    def test_recent_activity_not_rewritten(self):
+        recent = timezone.now() - timedelta(seconds=10)
+        ActiveSession.objects.filter(pk=self.sessions[0].pk).update(last_activity=recent)
+
+        self.tracker.touch(self.sessions[0].session_id)
+        self.tracker.flush()
+
+        self.sessions[0].refresh_from_db()
+        self.assertEqual(self.sessions[0].last_activity, recent)
+
+    def test_flushes_when_interval_elapsed(self):
+        tracker = ActivityTracker(interval=0, min_age=60)
+        tracker.touch(self.sessions[0].session_id)
+        self.sessions[0].refresh_from_db()
+        self.assertGreater(self.sessions[0].last_activity, self.stale)
+
+    def test_request_does_not_flush(self):
+        tracker = ActivityTracker(interval=0, min_age=60)
+        with (
+            mock.patch.object(WriteBehindBuffer, "inline_only", False),
+            mock.patch.object(tracker, "flush") as flush,
+            mock.patch("api.apps.core.buffering.threading.Thread") as thread,
+        ):
+            tracker.touch(self.sessions[0].session_id)
+        flush.assert_not_called()
+        thread.return_value.start.assert_called_once()
+        tracker.discard()
+
+
+@override_settings(SESSION_STORE_BACKEND="memory")
+class KeyValueSessionStoreTests(TestCase):
+    """
+    Test login, refresh and logout against the key-value session store.
+    """
+    def setUp(self):
+        sessions._stores.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="kvuser", password="pass", role="buyer")
+
+    def tearDown(self):
+        sessions._stores.clear()
+
+    def login(self):
+        response = self.client.post(
+            reverse("token_obtain_pair"), {"username": "kvuser", "password": "pass"}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_session_flow_bypasses_database(self):
+        tokens = self.login()
+        self.assertFalse(ActiveSession.objects.exists())
+        self.assertEqual(sessions.get_session_store().count(self.user.pk), 1)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        response = self.client.post(reverse("deposit"), {"amount": 10}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.post(reverse("token_refresh"), {"refresh": tokens["refresh"]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_logout_revokes_session(self):
+        tokens = self.login()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        response = self.client.post(reverse("logout"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(sessions.get_session_store().count(self.user.pk), 0)
+        response = self.client.post(reverse("deposit"), {"amount": 10}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivating_user_revokes_sessions(self):
+        self.login()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(sessions.get_session_store().count(self.user.pk), 0)
+
+    def test_expired_sessions_pruned_from_count(self):
+        store = sessions.KeyValueSessionStore(sessions.LocalKeyValue())
+        store.create(self.user.pk, uuid.uuid4(), timezone.now() + timedelta(days=1))
+        expired = uuid.uuid4()
+        store.create(self.user.pk, expired, timezone.now() + timedelta(days=1))
+        store.client.set(f"session:{expired}", {"user_id": self.user.pk}, ex=-1)
+
+        self.assertEqual(store.count(self.user.pk), 1)
+        self.assertFalse(store.exists(expired))
+
+    def test_file_store_shared_between_clients(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = f"{directory.name}/sessions.sqlite3"
+        session_id = uuid.uuid4()
+        writer = sessions.KeyValueSessionStore(sessions.FileKeyValue(path))
+        writer.create(self.user.pk, session_id, timezone.now() + timedelta(days=1))
+
+        reader = sessions.KeyValueSessionStore(sessions.FileKeyValue(path))
+        self.assertTrue(reader.is_active(self.user.pk, session_id))
+        reader.revoke_all(self.user.pk)
+        self.assertFalse(writer.exists(session_id))
+
+
+class BulkProvisioningTests(TestCase):
+    """
+    Test bulk user registration.
+    """
+    def setUp(self):
+        User.objects.create_user(username="taken", password="pass", role="buyer")
+        self.rows = [
+            {"username": "fleet_1", "password": "Vend1ngMachine!"},
+            {"username": "fleet_2", "password": "Vend1ngMachine!", "role": "seller"},
+            {"username": "taken", "password": "Vend1ngMachine!"},
+            {"username": "fleet_1", "password": "Vend1ngMachine!"},
+            {"username": "fleet_3", "password": "12345678"},
+            {"username": "bad name!", "password": "Vend1ngMachine!"},
+            {"username": "fleet_4", "password": 12345678901, "role": ["seller"]},
+        ]
+
+    def test_provision_reports_row_errors(self):
+        with ThreadPoolExecutor(2) as executor:
+            result = provision_users(enumerate(self.rows), executor=executor).as_dict()
+
+        self.assertEqual(result["created"], 2)
+        self.assertEqual([error["row"] for error in result["errors"]], [2, 3, 4, 5, 6])
+        self.assertIn("password", result["errors"][2]["errors"])
+        self.assertEqual(
+            result["errors"][4]["errors"],
+            {"role": ["Role must be a string."], "password": ["Password must be a string."]},
+        )
+        fleet = User.objects.filter(username__startswith="fleet_").order_by("username")
+        self.assertEqual([(user.username, user.role) for user in fleet], [("fleet_1", "buyer"), ("fleet_2", "seller")])
+        self.assertTrue(fleet[0].check_password("Vend1ngMachine!"))
+
+    def test_bulk_endpoint_admin_only(self):
+        client = APIClient()
+        url = reverse("bulk_create_users")
+        client.force_authenticate(user=User.objects.get(username="taken"))
+        response = client.post(url, {"users": self.rows[:1]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        admin = User.objects.create_user(username="admin", password="pass", role="seller", is_staff=True)
+        client.force_authenticate(user=admin)
+        with override_settings(PROVISIONING_HASH_WORKERS=1):
+            response = client.post(url, {"users": self.rows[:1]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["created"], 1)
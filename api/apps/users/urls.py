@@ -2,12 +2,13 @@ from django.urls import path
 
 from api.apps.users.views import (
     UserRegistrationView, UserView, CustomTokenObtainPairView, CustomTokenRefreshView, LogoutView, LogoutAllView,
-    DepositView, ResetDepositView
+    DepositView, ResetDepositView, BulkUserRegistrationView
 )
 
 
 urlpatterns = [
     path("", UserRegistrationView.as_view(), name="create_user"),
+    path("bulk/", BulkUserRegistrationView.as_view(), name="bulk_create_users"),
     path("me/", UserView.as_view(), name="user_view"),
     path("login/", CustomTokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("login/refresh/", CustomTokenRefreshView.as_view(), name="token_refresh"),
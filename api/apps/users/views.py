@@ -1,51 +1,76 @@
-from django.db import transaction
+from django.conf import settings
 from rest_framework import status, generics, permissions
 from rest_framework.generics import GenericAPIView
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
-from api.apps.users.models import User, ActiveSession
+from api.apps.users.models import User
+from api.apps.users.sessions import get_session_store
 from api.apps.users.serializers import (
-    UserCreateSerializer, CustomTokenObtainPairSerializer, CustomTokenRefreshSerializer, DepositSerializer,
+    UserCreateSerializer, BulkUserSerializer, CustomTokenObtainPairSerializer, CustomTokenRefreshSerializer,
+    DepositSerializer,
 )
+from api.apps.users.provisioning import provision_users
 from api.apps.users.permissions import IsBuyer
+from api.apps.core.db import run_in_transaction, locked_get
+from api.apps.core.tracing import TracingMixin
 
 
-class UserRegistrationView(generics.CreateAPIView):
+class UserRegistrationView(TracingMixin, generics.CreateAPIView):
     queryset = User.objects.all()
     serializer_class = UserCreateSerializer
     permission_classes = [permissions.AllowAny]
 
 
-class CustomTokenObtainPairView(TokenObtainPairView):
+class BulkUserRegistrationView(TracingMixin, GenericAPIView):
+    """
+    Register many users at once, e.g. a customer's fleet of buyer accounts.
+    Passwords are validated and hashed in a process pool; each row that
+    fails is reported with its position in ``users``.
+    """
+    serializer_class = BulkUserSerializer
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request: Request) -> Response:
+        serializer = self.serializer_class(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        result = provision_users(
+            enumerate(serializer.validated_data['users']), default_role=serializer.validated_data['role']
+        )
+        return Response(result.as_dict(), status=status.HTTP_200_OK)
+
+
+class CustomTokenObtainPairView(TracingMixin, TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
 
 
-class CustomTokenRefreshView(TokenRefreshView):
+class CustomTokenRefreshView(TracingMixin, TokenRefreshView):
     serializer_class = CustomTokenRefreshSerializer
 
 
-class UserView(GenericAPIView):
+class UserView(TracingMixin, GenericAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request: Request) -> Response:
         return Response({"session_id": request.session_id})
 
 
-class LogoutView(GenericAPIView):
+class LogoutView(TracingMixin, GenericAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request: Request) -> Response:
         session_id = getattr(request, 'session_id', None)
         if session_id:
-            ActiveSession.objects.filter(user=request.user, session_id=session_id).delete()
+            get_session_store().revoke(request.user.pk, session_id)
             del request.session_id
 
         return Response({"detail": "Logged out successfully."}, status=status.HTTP_200_OK)
 
 
-class LogoutAllView(GenericAPIView):
+class LogoutAllView(TracingMixin, GenericAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request: Request) -> Response:
@@ -54,11 +79,11 @@ class LogoutAllView(GenericAPIView):
         if hasattr(request, 'session_id'):
             del request.session_id
 
-        user.active_sessions.all().delete()
+        get_session_store().revoke_all(user.pk)
         return Response({"detail": "Logged out from all sessions successfully."}, status=status.HTTP_200_OK)
 
 
-class DepositView(GenericAPIView):
+class DepositView(TracingMixin, GenericAPIView):
     """
     Deposit coints into buyer's account.
     """
@@ -73,29 +98,33 @@ class DepositView(GenericAPIView):
         
         amount = serializer.validated_data['amount']
         
-        with transaction.atomic():
-            user = User.objects.select_for_update().get(pk=request.user.pk)
+        def deposit():
+            user = locked_get(User.objects, pk=request.user.pk)
             user.deposit += amount
             user.save(update_fields=['deposit'])
-        
+            return user
+
+        user = run_in_transaction(
+            deposit, name='deposit', isolation=settings.MONEY_TRANSACTION_ISOLATION
+        )
+
         return Response({
             'message': f'{amount} cents deposited successfully.',
             'current_deposit': user.deposit
         }, status=status.HTTP_200_OK)
     
 
-class ResetDepositView(GenericAPIView):
+class ResetDepositView(TracingMixin, GenericAPIView):
     """
     Reset buyer's deposit to zero.
     """
     permission_classes = [IsBuyer]
 
     def post(self, request: Request) -> Response:
-        user = request.user
-        previous_deposit = user.deposit
-        new_deposit = user.reset_deposit()
+        user = User(pk=request.user.pk)
+        previous_deposit = user.reset_deposit()
         return Response({
             'message': 'Deposit reset successfully.',
             'previous_deposit': previous_deposit,
-            "current_deposit": new_deposit
+            "current_deposit": user.deposit
         }, status=status.HTTP_200_OK)
\ No newline at end of file
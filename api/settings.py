@@ -32,11 +32,20 @@ INSTALLED_APPS = [
     "django.contrib.staticfiles",
     "rest_framework",
     "drf_yasg",
+    "api.apps.core",
     "api.apps.users",
     "api.apps.products",
+    "api.apps.jobs",
+    "api.apps.machines",
 ]
 
+TEST_RUNNER = "api.apps.core.testing.TestRunner"
+
 MIDDLEWARE = [
+    "api.apps.core.tracing.tracing_middleware",
+    "api.apps.core.lanes.user_lane_middleware",
+    "api.apps.core.admission.admission_middleware",
+    "api.apps.core.profiling.profiling_middleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -135,6 +144,105 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 AUTH_USER_MODEL = "users.User"
 MAX_USER_SESSIONS = 1
+# Where login sessions live: "database" (active_sessions table), "memory"
+# (per process, tests only) or "file" (key-value file shared by the workers)
+SESSION_STORE_BACKEND = config("DJ_SESSION_STORE", default="database")
+SESSION_STORE_PATH = config("DJ_SESSION_STORE_PATH", default="/tmp/vendease-sessions.sqlite3")
+# Bulk registration (/api/users/bulk/, `provision_users`): password hashing
+# processes (0 = one per CPU) and most users per request
+PROVISIONING_HASH_WORKERS = config("DJ_PROVISIONING_WORKERS", default=0, cast=int)
+PROVISIONING_MAX_USERS = 1000
+# Per-worker cache of users loaded lazily behind token claims
+USER_CACHE_TTL = 60  # seconds
+USER_CACHE_SIZE = 10000
+# ActiveSession.last_activity is written behind in batches by a background
+# thread: at most once per flush interval per worker, and only for rows older
+# than the minimum age.
+SESSION_ACTIVITY_FLUSH_INTERVAL = 30  # seconds
+SESSION_ACTIVITY_MIN_AGE = 60  # seconds
+
+# Retries for money-moving transactions (deposit, buy, reset), see api.apps.core.db
+TRANSACTION_MAX_ATTEMPTS = config("DJ_TXN_MAX_ATTEMPTS", default=5, cast=int)
+TRANSACTION_RETRY_BACKOFF = 0.02  # seconds, doubled per attempt
+TRANSACTION_RETRY_MAX_BACKOFF = 0.5
+TRANSACTION_LOCK_TIMEOUT = config("DJ_TXN_LOCK_TIMEOUT_MS", default=0, cast=int)
+# "serializable", "repeatable_read" or empty for READ COMMITTED
+MONEY_TRANSACTION_ISOLATION = config("DJ_MONEY_TXN_ISOLATION", default="") or None
+
+# Live stock updates (/api/products/stream/). "local" only reaches clients of
+# the publishing worker; "socket" fans out to every worker on the host.
+STOCK_EVENTS_BROKER = config("DJ_STOCK_EVENTS_BROKER", default="local")
+STOCK_EVENTS_SOCKET_DIR = config("DJ_STOCK_EVENTS_SOCKET_DIR", default="/tmp/vendease-stock-events")
+STOCK_EVENTS_QUEUE_SIZE = 100
+STOCK_EVENTS_KEEPALIVE = 15  # seconds
+
+# Optional memory-mapped catalog snapshot shared by all workers, refreshed by
+# `python manage.py refresh_catalog_snapshot`. Empty disables it.
+CATALOG_SNAPSHOT_PATH = config("DJ_CATALOG_SNAPSHOT_PATH", default="")
+# Readers fall back to the database when the refresher stops updating it.
+CATALOG_SNAPSHOT_MAX_AGE = 60  # seconds
+
+# Cost and stock history (product_history), written with each change and
+# kept for PRODUCT_HISTORY_RETENTION_MONTHS by `product_history_partitions`
+PRODUCT_HISTORY_RETENTION_MONTHS = config("DJ_PRODUCT_HISTORY_RETENTION_MONTHS", default=12, cast=int)
+PRODUCT_HISTORY_MONTHS_AHEAD = 3
+
+# Retired products, and products out of stock for PRODUCT_ARCHIVE_EMPTY_DAYS,
+# are moved to products_archive by `python manage.py archive_products`
+PRODUCT_ARCHIVE_EMPTY_DAYS = config("DJ_PRODUCT_ARCHIVE_EMPTY_DAYS", default=30, cast=int)
+PRODUCT_ARCHIVE_BATCH_SIZE = 1000
+
+# Best-sellers leaderboard (api.apps.products.leaderboard): hourly and daily
+# units sold, flushed from each worker every LEADERBOARD_FLUSH_INTERVAL
+LEADERBOARD_FLUSH_INTERVAL = 5  # seconds
+LEADERBOARD_CACHE_TTL = 5  # seconds
+LEADERBOARD_SIZE = 50  # most entries one request can ask for
+LEADERBOARD_RETENTION_DAYS = 7
+
+# Background jobs (api.apps.jobs), run by `python manage.py run_jobs`
+JOB_BATCH_SIZE = 10
+JOB_VISIBILITY_TIMEOUT = 300  # seconds
+JOB_POLL_INTERVAL = 1  # seconds
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_BACKOFF = 10  # seconds, doubled per attempt
+JOB_RETRY_MAX_BACKOFF = 3600
+
+# Request tracing (api.apps.core.tracing): fraction of requests sampled, and
+# where their OTLP/JSON spans go: "file" (one JSON line per batch) or "http"
+# (an OTLP/HTTP collector such as `python manage.py collect_traces`)
+TRACING_SAMPLE_RATE = config("DJ_TRACING_SAMPLE_RATE", default=0.0, cast=float)
+TRACING_EXPORTER = config("DJ_TRACING_EXPORTER", default="file")
+TRACING_EXPORT_PATH = config("DJ_TRACING_EXPORT_PATH", default="/tmp/vendease-traces.jsonl")
+TRACING_COLLECTOR_URL = config("DJ_TRACING_COLLECTOR_URL", default="http://localhost:4318/v1/traces")
+TRACING_EXPORT_INTERVAL = 5  # seconds
+TRACING_SERVICE_NAME = "vendease-api"
+
+# Admission control (api.apps.core.admission): per worker, at most
+# `concurrency` requests of each route class run at once and up to `queue`
+# more wait `timeout` seconds; the rest get 503 with Retry-After
+ADMISSION_CONTROL = config("DJ_ADMISSION_CONTROL", default=True, cast=bool)
+ADMISSION_LIMITS = {
+    "money": {"concurrency": config("DJ_ADMISSION_MONEY_CONCURRENCY", default=8, cast=int), "queue": 32, "timeout": 2.0},
+    "catalog": {"concurrency": config("DJ_ADMISSION_CATALOG_CONCURRENCY", default=32, cast=int), "queue": 128, "timeout": 1.0},
+    "auth": {"concurrency": config("DJ_ADMISSION_AUTH_CONCURRENCY", default=8, cast=int), "queue": 32, "timeout": 2.0},
+}
+ADMISSION_RETRY_AFTER = 1  # seconds
+
+# Per-user lanes (api.apps.core.lanes): a user's money-moving requests run
+# one at a time in each worker, with at most USER_LANE_MAX_PENDING waiting
+USER_LANES = config("DJ_USER_LANES", default=True, cast=bool)
+USER_LANE_MAX_PENDING = 16
+
+# On-demand profiling (api.apps.core.profiling) of requests carrying an
+# X-Profile token from `python manage.py profile_token`
+PROFILING_DIR = config("DJ_PROFILING_DIR", default="/tmp/vendease-profiles")
+PROFILING_TOKEN_MAX_AGE = 3600  # seconds
+
+# How long /readyz reuses its database and migration checks
+READINESS_CACHE_TTL = config("DJ_READINESS_CACHE_TTL", default=5, cast=float)  # seconds
+
+# Most products returned by one /api/products/batch/?ids= request
+PRODUCT_BATCH_MAX = config("DJ_PRODUCT_BATCH_MAX", default=100, cast=int)
 
 # Rest Framework
 
@@ -145,6 +253,10 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.apps.core.tracing.TracedJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
     "PAGE_SIZE": 30,
 }
@@ -169,5 +281,14 @@ SWAGGER_SETTINGS = {
     },
     # Optional: Disable Django session authentication in Swagger UI if you prefer token only
     'USE_SESSION_AUTH': False, 
+    # Point the UI at the pre-generated schema instead of rebuilding it per page load
+    'SPEC_URL': ('schema-json', {'format': '.json'}),
+}
+REDOC_SETTINGS = {
+    'SPEC_URL': ('schema-json', {'format': '.json'}),
 }
+# Pre-generated OpenAPI schema, see `python manage.py generate_schema`
+SCHEMA_DIR = BASE_DIR / "schema"
+# Stored plans of the hot queries, see `python manage.py capture_query_plans`
+QUERY_PLAN_DIR = BASE_DIR / "query_plans"
 
@@ -3,17 +3,11 @@ from django.conf.urls.static import static
 from django.urls import path, include, re_path
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
+from api.apps.core.schema import API_INFO
+from api.apps.core.views import SchemaFileView, MetricsView, ProfileView, LivenessView, ReadinessView
 
 schema_view = get_schema_view(
-    openapi.Info(
-        title="Vendease API",
-        default_version='v1',
-        description="API documentation",
-        terms_of_service="https://www.google.com/policies/terms/",
-        contact=openapi.Contact(email="newtonjohn043@gmail.com"),
-        license=openapi.License(name="BSD License"),
-    ),
+    API_INFO,
     public=True,
     permission_classes=(permissions.AllowAny,),
     authentication_classes=[],
@@ -23,8 +17,13 @@ schema_view = get_schema_view(
 urlpatterns = [
     path("api/users/", include("api.apps.users.urls")),
     path("api/products/", include("api.apps.products.urls")),
+    path("api/machines/", include("api.apps.machines.urls")),
+    path("api/metrics/", MetricsView.as_view(), name="metrics"),
+    path("api/profiles/<str:profile_id>/", ProfileView.as_view(), name="profile"),
+    path("healthz", LivenessView.as_view(), name="healthz"),
+    path("readyz", ReadinessView.as_view(), name="readyz"),
 
-    re_path(r'^swagger(?P<format>\.json|\.yaml)$', schema_view.without_ui(cache_timeout=0), name='schema-json'),
+    re_path(r'^swagger(?P<format>\.json|\.yaml)$', SchemaFileView.as_view(), name='schema-json'),
     re_path(r'^swagger/$', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
     re_path(r'^redoc/$', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
 ]
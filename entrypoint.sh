@@ -1,5 +1,12 @@
 #!/bin/bash
 # Wait for Postgres to be ready
 python manage.py migrate --no-input
+# Add the coming months' product history partitions; also run it monthly from cron
+python manage.py product_history_partitions
+
+# A single refresher keeps the shared catalog snapshot current for all workers
+if [ -n "$DJ_CATALOG_SNAPSHOT_PATH" ]; then
+    python manage.py refresh_catalog_snapshot --interval 5 &
+fi
 
 gunicorn --workers=4 -k uvicorn.workers.UvicornWorker --bind 0.0.0.0:8000 api.asgi:application --log-level debug
\ No newline at end of file